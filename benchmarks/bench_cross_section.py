@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+"""
+Frame flipping benchmarks of `CrossSection` and `CrossSection2DView`
+
+Draws headlessly on an Agg canvas, for a grid of frame sizes, dtypes,
+limit functions and normalizations, and reports frames per second and the
+peak memory allocated.  Results are written as JSON so runs (e.g. of two
+releases) can be compared::
+
+    $ python benchmarks/bench_cross_section.py -o before.json
+    $ ... upgrade ...
+    $ python benchmarks/bench_cross_section.py -o after.json \\
+          --compare before.json
+
+'cold' flips show a frame never seen before (nothing cached about it),
+'warm' flips alternate between two frames whose statistics are cached.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import datetime
+import gc
+import itertools
+import json
+import platform
+import sys
+from timeit import default_timer
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import Normalize
+
+try:
+    import tracemalloc
+except ImportError:
+    # python 2, no peak memory
+    tracemalloc = None
+
+import xray_vision
+from xray_vision.backend.mpl.cross_section_2d import (
+    CrossSection, CrossSection2DView, fullrange_limit_factory,
+    percentile_limit_factory, absolute_limit_factory)
+from xray_vision.backend.mpl.norms import FastLogNorm
+
+
+SIZES = (512, 1024, 2048, 4096, 8192)
+DTYPES = ('uint8', 'uint16', 'float32', 'float64')
+LIMITS = ('fullrange', 'percentile', 'absolute')
+# what the 'linear' and 'log' choices of the GUI use
+NORMS = {'linear': Normalize, 'log': FastLogNorm}
+TARGETS = ('xsection', 'view')
+
+
+def make_frames(size, dtype, seed=0):
+    """
+    Two different (size, size) frames of the given dtype
+    """
+    rs = np.random.RandomState(seed)
+    dtype = np.dtype(dtype)
+    frames = []
+    for _ in range(2):
+        if dtype.kind == 'u':
+            hi = min(np.iinfo(dtype).max, 60000)
+            frame = rs.randint(0, hi, size=(size, size)).astype(dtype)
+        else:
+            frame = (rs.random_sample((size, size)) * 1000).astype(dtype)
+        frames.append(frame)
+    return frames
+
+
+def make_limit_func(name, frames):
+    if name == 'fullrange':
+        return fullrange_limit_factory()
+    if name == 'percentile':
+        return percentile_limit_factory((1, 99))
+    if name == 'absolute':
+        hi = float(frames[0].max())
+        return absolute_limit_factory((hi * .1, hi * .9))
+    raise ValueError("unknown limit function {0!r}".format(name))
+
+
+def _figure(figsize):
+    fig = Figure(figsize=figsize, dpi=100)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _flip_rate(update, n):
+    """
+    Frames per second of calling update(i) for i in range(n)
+    """
+    start = default_timer()
+    for i in range(n):
+        update(i)
+    return n / (default_timer() - start)
+
+
+def run_case(target, size, dtype, limit, norm, flips=10, figsize=(8, 8)):
+    """
+    Benchmark one combination
+
+    Returns
+    -------
+    result : dict
+    """
+    frames = make_frames(size, dtype)
+    limit_func = make_limit_func(limit, frames)
+    gc.collect()
+    if tracemalloc is not None:
+        tracemalloc.start()
+    fig = _figure(figsize)
+    if target == 'xsection':
+        xs = CrossSection(fig, norm=NORMS[norm](), limit_func=limit_func)
+        timings = xs.enable_timing()
+
+        def cold(i):
+            # a new array object, so nothing is cached about it
+            xs.update_image(frames[i % 2].view())
+
+        def warm(i):
+            xs.update_image(frames[i % 2])
+    elif target == 'view':
+        # views of the two frames, each its own key in the stack
+        n = flips + 1
+        view = CrossSection2DView(
+            fig, [frames[i % 2].view() for i in range(n)], list(range(n)),
+            norm=NORMS[norm](), limit_func=limit_func, prefetch_depth=0)
+        timings = view.enable_timing()
+
+        def cold(i):
+            view.update_image(i + 1)
+
+        def warm(i):
+            view.update_image(i % 2)
+    else:
+        raise ValueError("unknown target {0!r}".format(target))
+
+    # first draw: layout, figure set up
+    start = default_timer()
+    warm(0)
+    first = default_timer() - start
+    warm(1)
+    timings.clear()
+    fps_cold = _flip_rate(cold, flips)
+    stages = dict((stage, stats['p50'])
+                  for stage, stats in timings.summary().items())
+    fps_warm = _flip_rate(warm, flips)
+    peak = None
+    if tracemalloc is not None:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {'target': target, 'size': size, 'dtype': dtype,
+            'limit': limit, 'norm': norm, 'flips': flips,
+            'first_draw_s': first, 'fps_cold': fps_cold,
+            'fps_warm': fps_warm, 'stage_p50_s': stages,
+            'frame_nbytes': frames[0].nbytes, 'peak_bytes': peak}
+
+
+def environment():
+    return {'date': datetime.datetime.now().isoformat(),
+            'xray_vision': xray_vision.__version__,
+            'numpy': np.__version__,
+            'matplotlib': matplotlib.__version__,
+            'python': platform.python_version(),
+            'platform': platform.platform()}
+
+
+def _key(result):
+    return tuple(result[k] for k in ('target', 'size', 'dtype', 'limit',
+                                     'norm'))
+
+
+def compare(results, baseline):
+    """
+    Print the cold/warm flip rates of `results` relative to `baseline`
+    """
+    old = dict((_key(r), r) for r in baseline['results'])
+    print('\ncompared to {0} ({1})'.format(baseline['environment']['date'],
+                                           baseline['environment'][
+                                               'xray_vision']))
+    for r in results:
+        prev = old.get(_key(r))
+        if prev is None:
+            continue
+        print('{0:<40} cold x{1:5.2f}  warm x{2:5.2f}'.format(
+            ' '.join(str(k) for k in _key(r)),
+            r['fps_cold'] / prev['fps_cold'],
+            r['fps_warm'] / prev['fps_warm']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--dtypes', nargs='+', default=DTYPES,
+                        choices=DTYPES)
+    parser.add_argument('--limits', nargs='+', default=LIMITS,
+                        choices=LIMITS)
+    parser.add_argument('--norms', nargs='+', default=sorted(NORMS),
+                        choices=sorted(NORMS))
+    parser.add_argument('--targets', nargs='+', default=TARGETS,
+                        choices=TARGETS)
+    parser.add_argument('--flips', type=int, default=10,
+                        help='frames shown per measurement')
+    parser.add_argument('-o', '--output', default='bench_cross_section.json',
+                        help='JSON file to write the results to')
+    parser.add_argument('--compare', metavar='JSON',
+                        help='results of an earlier run to compare to')
+    args = parser.parse_args(argv)
+    baseline = None
+    if args.compare:
+        # read it first, it may be about to be overwritten
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = []
+    for case in itertools.product(args.targets, args.sizes, args.dtypes,
+                                  args.limits, args.norms):
+        result = run_case(*case, flips=args.flips)
+        results.append(result)
+        peak = result['peak_bytes']
+        print('{0:<40} first {1:7.3f}s  cold {2:7.2f} fps  warm {3:7.2f} fps'
+              '  peak {4}'.format(
+                  ' '.join(str(k) for k in case), result['first_draw_s'],
+                  result['fps_cold'], result['fps_warm'],
+                  'n/a' if peak is None else
+                  '{0:.0f} MB'.format(peak / 2**20)))
+        sys.stdout.flush()
+
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f,
+                  indent=1, sort_keys=True)
+    print('results written to {0}'.format(args.output))
+    if baseline is not None:
+        compare(results, baseline)
+
+
+if __name__ == '__main__':
+    main()
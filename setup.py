@@ -18,4 +18,7 @@ setup(
     cmdclass=versioneer.get_cmdclass(),
     author='Brookhaven National Lab',
     packages=setuptools.find_packages(),
+    # concurrent.futures (the frame loading threads) is in the standard
+    # library from python 3.2 on
+    extras_require={':python_version < "3.2"': ['futures']},
 )
@@ -41,6 +41,8 @@ from collections import defaultdict
 from six.moves import zip
 import numpy as np
 
+from .frame_source import FrameSource, FrameSourceDict
+
 import logging
 logger = logging.getLogger(__name__)
 
@@ -57,13 +59,23 @@ class AbstractDataView(object):
         """
         Parameters
         ----------
-        data_list : list
-            The data stored as a list
+        data_list : list or FrameSource
+            The data stored as a list.  If a `FrameSource` is passed, the
+            data is only loaded from it when it is looked up.
         key_list : list
-            The order of keys to plot
+            The order of keys to plot.  May be None if `data_list` is a
+            `FrameSource`, in which case the keys are the frame indices.
         """
         super(AbstractDataView, self).__init__(*args, **kwargs)
 
+        if isinstance(data_list, FrameSource):
+            if key_list is None:
+                key_list = list(range(len(data_list)))
+            # don't touch the frames until they are asked for
+            self._data_dict = FrameSourceDict(data_list, key_list)
+            self._key_list = key_list
+            return
+
         if len(data_list) != len(key_list):
             raise ValueError(("lengths of data ({0}) and keys ({1}) must be the"
                               " same").format(len(data_list), len(key_list)))
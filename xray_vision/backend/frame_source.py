@@ -0,0 +1,350 @@
+# ######################################################################
+# Copyright (c) 2014, Brookhaven Science Associates, Brookhaven        #
+# National Laboratory. All rights reserved.                            #
+#                                                                      #
+# Redistribution and use in source and binary forms, with or without   #
+# modification, are permitted provided that the following conditions   #
+# are met:                                                             #
+#                                                                      #
+# * Redistributions of source code must retain the above copyright     #
+#   notice, this list of conditions and the following disclaimer.      #
+#                                                                      #
+# * Redistributions in binary form must reproduce the above copyright  #
+#   notice this list of conditions and the following disclaimer in     #
+#   the documentation and/or other materials provided with the         #
+#   distribution.                                                      #
+#                                                                      #
+# * Neither the name of the Brookhaven Science Associates, Brookhaven  #
+#   National Laboratory nor the names of its contributors may be used  #
+#   to endorse or promote products derived from this software without  #
+#   specific prior written permission.                                 #
+#                                                                      #
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS  #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT    #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS    #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE       #
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,           #
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES   #
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR   #
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)   #
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,  #
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OTHERWISE) ARISING   #
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE   #
+# POSSIBILITY OF SUCH DAMAGE.                                          #
+########################################################################
+"""
+Frame sources give the 2D views access to a stack of frames without
+loading the whole stack into memory.  A frame source knows how many
+frames it has, their shape and dtype, and loads a single frame on request
+via `get_frame(i)`.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import glob
+import os
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class FrameSource(object):
+    """
+    Base class for a stack of 2D frames that are loaded on demand.
+
+    Sub-classes must implement `__len__`, `get_frame` and the `shape` and
+    `dtype` properties.  Indexing (``source[i]``) and iteration go through
+    `get_frame`.
+
+    Attributes
+    ----------
+    live : bool
+        True if frames can change after they have been returned, in which
+        case `version` is bumped on every change and loaded frames should
+        not be cached
+    version : int
+        Counter of changes to the frames of a live source
+    prefetch : bool
+        False if reading frames ahead, out of order and on other threads
+        defeats the source (e.g. it keeps state for reading them in
+        order), in which case they are not pre-fetched
+    """
+    live = False
+    version = 0
+    prefetch = True
+
+    def __len__(self):
+        raise NotImplementedError()
+
+    @property
+    def shape(self):
+        """
+        The shape of a single frame
+        """
+        raise NotImplementedError()
+
+    @property
+    def dtype(self):
+        """
+        The dtype of the frames
+        """
+        raise NotImplementedError()
+
+    def get_frame(self, i):
+        """
+        Load one frame
+
+        Parameters
+        ----------
+        i : int
+            The index of the frame, 0 <= i < len(self)
+
+        Returns
+        -------
+        frame : ndarray
+            2D array of shape `self.shape`
+        """
+        raise NotImplementedError()
+
+    def __getitem__(self, i):
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("frame index {0} out of range for a source "
+                             "with {1} frames".format(i, n))
+        return self.get_frame(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.get_frame(i)
+
+
+class ArrayFrameSource(FrameSource):
+    """
+    Frame source backed by an in-memory 3D array or a sequence of
+    2D arrays
+
+    Parameters
+    ----------
+    frames : ndarray or sequence of ndarray
+        The frames, indexed along the first axis
+    """
+    def __init__(self, frames):
+        self._frames = frames
+
+    def __len__(self):
+        return len(self._frames)
+
+    @property
+    def shape(self):
+        return np.shape(self._frames[0])
+
+    @property
+    def dtype(self):
+        return np.asarray(self._frames[0]).dtype
+
+    def get_frame(self, i):
+        return self._frames[i]
+
+
+class NpyFrameSource(ArrayFrameSource):
+    """
+    Frame source backed by a 3D array in a ``.npy`` file, which is memory
+    mapped (read only) rather than loaded
+
+    Parameters
+    ----------
+    path : str
+        Path to the ``.npy`` file
+    """
+    def __init__(self, path):
+        frames = np.load(path, mmap_mode='r')
+        if frames.ndim != 3:
+            raise ValueError("Expected a 3D array in {0}, got shape "
+                             "{1}".format(path, frames.shape))
+        self.path = path
+        super(NpyFrameSource, self).__init__(frames)
+
+    @property
+    def shape(self):
+        return self._frames.shape[1:]
+
+    @property
+    def dtype(self):
+        return self._frames.dtype
+
+
+class RawFrameSource(ArrayFrameSource):
+    """
+    Frame source backed by a headered raw binary file, which is memory
+    mapped (read only)
+
+    The file layout is assumed to be::
+
+        [file header][frame header][frame 0][frame header][frame 1]...
+
+    Parameters
+    ----------
+    path : str
+        Path to the file
+    shape : tuple
+        (nrows, ncols) of a frame
+    dtype : numpy dtype
+        dtype of the pixels, including the byte order if it is not the
+        native one (e.g. '>u2')
+    header_size : int, optional
+        Number of bytes to skip at the start of the file. Defaults to 0
+    frame_header_size : int, optional
+        Number of bytes to skip before each frame. Defaults to 0
+    num_frames : int, optional
+        Number of frames.  Defaults to as many as fit in the file
+    """
+    def __init__(self, path, shape, dtype, header_size=0,
+                 frame_header_size=0, num_frames=None):
+        dtype = np.dtype(dtype)
+        shape = tuple(shape)
+        record = np.dtype([('header', 'V{0}'.format(frame_header_size)),
+                           ('frame', dtype, shape)])
+        if num_frames is None:
+            num_frames = ((os.path.getsize(path) - header_size) //
+                          record.itemsize)
+        records = np.memmap(path, dtype=record, mode='r',
+                            offset=header_size, shape=(num_frames,))
+        self.path = path
+        self._shape = shape
+        self._dtype = dtype
+        super(RawFrameSource, self).__init__(records['frame'])
+
+    @property
+    def shape(self):
+        return self._shape
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+
+def _load_npy(path):
+    return np.load(path, mmap_mode='r')
+
+
+class DirectoryFrameSource(FrameSource):
+    """
+    Frame source backed by a directory with one file per frame.  Files are
+    sorted by name and read when their frame is requested.
+
+    Parameters
+    ----------
+    path : str
+        The directory
+    pattern : str, optional
+        glob pattern of the frame files in the directory. Defaults to
+        '*.npy'
+    reader : callable, optional
+        Function which takes a file name and returns the 2D frame.
+        Defaults to memory mapping the file with `np.load`, which only
+        works for ``.npy`` files.
+    """
+    def __init__(self, path, pattern='*.npy', reader=None):
+        if reader is None:
+            reader = _load_npy
+        self.path = path
+        self._files = sorted(glob.glob(os.path.join(path, pattern)))
+        if not self._files:
+            raise ValueError("No files matching {0!r} in "
+                             "{1}".format(pattern, path))
+        self._reader = reader
+        self._first = None
+
+    @property
+    def files(self):
+        return list(self._files)
+
+    def __len__(self):
+        return len(self._files)
+
+    def _first_frame(self):
+        if self._first is None:
+            self._first = self.get_frame(0)
+        return self._first
+
+    @property
+    def shape(self):
+        return self._first_frame().shape
+
+    @property
+    def dtype(self):
+        return self._first_frame().dtype
+
+    def get_frame(self, i):
+        return self._reader(self._files[i])
+
+
+class FrameSourceDict(MutableMapping):
+    """
+    dict-like view of a frame source, mapping keys to frames which are
+    loaded from the source when they are looked up.
+
+    Values that are assigned explicitly are stored and take precedence
+    over the frame source.
+
+    Parameters
+    ----------
+    source : FrameSource
+    key_list : list
+        One key per frame of `source`, in order
+    """
+    def __init__(self, source, key_list):
+        if len(source) != len(key_list):
+            raise ValueError(("lengths of frame source ({0}) and keys ({1}) "
+                              "must be the same").format(len(source),
+                                                         len(key_list)))
+        self.source = source
+        self._index = {k: i for i, k in enumerate(key_list)}
+        self._overrides = {}
+
+    def __getitem__(self, key):
+        try:
+            return self._overrides[key]
+        except KeyError:
+            pass
+        return self.source.get_frame(self._index[key])
+
+    def __setitem__(self, key, value):
+        self._overrides[key] = value
+
+    def __delitem__(self, key):
+        found = False
+        if key in self._overrides:
+            del self._overrides[key]
+            found = True
+        if key in self._index:
+            del self._index[key]
+            found = True
+        if not found:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self._overrides or key in self._index
+
+    def __iter__(self):
+        for k in self._index:
+            yield k
+        for k in self._overrides:
+            if k not in self._index:
+                yield k
+
+    def __len__(self):
+        return len(self._index) + sum(1 for k in self._overrides
+                                      if k not in self._index)
+
+    def clear(self):
+        self._index.clear()
+        self._overrides.clear()
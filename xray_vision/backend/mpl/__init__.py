@@ -35,7 +35,10 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
+import numpy as np
 from matplotlib import cm
+from matplotlib.patches import Rectangle
+from matplotlib.transforms import Bbox, IdentityTransform
 from .. import QtCore, QtGui
 
 from ...backend import AbstractDataView
@@ -44,6 +47,129 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def _pixel_bbox(bbox):
+    """
+    `bbox` grown to whole pixels and a margin, which covers the
+    antialiased edges of what is drawn in it
+    """
+    return Bbox.from_extents(np.floor(bbox.x0) - 2, np.floor(bbox.y0) - 2,
+                             np.ceil(bbox.x1) + 2, np.ceil(bbox.y1) + 2)
+
+
+def _blank_patch(fig):
+    """
+    A patch, in display coordinates, to blank out regions of `fig` with
+    before they are drawn again (see `_blit_axes`)
+    """
+    return Rectangle((0, 0), 1, 1, transform=IdentityTransform(),
+                     facecolor=fig.get_facecolor(), edgecolor='none',
+                     antialiased=False)
+
+
+def _blit_axes(canvas, blank, axes, drawn_bbox):
+    """
+    Draw the given axes over the last drawn figure and blit them
+
+    Parameters
+    ----------
+    canvas : FigureCanvasBase
+        Must support blitting and have a renderer
+    blank : Rectangle
+        Made by `_blank_patch`
+    axes : iterable
+        The axes to draw
+    drawn_bbox : dict
+        Area (tick labels included) each axes covered when last drawn.
+        The ones the redrawn regions overlap are drawn again too, and it
+        is updated with where they are drawn now
+
+    Returns
+    -------
+    regions : dict or None
+        The region blitted for each axes drawn.  None, with nothing drawn,
+        if a region overlaps axes not in `drawn_bbox`: only a full draw
+        can restore those
+    """
+    renderer = canvas.get_renderer()
+    # the area to blank out and redraw for each axes: where it is now
+    # and where it was, as the old tick labels may be wider
+    regions = {}
+    todo = list(axes)
+    while todo:
+        ax = todo.pop()
+        new_bbox = ax.get_tightbbox(renderer)
+        region = _pixel_bbox(Bbox.union(
+            [drawn_bbox.get(ax, new_bbox), new_bbox]))
+        regions[ax] = (new_bbox, region)
+        # blanking out the region wipes any axes it overlaps (e.g.
+        # with tick labels), those have to be drawn again as well
+        for other, bbox in drawn_bbox.items():
+            if (other not in regions and other not in todo and
+                    _pixel_bbox(bbox).overlaps(region)):
+                todo.append(other)
+    figure = canvas.figure
+    for ax in figure.axes:
+        if ax in drawn_bbox or not ax.get_visible():
+            continue
+        bbox = _pixel_bbox(ax.get_tightbbox(renderer))
+        if any(bbox.overlaps(region) for _, region in regions.values()):
+            return None
+    for new_bbox, region in regions.values():
+        blank.set_bounds(region.x0, region.y0, region.width, region.height)
+        blank.draw(renderer)
+    # in the order the figure draws them
+    for ax in figure.axes:
+        if ax in regions:
+            ax.draw(renderer)
+            drawn_bbox[ax] = regions[ax][0]
+    for new_bbox, region in regions.values():
+        canvas.blit(region)
+    return dict((ax, region) for ax, (new_bbox, region) in regions.items())
+
+
+class _AxesBlitter(object):
+    """
+    Redraws a single axes over the last drawn figure and blits it (with
+    `_blit_axes`), or asks for a full draw when that cannot be done
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+    """
+    def __init__(self, ax):
+        self._ax = ax
+        # area (tick labels included) the axes covered when last drawn,
+        # and a patch to blank it out with before drawing it again
+        self._drawn_bbox = {}
+        self._blank = _blank_patch(ax.figure)
+        self._draw_cid = None
+        if ax.figure.canvas is not None:
+            self._draw_cid = ax.figure.canvas.mpl_connect('draw_event',
+                                                          self._on_draw)
+
+    def _on_draw(self, event):
+        renderer = getattr(event, 'renderer', None)
+        if renderer is not None:
+            self._drawn_bbox = {self._ax: self._ax.get_tightbbox(renderer)}
+
+    def redraw(self):
+        canvas = self._ax.figure.canvas
+        if canvas is None:
+            return
+        if (not self._drawn_bbox or
+                not getattr(canvas, 'supports_blit', True) or
+                not hasattr(canvas, 'get_renderer') or
+                _blit_axes(canvas, self._blank, [self._ax],
+                           self._drawn_bbox) is None):
+            canvas.draw_idle()
+
+    def disconnect(self):
+        canvas = self._ax.figure.canvas
+        if self._draw_cid is not None and canvas is not None:
+            canvas.mpl_disconnect(self._draw_cid)
+        self._draw_cid = None
+
+
 class AbstractMPLDataView(object):
     """
     Class docstring
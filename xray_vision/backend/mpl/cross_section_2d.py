@@ -37,14 +37,30 @@ from __future__ import (absolute_import, division, print_function,
 
 from .. import QtCore, QtGui
 from six.moves import zip
+from collections import namedtuple
+from contextlib import contextmanager
+import copy
+import matplotlib
 from matplotlib.widgets import Cursor
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 from matplotlib.ticker import NullLocator, LinearLocator
-from matplotlib.colors import Normalize
+from matplotlib.colors import Normalize, Colormap, to_rgba
 import numpy as np
+import time
 
-from . import AbstractMPLDataView
+from . import AbstractMPLDataView, _blank_patch, _blit_axes
 from .. import AbstractDataView2D
+from ..frame_source import FrameSource, ArrayFrameSource
+from ..virtual_frames import RollingFrameSource, StackProjection
+from ..prefetch import FramePrefetcher
+from ..stats import (image_histogram, frame_stats, frame_mask,
+                     FrameStatsCache, subsample_index)
+from ..pixel_mask import BadPixelMask
+from ..time_series import PixelSeriesCache
+from ..pyramid import ImagePyramid
+from ..timing import StageTimings, timed
+from .lut import ColormapLUT
+from .time_series import TimeSeriesProbe
 
 import logging
 logger = logging.getLogger(__name__)
@@ -60,6 +76,9 @@ def fullrange_limit_factory(limit_args=None):
         """
         Plot the entire range of the image
 
+        The range comes from the cached statistics of the image (see
+        `xray_vision.backend.stats.frame_stats`), NaN values are ignored.
+
         Parameters
         ----------
         im : ndarray
@@ -75,7 +94,8 @@ def fullrange_limit_factory(limit_args=None):
            length 2 tuple to be passed to `im.clim(...)` to
            set the color limits of a ColorMappable object.
         """
-        return (np.min(im), np.max(im))
+        stats = frame_stats(im)
+        return (stats.min, stats.max)
 
     return _full_range
 
@@ -116,7 +136,9 @@ def percentile_limit_factory(limit_args):
     """
     def _percentile_limit(im):
         """
-        Sets limits based on percentile.
+        Sets limits based on percentile.  The bad pixels of the mask the
+        cached statistics of the image were computed with (see
+        `xray_vision.backend.stats.frame_stats`) are left out.
 
         Parameters
         ----------
@@ -133,16 +155,302 @@ def percentile_limit_factory(limit_args):
            set the color limits of a ColorMappable object.
 
         """
+        mask = frame_mask(im)
+        if mask is not None:
+            im = mask.good_values(im)
         return np.percentile(im, limit_args)
 
     return _percentile_limit
 
 
+def histogram_limit_factory(limit_args, bins=1024, log=False):
+    """
+    Factory to return an approximate percentile limit function
+
+    The percentiles are looked up in a cumulative histogram of the image
+    which is computed once per image and cached (see
+    `xray_vision.backend.stats.image_histogram`), so changing the
+    percentiles on the same frame does not re-scan the data.  The returned
+    values are within one bin width (`ImageHistogram.error_bound`) of what
+    `percentile_limit_factory` would give, and exact for integer images
+    with a value range smaller than 2**16.
+
+    Parameters
+    ----------
+    limit_args : tuple of floats in [0, 100]
+        upper and lower percentile values
+    bins : int, optional
+        Number of histogram bins.  Defaults to 1024
+    log : bool, optional
+        Use logarithmically spaced bins, which keeps the relative error
+        bounded for data spanning many decades.  Defaults to False
+    """
+    def _histogram_limit(im):
+        """
+        Sets limits based on percentiles estimated from a histogram.
+
+        Parameters
+        ----------
+        im : ndarray
+            image data
+
+        Returns
+        -------
+        climits : tuple
+           length 2 tuple to be passed to `im.clim(...)` to
+           set the color limits of a ColorMappable object.
+        """
+        return tuple(image_histogram(im, bins=bins,
+                                     log=log).percentile(limit_args))
+
+    return _histogram_limit
+
+
+def _as_mask(mask):
+    """
+    A BadPixelMask from a boolean array (None and masks pass through)
+    """
+    if mask is None or isinstance(mask, BadPixelMask):
+        return mask
+    return BadPixelMask(mask)
+
+
+def _get_cmap(cmap):
+    """
+    The Colormap named cmap (Colormaps pass through)
+    """
+    if isinstance(cmap, Colormap):
+        return cmap
+    try:
+        return matplotlib.colormaps[cmap]
+    except AttributeError:
+        # matplotlib < 3.5
+        from matplotlib import cm
+        return cm.get_cmap(cmap)
+
+
+def _with_bad(cmap, color):
+    """
+    A copy of cmap drawing bad (masked) values in color
+    """
+    cmap = _get_cmap(cmap)
+    try:
+        return cmap.with_extremes(bad=color)
+    except AttributeError:
+        # matplotlib < 3.4
+        cmap = copy.copy(cmap)
+        cmap.set_bad(color)
+        return cmap
+
+
+def _band_cut(cumsum, data, idx, width, reduction):
+    """
+    Reduce a band of `width` rows of `data` centred on row `idx`
+
+    Parameters
+    ----------
+    cumsum : tuple or None
+        The cumulative sums and counts of the finite values of `data`
+        from `_cumsum_rows`.  Not used for 'max'
+    data : ndarray
+        2D data, the band is taken across rows
+    idx : int
+        The centre row of the band
+    width : int
+        Number of rows in the band, clipped at the edges of the data
+    reduction : {'mean', 'sum', 'max'}
+
+    Returns
+    -------
+    cut : ndarray
+        1D array with one value per column of `data`
+    """
+    start = idx - (width - 1) // 2
+    stop = min(start + width, data.shape[0])
+    start = max(start, 0)
+    if reduction == 'max':
+        return data[start:stop].max(axis=0)
+    sums, counts = cumsum
+    band_sum = sums[stop] - sums[start]
+    if counts is None:
+        if reduction == 'sum':
+            return band_sum
+        return band_sum / (stop - start)
+    n = counts[stop] - counts[start]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if reduction == 'sum':
+            # NaN where the band has no finite value at all
+            return np.where(n > 0, band_sum, np.nan)
+        return band_sum / n
+
+
+def _sum_dtype(dtype, n, signed=False):
+    """
+    The smallest dtype which can hold the sum of n values of `dtype`
+    without overflowing.  float64 for floats, and for integers if no
+    integer type can (e.g. 64 bit ones), otherwise an integer type of the
+    same signedness, or signed if `signed`
+    """
+    if dtype.kind not in 'iu':
+        return np.dtype(np.float64)
+    info = np.iinfo(dtype)
+    kind = 'i' if signed else dtype.kind
+    for itemsize in (2, 4, 8):
+        acc = np.dtype('{0}{1}'.format(kind, itemsize))
+        acc_info = np.iinfo(acc)
+        # python ints, these cannot overflow
+        if (itemsize >= dtype.itemsize and
+                int(info.max) * n <= acc_info.max and
+                int(info.min) * n >= acc_info.min):
+            return acc
+    return np.dtype(np.float64)
+
+
+def _cumsum_rows(data):
+    """
+    Cumulative sum over the rows of `data` with a leading row of zeros,
+    so that ``sums[j] - sums[i]`` is the sum of rows i to j - 1.
+
+    NaN and inf values are left out, or a single one would spoil the sums
+    of every later row of its column: `counts` is then the cumulative
+    number of finite values, None if all values are finite.
+
+    Returns
+    -------
+    sums, counts : ndarray
+    """
+    valid = None
+    if data.dtype.kind in 'fc':
+        valid = np.isfinite(data)
+        if valid.all():
+            valid = None
+        else:
+            data = np.where(valid, data, 0)
+    dtype = _sum_dtype(data.dtype, data.shape[0])
+    sums = np.zeros((data.shape[0] + 1, data.shape[1]), dtype=dtype)
+    np.cumsum(data, axis=0, dtype=dtype, out=sums[1:])
+    counts = None
+    if valid is not None:
+        counts = np.zeros(sums.shape, dtype=np.intp)
+        np.cumsum(valid, axis=0, out=counts[1:])
+    return sums, counts
+
+
+_BAND_REDUCTIONS = ('mean', 'sum', 'max')
+
+
+def _integral_image(data):
+    """
+    Summed-area table of `data` with a leading row and column of zeros,
+    so that the sum of ``data[r0:r1, c0:c1]`` is
+    ``sat[r1, c1] - sat[r0, c1] - sat[r1, c0] + sat[r0, c0]``
+    """
+    # signed, the differences of the corners go negative on the way
+    dtype = _sum_dtype(data.dtype, data.size, signed=True)
+    sat = np.zeros((data.shape[0] + 1, data.shape[1] + 1), dtype=dtype)
+    np.cumsum(data, axis=0, dtype=dtype, out=sat[1:, 1:])
+    np.cumsum(sat[1:, 1:], axis=1, out=sat[1:, 1:])
+    return sat
+
+
+def _area_sum(sat, r0, r1, c0, c1):
+    return sat[r1, c1] - sat[r0, c1] - sat[r1, c0] + sat[r0, c0]
+
+
+BoxStats = namedtuple('BoxStats', ('sum', 'mean', 'max', 'count'))
+BoxStats.__doc__ = """
+Statistics of the box of pixels around the cursor, see
+`CrossSection.box_stats`.  count is the number of pixels summed (bad and
+NaN pixels are left out)
+"""
+
+# the cross sections cover the visible part of the image plus this
+# fraction of it on either side, so small pans don't run off their ends
+_CUT_MARGIN = .25
+
+
+def _grow_slice(slc, margin, n):
+    """
+    slc (with a step of 1) extended by margin of its length on both sides,
+    clipped to [0, n]
+    """
+    pad = max(int((slc.stop - slc.start) * margin), 1)
+    return slice(max(slc.start - pad, 0), min(slc.stop + pad, n))
+
+
+def _cut_layout(slc, n_px):
+    """
+    How a cross section over slc is drawn on n_px screen pixels: as is, or
+    decimated to the min and max of each of about n_px runs of values when
+    there are more than two values per pixel
+
+    Returns
+    -------
+    starts : ndarray or None
+        Start (relative to slc) of each run, None if not decimated
+    positions : ndarray
+        Positions of the points to draw, two (the min and the max) per run
+        when decimated
+    """
+    start, stop = slc.start, slc.stop
+    n = stop - start
+    n_px = int(n_px)
+    if n_px < 1 or n <= 2 * n_px:
+        return None, np.arange(start, stop)
+    step = -(-n // n_px)
+    starts = np.arange(0, n, step)
+    centres = start + (starts + np.minimum(starts + step, n) - 1) / 2
+    return starts, np.repeat(centres, 2)
+
+
+def _minmax_decimate(values, starts):
+    """
+    The min and max (ignoring NaN) of each run of values beginning at
+    starts, interleaved, so the decimated cut keeps the envelope (and any
+    spike) of the full one
+    """
+    out = np.empty(2 * len(starts), dtype=values.dtype)
+    out[0::2] = np.fmin.reduceat(values, starts)
+    out[1::2] = np.fmax.reduceat(values, starts)
+    return out
+
+
+# the parts of a CrossSection which are invalidated separately:
+#   data      a new image (the limits are recomputed, but only redrawn if
+#             they changed)
+#   image     the image artist has to be given its data again (pyramid
+#             level, interpolation, lookup table...)
+#   limits    the colour limits have to be recomputed
+#   cuts      the value range of the cross sections changed
+#   cmap, norm, colorbar
+#   overlay   artists added to the image axes (e.g. by a tool) changed
+#   layout    the figure has to be drawn in full
+_ASPECTS = ('data', 'image', 'limits', 'cuts', 'cmap', 'norm', 'colorbar',
+            'overlay', 'layout')
+
+
 _INTERPOLATION = ['none', 'nearest', 'bilinear', 'bicubic', 'spline16',
                   'spline36', 'hanning', 'hamming', 'hermite', 'kaiser',
                   'quadric', 'catrom', 'gaussian', 'bessel', 'mitchell',
                   'sinc', 'lanczos']
 
+# what the limit functions can be applied to
+_LIMIT_REGIONS = ('frame', 'visible')
+
+
+class _ViewFrames(object):
+    """
+    Sequence of the frames of a view, in key order, loaded on access
+    """
+    def __init__(self, view):
+        self._view = view
+
+    def __len__(self):
+        return len(self._view._key_list)
+
+    def __getitem__(self, i):
+        return self._view._data_dict[self._view._key_list[i]]
+
 
 class CrossSection2DView(AbstractDataView2D, AbstractMPLDataView):
     """
@@ -153,8 +461,13 @@ class CrossSection2DView(AbstractDataView2D, AbstractMPLDataView):
     # the default value.
     interpolation = _INTERPOLATION
 
-    def __init__(self, fig, data_list, key_list, cmap=None, norm=None,
-                 limit_func=None, interpolation=None, **kwargs):
+    def __init__(self, fig, data_list, key_list=None, cmap=None, norm=None,
+                 limit_func=None, interpolation=None, stats_cache_size=256,
+                 pyramid=None, prefetch_depth=None, cursor_rate=None,
+                 cursor_cb_rate=None, band_width=1, band_reduction='mean',
+                 lut=False, limit_region='frame', limit_pixels=None,
+                 limit_sampling='stride', mask=None, bad_color=None,
+                 box_size=0, **kwargs):
         """
         Sets up figure with cross section viewer
 
@@ -163,6 +476,11 @@ class CrossSection2DView(AbstractDataView2D, AbstractMPLDataView):
         fig : matplotlib.figure.Figure
             The figure object to build the class on, will clear
             current contents
+        data_list : list or FrameSource
+            The frames.  Frames of a `xray_vision.backend.frame_source.
+            FrameSource` are only loaded when they are displayed.
+        key_list : list, optional
+            The frame names.  Only optional if `data_list` is a FrameSource
         cmap : str,  colormap, or None
            color map to use.  Defaults to gray
         clim_percentile : float or None
@@ -173,6 +491,44 @@ class CrossSection2DView(AbstractDataView2D, AbstractMPLDataView):
         interpolation : str, optional
             Interpolation method to use. List of valid options can be found in
             CrossSection2DView.interpolation
+        stats_cache_size : int, optional
+            Number of frames to keep statistics (min, max, histogram...) for.
+            Defaults to 256
+        pyramid : {None, 'mean', 'max', 'min'}, optional
+            If not None, draw down-sampled copies of large frames when
+            zoomed out.  See `CrossSection`
+        prefetch_depth : int, optional
+            Number of frames to load in the background ahead of the
+            displayed one, in the direction the stack is being stepped
+            through.  0 turns pre-fetching off.  Defaults to 4 if
+            `data_list` is a FrameSource and 0 otherwise
+        cursor_rate, cursor_cb_rate : float, optional
+            Maximum rates (Hz) of cross section and cursor callback updates.
+            See `CrossSection`
+        band_width : int, optional
+            Number of rows/columns the cross sections are taken over.
+            Defaults to 1
+        band_reduction : {'mean', 'sum', 'max'}, optional
+            How the band is reduced to a cross section. Defaults to 'mean'
+        lut : bool, optional
+            Colour-map unsigned integer frames through a lookup table.
+            See `CrossSection`.  Defaults to False
+        limit_region : {'frame', 'visible'}, optional
+            Apply the limit function to the whole frame or only to the
+            visible part of it.  See `CrossSection`.  Defaults to 'frame'
+        limit_pixels : int, optional
+            Estimate the limits from at most this many pixels
+        limit_sampling : {'stride', 'random'}, optional
+            How those pixels are picked.  Defaults to 'stride'
+        mask : ndarray or BadPixelMask, optional
+            The bad pixels of the detector, left out of the statistics
+            and limits of every frame (of its shape) and drawn in
+            `bad_color`.  See `CrossSection`
+        bad_color : color, optional
+            Defaults to the bad colour of the colormap
+        box_size : int, optional
+            Edge of the box around the cursor to show the sum, mean and
+            max of.  See `CrossSection`.  Defaults to 0 (off)
         """
         if 'limit_args' in kwargs:
             raise Exception("changed API, don't use limit_args anymore, use closures")
@@ -183,13 +539,479 @@ class CrossSection2DView(AbstractDataView2D, AbstractMPLDataView):
         self._xsection = CrossSection(fig,
                                       cmap=self._cmap, norm=self._norm,
                                       limit_func=limit_func,
-                                      interpolation=interpolation)
+                                      interpolation=interpolation,
+                                      pyramid=pyramid,
+                                      cursor_rate=cursor_rate,
+                                      cursor_cb_rate=cursor_cb_rate,
+                                      band_width=band_width,
+                                      band_reduction=band_reduction,
+                                      lut=lut, limit_region=limit_region,
+                                      limit_pixels=limit_pixels,
+                                      limit_sampling=limit_sampling,
+                                      mask=mask, bad_color=bad_color,
+                                      box_size=box_size)
+        # per-frame statistics, keyed on the frame key
+        self._stats_cache = FrameStatsCache(maxsize=stats_cache_size,
+                                            mask=self._frames_mask())
+        if prefetch_depth is None:
+            prefetch_depth = 4 if isinstance(data_list, FrameSource) else 0
+        self._prefetcher = None
+        # frames computed from the data frames (e.g. rolling means)
+        self._virtual = None
+        self.set_prefetch_depth(prefetch_depth)
+        # shared with the CrossSection, None while timing is off
+        self._timings = None
+        # TimeSeriesProbes, see `add_time_series_probe`
+        self._probes = []
+
+    def enable_timing(self, window=256):
+        """
+        Start timing the stages of showing a frame: 'load' (reading the
+        frame and its statistics) and the stages timed by the
+        CrossSection, see `CrossSection.enable_timing`
+
+        Parameters
+        ----------
+        window : int, optional
+            Number of calls per stage the statistics are computed over
+
+        Returns
+        -------
+        timings : StageTimings
+        """
+        self._timings = self._xsection.enable_timing(window=window)
+        return self._timings
+
+    def disable_timing(self):
+        """
+        Stop timing, see `enable_timing`
+        """
+        self._xsection.disable_timing()
+        self._timings = None
+
+    @property
+    def timings(self):
+        """
+        The `StageTimings` being recorded, None if timing is off
+        """
+        return self._timings
 
     def update_cmap(self, cmap):
         self._xsection.update_cmap(cmap)
 
     def update_image(self, img_idx):
-        self._xsection.update_image(self._data_dict[self._key_list[img_idx]])
+        self.show_frame(img_idx, self.fetch_frame(img_idx))
+
+    def fetch_frame(self, img_idx):
+        """
+        Load frame img_idx (and what was computed from it in the
+        background) for `show_frame`.  Can be called from a worker thread,
+        as long as no other load of this view runs at the same time.
+
+        Parameters
+        ----------
+        img_idx : int
+
+        Returns
+        -------
+        loaded : object
+            To be passed on to `show_frame`
+        """
+        return self._fetch_frame(img_idx)
+
+    def show_frame(self, img_idx, loaded):
+        """
+        Show frame img_idx, loaded by `fetch_frame`
+
+        Parameters
+        ----------
+        img_idx : int
+        loaded : object
+            What `fetch_frame(img_idx)` returned
+        """
+        frame, limits, limit_func = loaded
+        self._xsection.update_image(frame, limits=limits,
+                                    limit_func=limit_func)
+        for probe in self._probes:
+            probe.set_frame(img_idx)
+
+    @property
+    def num_frames(self):
+        return len(self._key_list)
+
+    @property
+    def figure(self):
+        return self._fig
+
+    @property
+    def image_axes(self):
+        """
+        The axes the image is shown in
+        """
+        return self._xsection._im_ax
+
+    @property
+    def image_shape(self):
+        """
+        The shape of the image shown, None if there is none yet
+        """
+        imdata = self._xsection._imdata
+        return None if imdata is None else imdata.shape
+
+    @property
+    def cursor_active(self):
+        """
+        False while the cursor is frozen (by a click on the image)
+        """
+        return self._xsection.active
+
+    def set_track_motion(self, track):
+        """
+        Set whether the cursor follows the mouse, see
+        `CrossSection.set_track_motion`
+        """
+        self._xsection.set_track_motion(track)
+
+    def move_cursor(self, x, y):
+        """
+        Move the cursor to (x, y), in data coordinates, see
+        `CrossSection.move_cursor`
+        """
+        self._xsection.move_cursor(x, y)
+
+    def add_time_series_probe(self, ax, size=1, reduction='mean',
+                              **kwargs):
+        """
+        Plot the value of the pixel under the cursor (or of the box
+        around it) in every frame of the stack in `ax`.
+
+        The frames are read once, in the background, into a transposed
+        cache (see `xray_vision.backend.time_series.PixelSeriesCache`),
+        so moving to another pixel does not go back to the frames.
+
+        Parameters
+        ----------
+        ax : matplotlib.axes.Axes
+        size : int, optional
+            Edge of the box around the pixel.  Defaults to 1
+        reduction : {'mean', 'sum', 'max', 'min'}, optional
+            How the box is reduced.  Defaults to 'mean'
+        kwargs
+            Passed on to `PixelSeriesCache` (tile, block, max_memory...)
+
+        Returns
+        -------
+        probe : xray_vision.backend.mpl.time_series.TimeSeriesProbe
+        """
+        cache = PixelSeriesCache(ArrayFrameSource(_ViewFrames(self)),
+                                 **kwargs)
+        probe = TimeSeriesProbe(ax, cache, size=size, reduction=reduction)
+        self._xsection.add_cursor_position_cb(probe)
+        self._probes.append(probe)
+        return probe
+
+    def remove_time_series_probe(self, probe):
+        """
+        Remove a probe added with `add_time_series_probe` and free its
+        cache
+        """
+        self._probes.remove(probe)
+        self._xsection.remove_cursor_position_cb(probe)
+        probe.remove()
+        probe.cache.close()
+
+    @timed('load')
+    def _fetch_frame(self, img_idx):
+        """
+        Load frame img_idx and register its statistics
+
+        Returns
+        -------
+        frame : ndarray
+        limits : tuple or None
+            Its colour limits, if they were computed in the background
+        limit_func : callable or None
+            The limit function they were computed with
+        """
+        key = self._stats_key(img_idx)
+        # register the stats of the frame before handing it to the
+        # CrossSection so the limit functions can reuse them
+        if self._prefetching():
+            entry = self._prefetcher.get(img_idx)
+            self._stats_cache.add(key, entry.stats, entry.frame)
+            return entry.frame, entry.limits, entry.limit_func
+        # only load the frame once (it may come from disk)
+        frame = self._load_frame(img_idx)
+        self._stats_cache.get(key, frame)
+        return frame, None, None
+
+    def _load_frame(self, img_idx):
+        if self._virtual is not None:
+            return self._virtual.get_frame(img_idx)
+        return self._data_dict[self._key_list[img_idx]]
+
+    def _stats_key(self, img_idx):
+        """
+        The key the statistics of the displayed frame img_idx are cached
+        under
+        """
+        key = self._key_list[img_idx]
+        live = self.live_source
+        if live is self._virtual and live is not None:
+            # every frame is the same, changing, image
+            return (live.name, live.version)
+        if live is not None:
+            return (live.name, live.version, key)
+        if self._virtual is not None:
+            return (self._virtual.name, key)
+        return key
+
+    def _prefetching(self):
+        """
+        True if the frames are loaded through the pre-fetcher: it is on
+        and the source shown is neither live nor one which is best read
+        in order (see `FrameSource.prefetch`)
+        """
+        if self._prefetcher is None or self._live():
+            return False
+        source = self._virtual
+        if source is None:
+            source = getattr(self._data_dict, 'source', None)
+        return source is None or source.prefetch
+
+    def _live(self):
+        """
+        True if the displayed frames can change under us (e.g. a
+        projection which is still being computed)
+        """
+        return self.live_source is not None
+
+    @property
+    def live_source(self):
+        """
+        The frame source shown if its frames can change under us (e.g. a
+        projection which is still being computed, or frames from a
+        detector, see `xray_vision.backend.ring_buffer`), otherwise None.
+        Its `version` changes when they do, call `update_image` to show
+        the new frames.
+        """
+        source = self._virtual
+        if source is None:
+            source = getattr(self._data_dict, 'source', None)
+        if source is not None and source.live:
+            return source
+        return None
+
+    def set_rolling(self, window, reduction='mean'):
+        """
+        Show the sliding-window mean or sum of `window` frames centred on
+        the current frame instead of the frame itself.  Stepping through
+        the stack updates the window incrementally, see
+        `xray_vision.backend.virtual_frames.RollingFrameSource`.
+
+        This does not redraw, call `update_image` to show the new frames.
+
+        Parameters
+        ----------
+        window : int
+            Number of frames to combine.  1 shows the plain frames
+        reduction : {'mean', 'sum'}, optional
+            Defaults to 'mean'
+        """
+        if window is None or window <= 1:
+            self._set_virtual(None)
+        else:
+            self._set_virtual(RollingFrameSource(
+                ArrayFrameSource(_ViewFrames(self)), window,
+                reduction=reduction))
+
+    def set_projection(self, reduction, start=None, stop=None,
+                       chunk_size=16, max_workers=None, callback=None):
+        """
+        Show the max, sum, mean or standard deviation of a range of frames
+        (of all of them by default) instead of the current frame.
+
+        The projection is computed in chunks on a pool of threads, in the
+        background.  Until it is done, `update_image` shows the projection
+        of the frames reduced so far; `projection.version` is bumped every
+        time that improves and `callback`, if given, is called (from a
+        worker thread, so GUI code must hand it over to the GUI thread).
+        See `xray_vision.backend.virtual_frames.StackProjection`.
+
+        This does not redraw, call `update_image` to show the projection.
+
+        Parameters
+        ----------
+        reduction : {'max', 'sum', 'mean', 'std'} or None
+            None goes back to showing the plain frames
+        start, stop : int, optional
+            The range of frame indices to project
+        chunk_size : int, optional
+            Number of frames per work unit. Defaults to 16
+        max_workers : int, optional
+            Number of threads.  Defaults to the number of CPUs
+        callback : callable, optional
+            ``callback(projection)``, called as the chunks finish
+
+        Returns
+        -------
+        projection : StackProjection or None
+        """
+        if reduction is None:
+            self._set_virtual(None)
+            return None
+        projection = StackProjection(
+            ArrayFrameSource(_ViewFrames(self)), reduction,
+            start=start or 0, stop=stop, chunk_size=chunk_size,
+            max_workers=max_workers, callback=callback)
+        self._set_virtual(projection)
+        return projection.start()
+
+    @property
+    def projection(self):
+        """
+        The `StackProjection` being shown, None if there is none
+        """
+        if isinstance(self._virtual, StackProjection):
+            return self._virtual
+        return None
+
+    def _set_virtual(self, virtual):
+        if isinstance(self._virtual, StackProjection):
+            # don't keep the workers busy on something no one will look at
+            self._virtual.cancel()
+        self._virtual = virtual
+        if virtual is not None:
+            # anything cached under this name may predate a data change
+            self._stats_cache.invalidate(
+                [k for k in self._stats_cache
+                 if isinstance(k, tuple) and k[:1] == (virtual.name,)])
+        if self._prefetcher is not None:
+            # the cached frames are the old kind
+            self._prefetcher.clear()
+
+    @property
+    def prefetcher(self):
+        """
+        The `xray_vision.backend.prefetch.FramePrefetcher` (which has the
+        hit/miss counters), None if pre-fetching is off
+        """
+        return self._prefetcher
+
+    def set_prefetch_depth(self, depth):
+        """
+        Set how many frames to load ahead of the displayed one
+
+        Parameters
+        ----------
+        depth : int
+            0 turns pre-fetching off
+        """
+        if depth <= 0:
+            if self._prefetcher is not None:
+                self._prefetcher.shutdown()
+            self._prefetcher = None
+        elif self._prefetcher is None:
+            self._prefetcher = FramePrefetcher(
+                self._load_frame, len(self._key_list), depth=depth,
+                limit_func=self._xsection._limit_func,
+                mask=self._frames_mask())
+        else:
+            self._prefetcher.depth = depth
+
+    def _data_changed(self, lbl_list=None):
+        """
+        Drop everything cached about the frames in lbl_list (all frames if
+        None)
+        """
+        if self._virtual is not None:
+            # virtual frames depend on their neighbours too
+            self._virtual.reset()
+            lbl_list = None
+        self._stats_cache.invalidate(lbl_list)
+        for probe in self._probes:
+            probe.cache.reset()
+            probe.refresh()
+        if self._prefetcher is not None:
+            # frame indices may have moved, start over
+            self._prefetcher.clear()
+            self._prefetcher.num_frames = len(self._key_list)
+
+    def memory_usage(self):
+        """
+        Memory (in bytes) used for the displayed frame and the frames held
+        around it
+
+        Returns
+        -------
+        usage : dict
+            The entries of `CrossSection.memory_usage`, plus 'prefetch' for
+            the other frames loaded around the displayed one, 'dtype' of
+            the displayed frame and 'total'
+        """
+        usage = self._xsection.memory_usage()
+        usage['prefetch'] = 0
+        if self._prefetching():
+            # the displayed frame is in the pre-fetcher cache too
+            usage['prefetch'] = max(
+                self._prefetcher.nbytes - usage['image'], 0)
+        usage['total'] = sum(usage.values())
+        imdata = self._xsection._imdata
+        usage['dtype'] = None if imdata is None else imdata.dtype
+        return usage
+
+    def frame_stats(self, img_idx):
+        """
+        Return the statistics of a (displayed, so possibly virtual) frame,
+        computing them only if they are not already cached
+
+        Parameters
+        ----------
+        img_idx : int
+            The index of the frame in the key list
+
+        Returns
+        -------
+        stats : xray_vision.backend.stats.FrameStats
+        """
+        key = self._stats_key(img_idx)
+        if key in self._stats_cache:
+            # don't (re)load the frame if we don't have to
+            return self._stats_cache.get(key)
+        return self._stats_cache.get(key, self._load_frame(img_idx))
+
+    def add_data(self, lbl_list, xy_list, corners_list=None, position=None):
+        """
+        See `AbstractDataView2D.add_data`.  Also drops what is cached
+        about the affected frames
+        """
+        super(CrossSection2DView, self).add_data(
+            lbl_list, xy_list, corners_list=corners_list, position=position)
+        self._data_changed(lbl_list)
+
+    def append_data(self, lbl_list, xy_list, axis=[], append_to_end=[]):
+        """
+        See `AbstractDataView2D.append_data`.  Also drops what is cached
+        about the affected frames
+        """
+        super(CrossSection2DView, self).append_data(
+            lbl_list, xy_list, axis=axis, append_to_end=append_to_end)
+        self._data_changed(lbl_list)
+
+    def remove_data(self, lbl_list):
+        """
+        See `AbstractDataView2D.remove_data`.  Also drops what is cached
+        about the affected frames
+        """
+        super(CrossSection2DView, self).remove_data(lbl_list)
+        self._data_changed(lbl_list)
+
+    def clear_data(self):
+        """
+        Clear all data and everything cached about it
+        """
+        super(CrossSection2DView, self).clear_data()
+        self._data_changed()
 
     def replot(self):
         """
@@ -202,30 +1024,159 @@ class CrossSection2DView(AbstractDataView2D, AbstractMPLDataView):
         """
         self._xsection._update_artists()
 
+    def batch(self):
+        """
+        Context manager which holds back redrawing until the end of the
+        block, so any number of updates cost one recompute and one draw.
+        See `CrossSection.batch`
+        """
+        return self._xsection.batch()
+
+    def flush(self):
+        """
+        Redraw whatever the updates so far changed, see `CrossSection.flush`
+        """
+        self._xsection.flush()
+
+    def begin_batch(self):
+        """
+        See `CrossSection.begin_batch`
+        """
+        self._xsection.begin_batch()
+
+    def end_batch(self, flush=True):
+        """
+        See `CrossSection.end_batch`
+        """
+        self._xsection.end_batch(flush=flush)
+
     def update_norm(self, new_norm):
         """
         Update the way that matplotlib normalizes the image. Default is linear
         """
         self._xsection.update_norm(new_norm)
 
-    def set_limit_func(self, limit_func):
+    def set_limit_func(self, limit_func):
+        """
+        Set the function to use to determine the color scale
+
+        """
+        if self._prefetcher is not None:
+            self._prefetcher.limit_func = limit_func
+            self._prefetcher.clear_limits()
+        self._xsection.update_limit_func(limit_func)
+
+    def update_limit_region(self, region, max_pixels=None,
+                            sampling='stride'):
+        """
+        Set what the limit function is applied to, see
+        `CrossSection.update_limit_region`
+
+        Parameters
+        ----------
+        region : {'frame', 'visible'}
+        max_pixels : int, optional
+        sampling : {'stride', 'random'}, optional
+        """
+        self._xsection.update_limit_region(region, max_pixels=max_pixels,
+                                           sampling=sampling)
+
+    def _frames_mask(self):
+        """
+        The mask the statistics of the frames are computed with
+        """
+        return self._xsection.mask
+
+    def update_mask(self, mask):
+        """
+        Set the bad pixels, see `CrossSection.update_mask`.  Drops the
+        statistics (and pre-computed limits) cached with the old mask.
+
+        Parameters
+        ----------
+        mask : ndarray or BadPixelMask or None
+        """
+        self._xsection.begin_batch()
+        try:
+            self._xsection.update_mask(mask)
+            mask = self._frames_mask()
+            self._stats_cache.mask = mask
+            self._stats_cache.invalidate()
+            if self._prefetcher is not None:
+                self._prefetcher.mask = mask
+                self._prefetcher.clear()
+        finally:
+            self._xsection.end_batch(flush=self._xsection._auto_redraw)
+
+    def update_box_size(self, box_size):
+        """
+        Set the edge of the box around the cursor the readout covers, see
+        `CrossSection.update_box_size`
+
+        Parameters
+        ----------
+        box_size : int
+            0 turns the readout off
+        """
+        self._xsection.update_box_size(box_size)
+
+    def update_bad_color(self, color):
+        """
+        Set the colour bad pixels are drawn in
+
+        Parameters
+        ----------
+        color : color or None
+            None uses the bad colour of the colormap
+        """
+        self._xsection.update_bad_color(color)
+
+    def update_interpolation(self, interpolation):
+        """
+        Update the way that matplotlib interpolates the image. Default is none
+
+        Parameters
+        ----------
+        interpolation : str
+            Interpolation method to use. List of valid options can be found in
+            CrossSection2DView.interpolation
+        """
+        self._xsection.update_interpolation(interpolation)
+
+    def update_pyramid(self, pyramid):
+        """
+        Update how large images are down-sampled for display
+
+        Parameters
+        ----------
+        pyramid : {None, 'mean', 'max', 'min'}
+            None always draws the full resolution image
+        """
+        self._xsection.update_pyramid(pyramid)
+
+    def update_lut(self, lut):
         """
-        Set the function to use to determine the color scale
+        Turn lookup table colour mapping of integer frames on or off, see
+        `CrossSection`
 
+        Parameters
+        ----------
+        lut : bool
         """
-        self._xsection.update_limit_func(limit_func)
+        self._xsection.update_lut(lut)
 
-    def update_interpolation(self, interpolation):
+    def update_band(self, band_width, band_reduction=None):
         """
-        Update the way that matplotlib interpolates the image. Default is none
+        Update how many rows/columns the cross sections are taken over
 
         Parameters
         ----------
-        interpolation : str
-            Interpolation method to use. List of valid options can be found in
-            CrossSection2DView.interpolation
+        band_width : int
+            Number of rows (horizontal cut) and columns (vertical cut)
+        band_reduction : {'mean', 'sum', 'max'}, optional
+            How to reduce the band. Defaults to keeping the current one
         """
-        self._xsection.update_interpolation(interpolation)
+        self._xsection.update_band(band_width, band_reduction)
 
 
 def auto_redraw(func):
@@ -236,11 +1187,13 @@ def auto_redraw(func):
         if force_redraw is None:
             force_redraw = self._auto_redraw
 
-        ret = func(self, *args, **kwargs)
-
-        if force_redraw:
-            self._update_artists()
-            self._draw()
+        # setters calling other setters (e.g. update_image ->
+        # _init_artists) only draw once, at the end
+        self.begin_batch()
+        try:
+            ret = func(self, *args, **kwargs)
+        finally:
+            self.end_batch(flush=force_redraw)
 
         return ret
 
@@ -278,6 +1231,66 @@ class CrossSection(object):
     interpolation : str, optional
         Interpolation method to use. List of valid options can be found in
         CrossSection2DView.interpolation
+    pyramid : {None, 'mean', 'max', 'min'}, optional
+        If not None, hand the image artist a copy of the image reduced (by
+        this method) to roughly the resolution of the screen, picked from
+        the current view limits and the size of the axes.  The full
+        resolution image is used once zoomed in far enough, and the cross
+        sections always show full resolution data.  Defaults to None
+    cursor_rate : float, optional
+        If not None, the maximum rate (in Hz) at which mouse motion updates
+        the cross sections.  Motion events are coalesced and only the
+        latest cursor position is drawn on each tick.  Defaults to None,
+        which handles every motion event as it comes in.
+    cursor_cb_rate : float, optional
+        If not None, the maximum rate (in Hz) at which the cursor position
+        callbacks are called.  The latest position is always delivered.
+        Defaults to None, which calls them on every new row/column.
+    band_width : int, optional
+        Number of rows (columns) around the cursor the horizontal
+        (vertical) cross section is taken over.  Defaults to 1
+    band_reduction : {'mean', 'sum', 'max'}, optional
+        How the band is reduced to a cross section.  'mean' and 'sum' come
+        from cumulative sums computed once per frame, so a cursor move
+        costs the same for any band width.  'max' is computed from the
+        band on every move.  Defaults to 'mean'
+    lut : bool, optional
+        If True, colour-map unsigned integer images through a lookup table
+        built from `cmap` and `norm` (see
+        `xray_vision.backend.mpl.lut.ColormapLUT`) instead of passing them
+        through matplotlib's float pipeline.  Smoothing interpolations
+        then blend colours rather than values.  Defaults to False
+    limit_region : {'frame', 'visible'}, optional
+        What the limit function is applied to: the whole frame or only
+        the part of it visible in the image axes.  With 'visible' the
+        limits are recomputed `limit_delay` seconds after the last zoom or
+        pan.  Defaults to 'frame'
+    limit_pixels : int, optional
+        If not None, apply the limit function to a subsample of at most
+        this many pixels of the region (see
+        `xray_vision.backend.stats.subsample`, and `subsample_error` for
+        how far off the estimated limits can be).  Defaults to None
+    limit_sampling : {'stride', 'random'}, optional
+        How the subsample is picked.  Defaults to 'stride'
+    limit_delay : float, optional
+        Seconds without zooming or panning before the limits of the
+        visible region are recomputed.  Defaults to .25
+    mask : ndarray or BadPixelMask, optional
+        The bad (hot, dead...) pixels of the detector, True in a boolean
+        array of the image shape.  They are left out of the statistics
+        the limit functions work from, without copying the images (see
+        `xray_vision.backend.pixel_mask.BadPixelMask`), and drawn in
+        `bad_color`.  Ignored for images of another shape.  Defaults to
+        None
+    bad_color : color, optional
+        Colour of the bad pixels.  Defaults to the bad colour of the
+        colormap
+    box_size : int, optional
+        Edge of the box around the cursor whose sum, mean and max are
+        shown with the coordinates and passed to the box callbacks (see
+        `box_stats` and `add_box_stats_cb`).  The sum and mean come from
+        a summed-area table computed once per frame, so they cost the
+        same for any box size.  0 turns the readout off.  Defaults to 0
 
     Properties
     ----------
@@ -291,9 +1304,40 @@ class CrossSection(object):
 
     """
     def __init__(self, fig, cmap=None, norm=None,
-                 limit_func=None, auto_redraw=True, interpolation=None):
+                 limit_func=None, auto_redraw=True, interpolation=None,
+                 pyramid=None, cursor_rate=None, cursor_cb_rate=None,
+                 band_width=1, band_reduction='mean', lut=False,
+                 limit_region='frame', limit_pixels=None,
+                 limit_sampling='stride', limit_delay=.25, mask=None,
+                 bad_color=None, box_size=0):
 
         self._cursor_position_cbs = []
+        self._image_cbs = []
+        self._press_cbs = []
+        self._box_stats_cbs = []
+        # box readout, the summed-area tables are per-frame
+        self._check_box_size(box_size)
+        self._box_size = int(box_size)
+        self._box_tables = None
+        # coalescing of the motion events
+        self._cursor_rate = cursor_rate
+        self._cursor_cb_rate = cursor_cb_rate
+        self._cursor_timer = None
+        # False when something else (e.g. a LinkedViewGroup) moves the
+        # cursor, see `set_track_motion`
+        self._track_motion = True
+        self._pending_xy = None
+        self._pending_cb = None
+        self._last_cb_time = 0
+        # band cross sections, the cumulative sums are per-frame
+        self._check_band(band_width, band_reduction)
+        self._band_width = band_width
+        self._band_reduction = band_reduction
+        self._cumsums = None
+        # the part of the cross sections to draw for the current view, and
+        # what it was worked out for (see `_cut_layouts`)
+        self._cut_key = None
+        self._cut_layouts_ = None
         if interpolation is None:
             interpolation = _INTERPOLATION[0]
         self._interpolation = interpolation
@@ -312,11 +1356,41 @@ class CrossSection(object):
         self._norm = norm
         # save a copy of the limit function, we will need it later
         self._limit_func = limit_func
+        # what the limit function is applied to
+        self._check_limit_region(limit_region, limit_sampling)
+        self._limit_region = limit_region
+        self._limit_pixels = limit_pixels
+        self._limit_sampling = limit_sampling
+        self._limit_delay = limit_delay
+        self._limit_timer = None
+        # down-sampling of large images, built lazily per frame
+        self._pyramid_mode = pyramid
+        self._pyramid = None
+        self._im_level = 0
+        self._extent = None
+        # lookup table colour mapping of integer images
+        self._lut = ColormapLUT(cmap, norm) if lut else None
+        # bad pixels, and the 'max' pyramid of the boolean mask
+        self._mask = _as_mask(mask)
+        self._mask_pyramid = None
+        self._bad_color = bad_color
 
         # this is used by the widget logic
         self._active = True
-        self._dirty = True
-        self._cb_dirty = True
+        # what has to be recomputed (see _ASPECTS) and, once it has been,
+        # what has to be redrawn
+        self._invalid = set(_ASPECTS)
+        self._stale = set()
+        # the colour limits in use
+        self._vlim = None
+        # (limit function, limits) of the image, if known from elsewhere
+        self._image_limits = None
+        # nesting of begin_batch/end_batch and whether a flush was held
+        # back by it
+        self._batch_depth = 0
+        self._flush_pending = False
+        # StageTimings, None while timing is off
+        self._timings = None
 
         # work on setting up the mpl axes
 
@@ -347,7 +1421,8 @@ class CrossSection(object):
         self._im_ax.xaxis.set_major_locator(NullLocator())
         self._im_ax.yaxis.set_major_locator(NullLocator())
         self._imdata = None
-        self._im = self._im_ax.imshow([[]], cmap=self._cmap, norm=self._norm,
+        self._im = self._im_ax.imshow([[]], cmap=self._colormap(),
+                                      norm=self._norm,
                         interpolation=self._interpolation,
                                       aspect='equal', vmin=0,
                                       vmax=1)
@@ -364,6 +1439,9 @@ class CrossSection(object):
                                          sharey=self._im_ax)
         self._ax_v.xaxis.set_major_locator(LinearLocator(numticks=2))
         self._ax_cb = divider.append_axes('right', .2, pad=.5)
+        # re-pick the pyramid level when zooming/panning
+        self._im_ax.callbacks.connect('xlim_changed', self._view_changed)
+        self._im_ax.callbacks.connect('ylim_changed', self._view_changed)
         # add the color bar
         self._cb = fig.colorbar(self._im, cax=self._ax_cb)
 
@@ -390,6 +1468,10 @@ class CrossSection(object):
         # backgrounds for blitting
         self._ax_v_bk = None
         self._ax_h_bk = None
+        # area (tick labels included) each axes covered when last drawn,
+        # and a patch to blank it out with before drawing it again
+        self._drawn_bbox = {}
+        self._blank = _blank_patch(fig)
 
         # stash last-drawn row/col to skip if possible
         self._row = None
@@ -399,6 +1481,7 @@ class CrossSection(object):
         self._move_cid = None
         self._click_cid = None
         self._clear_cid = None
+        self._resize_cid = None
 
     def add_cursor_position_cb(self, callback):
         """ Add a callback for the cursor position in the main axes
@@ -411,6 +1494,261 @@ class CrossSection(object):
         """
         self._cursor_position_cbs.append(callback)
 
+    def remove_cursor_position_cb(self, callback):
+        """ Remove a callback added with `add_cursor_position_cb`
+        """
+        self._cursor_position_cbs.remove(callback)
+
+    def add_box_stats_cb(self, callback):
+        """ Add a callback for the statistics of the box around the cursor
+
+        Parameters
+        ----------
+        callback : callable(cc, rr, stats)
+            Function that gets called with the `BoxStats` of the box
+            around the cursor, along with the cursor position callbacks,
+            while the box readout is on (see `update_box_size`)
+        """
+        self._box_stats_cbs.append(callback)
+
+    def remove_box_stats_cb(self, callback):
+        """ Remove a callback added with `add_box_stats_cb`
+        """
+        self._box_stats_cbs.remove(callback)
+
+    @staticmethod
+    def _check_box_size(box_size):
+        if int(box_size) < 0:
+            raise ValueError("box_size must be at least 0, not "
+                             "{0}".format(box_size))
+
+    def update_box_size(self, box_size):
+        """
+        Set the edge of the box around the cursor the readout covers
+
+        Parameters
+        ----------
+        box_size : int
+            0 turns the readout off
+        """
+        self._check_box_size(box_size)
+        self._box_size = int(box_size)
+
+    def _integral_tables(self):
+        """
+        The summed-area tables of the image (computed once per frame): of
+        the values, with the bad and non-finite pixels zeroed, and of the
+        number of those left (None if there are none), and the mask of the
+        valid pixels (None if all are)
+        """
+        if self._box_tables is None:
+            data = self._imdata
+            valid = None
+            if data.dtype.kind in 'fc':
+                valid = np.isfinite(data)
+            mask = self._image_mask()
+            if mask is not None:
+                bad = mask.to_bool()
+                valid = ~bad if valid is None else valid & ~bad
+            if valid is not None and valid.all():
+                valid = None
+            if valid is None:
+                self._box_tables = (_integral_image(data), None, None)
+            else:
+                self._box_tables = (
+                    _integral_image(np.where(valid, data, 0)),
+                    _integral_image(valid.view(np.uint8)), valid)
+        return self._box_tables
+
+    def box_stats(self, row, col, box_size=None):
+        """
+        Sum, mean and max of the pixels of the image in the box centred on
+        (row, col), leaving out bad and non-finite (NaN, inf) pixels
+
+        Parameters
+        ----------
+        row, col : int
+        box_size : int, optional
+            Edge of the box, clipped at the edges of the image.  Defaults
+            to the size set by `update_box_size` (or 1 if that is 0)
+
+        Returns
+        -------
+        stats : BoxStats
+        """
+        if box_size is None:
+            box_size = self._box_size or 1
+        numrows, numcols = self._imdata.shape
+        half = (box_size - 1) // 2
+        r0, r1 = max(row - half, 0), min(row - half + box_size, numrows)
+        c0, c1 = max(col - half, 0), min(col - half + box_size, numcols)
+        sat, count_sat, valid = self._integral_tables()
+        total = _area_sum(sat, r0, r1, c0, c1)
+        if count_sat is None:
+            count = (r1 - r0) * (c1 - c0)
+            box_max = self._imdata[r0:r1, c0:c1].max()
+        else:
+            count = int(_area_sum(count_sat, r0, r1, c0, c1))
+            box = self._imdata[r0:r1, c0:c1]
+            box_max = box[valid[r0:r1, c0:c1]].max() if count else np.nan
+        mean = total / count if count else np.nan
+        return BoxStats(total, mean, box_max, count)
+
+    def add_image_cb(self, callback):
+        """ Add a callback for when the image data is replaced
+
+        Parameters
+        ----------
+        callback : callable(image)
+            Function that gets called with the new image after
+            `update_image`
+        """
+        self._image_cbs.append(callback)
+
+    def remove_image_cb(self, callback):
+        """ Remove a callback added with `add_image_cb`
+        """
+        self._image_cbs.remove(callback)
+
+    def add_press_cb(self, callback):
+        """ Add a callback for mouse button presses on the image
+
+        Parameters
+        ----------
+        callback : callable(event) -> bool
+            Function that gets called with the button press event before
+            the cursor is frozen / released.  If it returns True the press
+            is taken (e.g. to grab a handle) and the cursor is left alone
+        """
+        self._press_cbs.append(callback)
+
+    def remove_press_cb(self, callback):
+        """ Remove a callback added with `add_press_cb`
+        """
+        self._press_cbs.remove(callback)
+
+    @auto_redraw
+    def update_overlays(self):
+        """
+        Redraw the image axes after artists added to them (e.g. by a tool)
+        changed
+        """
+        self._invalidate('overlay')
+
+    def set_cursor_rates(self, cursor_rate=None, cursor_cb_rate=None):
+        """
+        Set the maximum rates at which cursor motion is handled
+
+        Parameters
+        ----------
+        cursor_rate : float, optional
+            Maximum rate (Hz) of cross section updates. None to update on
+            every motion event
+        cursor_cb_rate : float, optional
+            Maximum rate (Hz) at which the cursor position callbacks are
+            called.  None to call them on every new row/column
+        """
+        self._cursor_rate = cursor_rate
+        self._cursor_cb_rate = cursor_cb_rate
+        if self._cursor_timer is not None:
+            self._cursor_timer.stop()
+            self._cursor_timer = None
+        # deliver anything that was being held back
+        self._on_cursor_tick()
+
+    def _tick_interval(self):
+        """
+        Timer interval (ms) for the fastest of the throttled rates
+        """
+        rates = [r for r in (self._cursor_rate, self._cursor_cb_rate) if r]
+        return max(1, int(1000 / max(rates)))
+
+    def _start_cursor_timer(self):
+        if self._fig.canvas is None:
+            return
+        if self._cursor_timer is None:
+            self._cursor_timer = self._fig.canvas.new_timer(
+                interval=self._tick_interval())
+            self._cursor_timer.add_callback(self._on_cursor_tick)
+            self._cursor_timer.start()
+
+    def _on_cursor_tick(self):
+        """
+        Timer callback which handles the latest held back cursor position
+        and callback dispatch
+        """
+        if self._pending_xy is not None:
+            x, y = self._pending_xy
+            self._pending_xy = None
+            self._update_cursor(x, y)
+        if self._pending_cb is not None:
+            self._dispatch_cursor_cbs(*self._pending_cb)
+        if (self._pending_xy is None and self._pending_cb is None and
+                self._cursor_timer is not None):
+            # nothing left to do, stop ticking until the next event
+            self._cursor_timer.stop()
+            self._cursor_timer = None
+
+    def _dispatch_cursor_cbs(self, col, row):
+        """
+        Call the cursor position callbacks, unless they were called less
+        than 1 / cursor_cb_rate ago in which case the position is held
+        back for the timer
+        """
+        if self._cursor_cb_rate:
+            now = time.time()
+            if now - self._last_cb_time < 1 / self._cursor_cb_rate:
+                self._pending_cb = (col, row)
+                self._start_cursor_timer()
+                return
+            self._last_cb_time = now
+        self._pending_cb = None
+        for cb in self._cursor_position_cbs:
+            cb(col, row)
+        if self._box_size and self._box_stats_cbs:
+            stats = self.box_stats(row, col)
+            for cb in self._box_stats_cbs:
+                cb(col, row, stats)
+
+    def set_track_motion(self, track):
+        """
+        Set whether the cursor follows the mouse over the image axes.
+        Turn it off to drive the cursor from elsewhere with `move_cursor`
+        (see `xray_vision.backend.mpl.linked_views.LinkedViewGroup`).
+
+        Parameters
+        ----------
+        track : bool
+        """
+        self._track_motion = track
+        canvas = self._fig.canvas
+        if canvas is None or self._cur is None:
+            # not connected yet, `_connect_callbacks` takes care of it
+            return
+        if not track and self._move_cid is not None:
+            canvas.mpl_disconnect(self._move_cid)
+            self._move_cid = None
+        elif track and self._move_cid is None:
+            self._move_cid = canvas.mpl_connect('motion_notify_event',
+                                                self._move_cb)
+
+    def move_cursor(self, x, y):
+        """
+        Move the cursor (and with it the cross sections) to (x, y), in data
+        coordinates, as if the mouse had moved there
+
+        Parameters
+        ----------
+        x, y : float
+            Column and row, None for both to redraw at the current position
+        """
+        if not self._active:
+            return
+        if x is None or y is None:
+            self._move_cb(None)
+        else:
+            self._update_cursor(x, y)
+
     # set up the call back for the updating the side axes
     def _move_cb(self, event):
         if not self._active:
@@ -425,6 +1763,22 @@ class CrossSection(object):
             if event.inaxes is not self._im_ax:
                 return
             x, y = event.xdata, event.ydata
+            if self._cursor_rate:
+                # only remember where the cursor is, the timer draws the
+                # latest position
+                self._pending_xy = (x, y)
+                self._start_cursor_timer()
+                return
+        self._update_cursor(x, y)
+
+    @timed('cursor')
+    def _update_cursor(self, x, y):
+        """
+        Update the cross sections for the cursor at (x, y), in data
+        coordinates
+        """
+        if self._imdata is None:
+            return
         numrows, numcols = self._imdata.shape
         if x is not None and y is not None:
             self._ln_h.set_visible(True)
@@ -435,22 +1789,89 @@ class CrossSection(object):
                 if 0 <= col < numcols and 0 <= row < numrows:
                     self._col = col
                     self._row = row
-                    for cb in self._cursor_position_cbs:
-                        cb(col, row)
-                    for data, ax, bkg, art, set_fun in zip(
-                            (self._imdata[row, :], self._imdata[:, col]),
+                    self._dispatch_cursor_cbs(col, row)
+                    (h_cut, v_cut), (h_pos, v_pos) = self._drawn_cuts(
+                        row, col)
+                    for xy, ax, bkg, art in zip(
+                            ((h_pos, h_cut), (v_cut, v_pos)),
                             (self._ax_h, self._ax_v),
                             (self._ax_h_bk, self._ax_v_bk),
-                            (self._ln_h, self._ln_v),
-                            (self._ln_h.set_ydata, self._ln_v.set_xdata)):
+                            (self._ln_h, self._ln_v)):
                         self._fig.canvas.restore_region(bkg)
-                        set_fun(data)
+                        art.set_data(*xy)
                         ax.draw_artist(art)
                         self._fig.canvas.blit(ax.bbox)
 
+    def _cut_layouts(self):
+        """
+        The columns (rows) of the image the horizontal (vertical) cross
+        section is drawn over, the visible ones plus a margin, and how
+        (see `_cut_layout`).  Worked out again when the view limits, the
+        size of the axes or the image shape change.
+        """
+        key = (self._imdata.shape, self._im_ax.get_xlim(),
+               self._im_ax.get_ylim(), self._ax_h.bbox.width,
+               self._ax_v.bbox.height)
+        if key != self._cut_key:
+            numrows, numcols = self._imdata.shape
+            rows, cols = self._visible_slices()
+            cols = _grow_slice(cols, _CUT_MARGIN, numcols)
+            rows = _grow_slice(rows, _CUT_MARGIN, numrows)
+            self._cut_layouts_ = (
+                (cols,) + _cut_layout(cols, self._ax_h.bbox.width),
+                (rows,) + _cut_layout(rows, self._ax_v.bbox.height))
+            self._cut_key = key
+        return self._cut_layouts_
+
+    def _drawn_cuts(self, row, col):
+        """
+        The parts of the horizontal and vertical cross sections through
+        (row, col) to draw for the current view, and their positions
+        """
+        (cols, h_starts, h_pos), (rows, v_starts, v_pos) = (
+            self._cut_layouts())
+        h_cut, v_cut = self._cuts(row, col, cols, rows)
+        if h_starts is not None:
+            h_cut = _minmax_decimate(h_cut, h_starts)
+        if v_starts is not None:
+            v_cut = _minmax_decimate(v_cut, v_starts)
+        return (h_cut, v_cut), (h_pos, v_pos)
+
+    def _cuts(self, row, col, cols=slice(None), rows=slice(None)):
+        """
+        The horizontal and vertical cross sections through (row, col),
+        over the columns `cols` and the rows `rows` respectively
+        """
+        if self._band_width <= 1:
+            return self._imdata[row, cols], self._imdata[rows, col]
+        if self._cumsums is None and self._band_reduction != 'max':
+            # once per frame, every cursor move after this is O(width)
+            self._cumsums = (_cumsum_rows(self._imdata),
+                             _cumsum_rows(self._imdata.T))
+        h_cs, v_cs = self._cumsums or (None, None)
+        if h_cs is not None:
+            h_cs = tuple(None if a is None else a[:, cols] for a in h_cs)
+            v_cs = tuple(None if a is None else a[:, rows] for a in v_cs)
+        return (_band_cut(h_cs, self._imdata[:, cols], row, self._band_width,
+                          self._band_reduction),
+                _band_cut(v_cs, self._imdata.T[:, rows], col,
+                          self._band_width, self._band_reduction))
+
+    @staticmethod
+    def _check_band(band_width, band_reduction):
+        if int(band_width) < 1:
+            raise ValueError("band_width must be at least 1, not "
+                             "{0}".format(band_width))
+        if band_reduction not in _BAND_REDUCTIONS:
+            raise ValueError("band_reduction must be one of {0}, not "
+                             "{1!r}".format(_BAND_REDUCTIONS, band_reduction))
+
     def _click_cb(self, event):
         if event.inaxes is not self._im_ax:
             return
+        for cb in self._press_cbs:
+            if cb(event):
+                return
         self.active = not self.active
         if self.active:
             self._cur.onmove(event)
@@ -463,16 +1884,20 @@ class CrossSection(object):
         """
         self._disconnect_callbacks()
         self._cur = Cursor(self._im_ax, useblit=True, color='red', linewidth=2)
-        self._move_cid = self._fig.canvas.mpl_connect('motion_notify_event',
-                                                      self._move_cb)
+        if self._track_motion:
+            self._move_cid = self._fig.canvas.mpl_connect(
+                'motion_notify_event', self._move_cb)
 
         self._click_cid = self._fig.canvas.mpl_connect('button_press_event',
                                                        self._click_cb)
 
         self._clear_cid = self._fig.canvas.mpl_connect('draw_event',
                                                        self._clear)
+
+        self._resize_cid = self._fig.canvas.mpl_connect('resize_event',
+                                                        self._view_changed)
         self._fig.tight_layout()
-        self._fig.canvas.draw()
+        self._invalidate('layout')
 
     def _disconnect_callbacks(self):
         """
@@ -484,14 +1909,20 @@ class CrossSection(object):
             self._move_cid = None
             self._clear_cid = None
             self._click_cid = None
+            self._resize_cid = None
             return
 
-        for atr in ('_move_cid', '_clear_cid', '_click_cid'):
+        for atr in ('_move_cid', '_clear_cid', '_click_cid', '_resize_cid'):
             cid = getattr(self, atr, None)
             if cid is not None:
                 self._fig.canvas.mpl_disconnect(cid)
                 setattr(self, atr, None)
 
+        if self._cursor_timer is not None:
+            self._cursor_timer.stop()
+            self._cursor_timer = None
+        self._stop_limit_timer()
+
         # clean up the cursor
         if self._cur is not None:
             self._cur.disconnect_events()
@@ -520,8 +1951,10 @@ class CrossSection(object):
         self._imdata = init_image
 
         # update the extent of the image artist
-        self._im.set_extent([-0.5, im_shape[1] + .5,
-                             im_shape[0] + .5, -0.5])
+        self._extent = [-0.5, im_shape[1] + .5,
+                        im_shape[0] + .5, -0.5]
+        self._im.set_extent(self._extent)
+        self._im_level = 0
 
         # update the limits of the image axes to match the exent
         self._im_ax.set_xlim([-.05, im_shape[1] + .5])
@@ -539,7 +1972,16 @@ class CrossSection(object):
             if col >= 0 and col < numcols and row >= 0 and row < numrows:
                 # if it does, grab the value
                 z = self._imdata[row, col]
-                return "X: {x:d} Y: {y:d} I: {i:.2f}".format(x=col, y=row, i=z)
+                text = "X: {x:d} Y: {y:d} I: {i:.2f}".format(x=col, y=row,
+                                                            i=z)
+                if self._box_size:
+                    stats = self.box_stats(row, col)
+                    text += (" [{n}x{n}] sum: {s:.6g} mean: {m:.6g} "
+                             "max: {x:.6g}".format(n=self._box_size,
+                                                   s=stats.sum,
+                                                   m=stats.mean,
+                                                   x=stats.max))
+                return text
             else:
                 return "X: {x:d} Y: {y:d}".format(x=col, y=row)
 
@@ -558,14 +2000,24 @@ class CrossSection(object):
         # if we have a cavas, then connect/set up junk
         if self._fig.canvas is not None:
             self._connect_callbacks()
-        # mark as dirty
-        self._dirty = True
+        self._invalidate('data', 'layout')
 
     def _clear(self, event):
-        self._ax_v_bk = self._fig.canvas.copy_from_bbox(self._ax_v.bbox)
-        self._ax_h_bk = self._fig.canvas.copy_from_bbox(self._ax_h.bbox)
+        self._capture_backgrounds()
         self._ln_h.set_visible(False)
         self._ln_v.set_visible(False)
+        renderer = getattr(event, 'renderer', None)
+        if renderer is not None:
+            self._drawn_bbox = dict(
+                (ax, ax.get_tightbbox(renderer))
+                for ax in (self._im_ax, self._ax_h, self._ax_v, self._ax_cb))
+
+    def _capture_backgrounds(self):
+        """
+        Save what is under the animated artists, for blitting
+        """
+        self._ax_v_bk = self._fig.canvas.copy_from_bbox(self._ax_v.bbox)
+        self._ax_h_bk = self._fig.canvas.copy_from_bbox(self._ax_h.bbox)
         # this involves reaching in and touching the guts of the
         # cursor widget.  The problem is that the mpl widget
         # skips updating it's saved background if the widget is inactive
@@ -592,9 +2044,60 @@ class CrossSection(object):
         Set the interpolation method
 
         """
-        self._dirty = True
+        self._invalidate('image')
         self._im.set_interpolation(interpolation)
 
+    @auto_redraw
+    def update_pyramid(self, pyramid):
+        """
+        Set how large images are down-sampled for display
+
+        Parameters
+        ----------
+        pyramid : {None, 'mean', 'max', 'min'}
+            None always draws the full resolution image
+        """
+        if pyramid is not None and pyramid not in ImagePyramid.reductions:
+            raise ValueError("pyramid must be None or one of {0}, not "
+                             "{1!r}".format(ImagePyramid.reductions, pyramid))
+        self._pyramid_mode = pyramid
+        self._pyramid = None
+        self._invalidate('image')
+
+    @auto_redraw
+    def update_lut(self, lut):
+        """
+        Turn lookup table colour mapping of integer images on or off
+
+        Parameters
+        ----------
+        lut : bool
+        """
+        self._lut = ColormapLUT(self._cmap, self._norm) if lut else None
+        self._invalidate('image')
+
+    @auto_redraw
+    def update_band(self, band_width, band_reduction=None):
+        """
+        Set how many rows/columns the cross sections are taken over
+
+        Parameters
+        ----------
+        band_width : int
+            Number of rows (horizontal cut) and columns (vertical cut)
+        band_reduction : {'mean', 'sum', 'max'}, optional
+            How to reduce the band. Defaults to keeping the current one
+        """
+        if band_reduction is None:
+            band_reduction = self._band_reduction
+        self._check_band(band_width, band_reduction)
+        self._band_width = int(band_width)
+        self._band_reduction = band_reduction
+        # the sum changes the range of the cross sections
+        self._invalidate('cuts')
+        # redraw the cuts at the current cursor position
+        self._move_cb(None)
+
     @auto_redraw
     def update_cmap(self, cmap):
         """
@@ -602,21 +2105,103 @@ class CrossSection(object):
         """
         # TODO: this should stash new value, not apply it
         self._cmap = cmap
-        self._dirty = True
+        if self._lut is not None:
+            self._lut.update(self._cmap, self._norm)
+        self._invalidate('cmap')
+
+    @property
+    def mask(self):
+        """
+        The `BadPixelMask` of the bad pixels, None if there is none
+        """
+        return self._mask
+
+    @auto_redraw
+    def update_mask(self, mask):
+        """
+        Set the bad pixels
+
+        Parameters
+        ----------
+        mask : ndarray or BadPixelMask or None
+            True (in a boolean array of the image shape) for the bad
+            pixels.  None shows all pixels
+        """
+        self._mask = _as_mask(mask)
+        self._mask_pyramid = None
+        self._box_tables = None
+        # may have been computed with the old mask
+        self._image_limits = None
+        self._invalidate('data')
+
+    @auto_redraw
+    def update_bad_color(self, color):
+        """
+        Set the colour the bad pixels are drawn in
+
+        Parameters
+        ----------
+        color : color or None
+            None uses the bad colour of the colormap
+        """
+        self._bad_color = color
+        self._invalidate('cmap')
+
+    def _colormap(self):
+        """
+        The colormap, with the bad colour if one is set
+        """
+        if self._bad_color is None:
+            return self._cmap
+        return _with_bad(self._cmap, self._bad_color)
 
+    def _image_mask(self):
+        """
+        The mask of the displayed image, None if there is none (or it is
+        for images of another shape)
+        """
+        if (self._mask is None or self._imdata is None or
+                self._mask.shape != self._imdata.shape):
+            return None
+        return self._mask
+
+    @timed('update_image')
     @auto_redraw
-    def update_image(self, image):
+    def update_image(self, image, limits=None, limit_func=None):
         """
         Set the image data
 
         The input data does not necessarily have to be the same shape as the
         original image
+
+        Parameters
+        ----------
+        image : ndarray
+        limits : tuple, optional
+            The colour limits of the whole image, if they are already
+            known (e.g. computed by a pre-fetcher in the background).  They
+            are used instead of running the limit function as long as
+            `limit_func` is the current one and the limits are computed
+            over the whole image
+        limit_func : callable, optional
+            The limit function `limits` came from.  Defaults to the
+            current one
         """
         if self._imdata is None or self._imdata.shape != image.shape:
             self._init_artists(image)
         self._imdata = image
+        self._image_limits = None
+        if limits is not None:
+            if limit_func is None:
+                limit_func = self._limit_func
+            self._image_limits = (limit_func, tuple(limits))
+        self._pyramid = None
+        self._cumsums = None
+        self._box_tables = None
         self._move_cb(None)
-        self._dirty = True
+        self._invalidate('data')
+        for cb in self._image_cbs:
+            cb(image)
 
     @auto_redraw
     def update_norm(self, norm):
@@ -624,8 +2209,74 @@ class CrossSection(object):
         Update the way that matplotlib normalizes the image
         """
         self._norm = norm
-        self._dirty = True
-        self._cb_dirty = True
+        if self._lut is not None:
+            self._lut.update(self._cmap, self._norm)
+        self._invalidate('norm', 'colorbar')
+
+    @staticmethod
+    def _check_limit_region(region, sampling):
+        if region not in _LIMIT_REGIONS:
+            raise ValueError("limit_region must be one of {0}, not "
+                             "{1!r}".format(_LIMIT_REGIONS, region))
+        if sampling not in ('stride', 'random'):
+            raise ValueError("limit_sampling must be 'stride' or 'random', "
+                             "not {0!r}".format(sampling))
+
+    @auto_redraw
+    def update_limit_region(self, region, max_pixels=None,
+                            sampling='stride'):
+        """
+        Set what the limit function is applied to
+
+        Parameters
+        ----------
+        region : {'frame', 'visible'}
+            The whole frame or only the part visible in the image axes
+        max_pixels : int, optional
+            Estimate the limits from a subsample of at most this many
+            pixels of the region.  None uses all of them
+        sampling : {'stride', 'random'}, optional
+            How the subsample is picked, see
+            `xray_vision.backend.stats.subsample`
+        """
+        self._check_limit_region(region, sampling)
+        self._limit_region = region
+        self._limit_pixels = max_pixels
+        self._limit_sampling = sampling
+        self._invalidate('limits')
+
+    @auto_redraw
+    def refresh_limits(self):
+        """
+        Recompute the limits (e.g. of the visible region, without waiting
+        for the zoom/pan timer)
+        """
+        self._stop_limit_timer()
+        self._invalidate('limits')
+
+    def _schedule_limits(self):
+        """
+        (Re)start the countdown to recomputing the limits of the visible
+        region, so a zoom or pan only recomputes them once it is over
+        """
+        if self._fig.canvas is None:
+            return
+        if not self._limit_delay:
+            self.refresh_limits()
+            return
+        if self._limit_timer is None:
+            self._limit_timer = self._fig.canvas.new_timer(
+                interval=int(self._limit_delay * 1000))
+            self._limit_timer.single_shot = True
+            self._limit_timer.add_callback(self.refresh_limits)
+        else:
+            self._limit_timer.stop()
+        self._limit_timer.start()
+
+    def _stop_limit_timer(self):
+        if self._limit_timer is not None:
+            self._limit_timer.stop()
+            self._limit_timer = None
 
     @auto_redraw
     def update_limit_func(self, limit_func):
@@ -634,45 +2285,402 @@ class CrossSection(object):
         """
         # set the new function to use for computing the color limits
         self._limit_func = limit_func
-        self._dirty = True
+        self._invalidate('limits')
+
+    def memory_usage(self):
+        """
+        Memory (in bytes) used for the displayed image
+
+        Returns
+        -------
+        usage : dict
+            'image' is the image itself, in its own dtype, 'pyramid' the
+            down-sampled copies, 'cuts' the cumulative sums behind the band
+            cross sections, 'rgba' the lookup table colour mapping
+            buffers, 'mask' the bad pixel mask and 'box' the summed-area
+            tables of the box readout
+        """
+        usage = {'image': 0, 'pyramid': 0, 'cuts': 0, 'rgba': 0, 'mask': 0,
+                 'box': 0}
+        if self._imdata is not None:
+            usage['image'] = self._imdata.nbytes
+        if self._pyramid is not None:
+            usage['pyramid'] = self._pyramid.nbytes
+        if self._cumsums is not None:
+            usage['cuts'] = sum(a.nbytes for cs in self._cumsums
+                                for a in cs if a is not None)
+        if self._lut is not None:
+            usage['rgba'] = self._lut.nbytes
+        if self._box_tables is not None:
+            usage['box'] = sum(a.nbytes for a in self._box_tables
+                               if a is not None)
+        if self._mask is not None:
+            usage['mask'] = self._mask.nbytes
+            if self._mask_pyramid is not None:
+                usage['mask'] += self._mask_pyramid.nbytes
+        return usage
+
+    def enable_timing(self, timings=None, window=256):
+        """
+        Start recording how long the stages of showing a frame take:
 
+        - 'update_image' : all of `update_image`, including the stages below
+        - 'limits' : the limit function
+        - 'set_data' : handing the image to matplotlib (including the
+          colour mapping when using a lookup table)
+        - 'update_artists' : bringing the artists up to date, including
+          'limits' and 'set_data'
+        - 'draw' : drawing (the colour mapping happens here without a
+          lookup table)
+        - 'cursor' : updating and blitting the cross sections when the
+          cursor moves
+
+        While timing is off the timed methods are called directly.
+
+        Parameters
+        ----------
+        timings : StageTimings, optional
+            Record into this one (e.g. shared with the view), defaults to a
+            new one
+        window : int, optional
+            Number of calls per stage the statistics are computed over,
+            when making a new `StageTimings`
+
+        Returns
+        -------
+        timings : StageTimings
+        """
+        if timings is None:
+            timings = StageTimings(window=window)
+        self._timings = timings
+        return timings
+
+    def disable_timing(self):
+        """
+        Stop timing, see `enable_timing`
+        """
+        self._timings = None
+
+    @property
+    def timings(self):
+        """
+        The `StageTimings` being recorded, None if timing is off
+        """
+        return self._timings
+
+    def begin_batch(self):
+        """
+        Start collecting changes: until the matching `end_batch` the
+        setters only record what they invalidate, nothing is recomputed
+        or drawn.  Batches can be nested, only the outermost one flushes.
+        """
+        self._batch_depth += 1
+
+    def end_batch(self, flush=True):
+        """
+        End a batch started by `begin_batch`.  Ending the outermost batch
+        recomputes and redraws whatever the batched changes invalidated,
+        once.
+
+        Parameters
+        ----------
+        flush : bool, optional
+            If False only flush if something in the batch asked for it
+            (e.g. a setter with auto redraw on).  Defaults to True
+        """
+        if not self._batch_depth:
+            raise RuntimeError("end_batch called without a matching "
+                               "begin_batch")
+        self._batch_depth -= 1
+        if flush or (not self._batch_depth and self._flush_pending):
+            self.flush()
+
+    @contextmanager
+    def batch(self):
+        """
+        Context manager around `begin_batch` / `end_batch`::
+
+            with xsection.batch():
+                xsection.update_cmap('viridis')
+                xsection.update_norm(LogNorm())
+                xsection.update_image(im)
+
+        does one pass of the limit function and one draw, instead of
+        one per call.
+        """
+        self.begin_batch()
+        try:
+            yield self
+        finally:
+            self.end_batch()
+
+    def flush(self):
+        """
+        Recompute whatever is out of date and redraw the axes it affects.
+        Inside a batch this is held back until the batch ends.
+        """
+        if self._batch_depth:
+            self._flush_pending = True
+            return
+        self._flush_pending = False
+        self._update_artists()
+        self._draw()
+
+    def _invalidate(self, *aspects):
+        """
+        Mark parts of the figure as out of date, see `_ASPECTS`
+        """
+        self._invalid.update(aspects)
+
+    @timed('update_artists')
     def _update_artists(self):
         """
-        Updates the figure by re-drawing
+        Bring the artists up to date with whatever was invalidated,
+        recomputing only what depends on it, and note which axes have to
+        be redrawn
         """
+        invalid = self._invalid
         # if the figure is not dirty, short-circuit
-        if not (self._dirty or self._cb_dirty):
+        if not invalid:
             return
-
-        # this is a tuple which is the max/min used in the color mapping.
-        # these values are also used to set the limits on the value
-        # axes of the parasite axes
-        # value_limits
-        vlim = self._limit_func(self._imdata)
-        # set the color bar limits
-        self._im.set_clim(vlim)
-        self._norm.vmin, self._norm.vmax = vlim
-        # set the cross section axes limits
-        self._ax_v.set_xlim(*vlim[::-1])
-        self._ax_h.set_ylim(*vlim)
-        # set the imshow data
-        self._im.set_cmap(self._cmap)
-        self._im.set_norm(self._norm)
         if self._imdata is None:
+            # keep the invalidation until there is something to show
+            self._im.set_cmap(self._colormap())
+            self._im.set_norm(self._norm)
             return
-        self._im.set_data(self._imdata)
-        # TODO if cb_dirty, remake the colorbar, I think this is
-        # why changing the norm does not play well
-        self._dirty = False
-        self._cb_dirty = False
-
+        self._invalid = set()
+
+        if invalid & {'data', 'limits'} or self._vlim is None:
+            # this is a tuple which is the max/min used in the color
+            # mapping.  these values are also used to set the limits on
+            # the value axes of the parasite axes
+            vlim = self._compute_limits()
+            if vlim != self._vlim:
+                self._vlim = vlim
+                invalid.add('limits')
+            else:
+                # e.g. absolute limits, the colour bar and cuts stand
+                invalid.discard('limits')
+        if 'cmap' in invalid:
+            self._im.set_cmap(self._colormap())
+        if 'norm' in invalid:
+            self._im.set_norm(self._norm)
+        if invalid & {'limits', 'norm'}:
+            # set the color bar limits
+            self._norm.vmin, self._norm.vmax = self._vlim
+            self._im.set_clim(self._vlim)
+        if invalid & {'limits', 'cuts'}:
+            # set the cross section axes limits
+            cut_lim = self._vlim
+            if self._band_width > 1 and self._band_reduction == 'sum':
+                cut_lim = tuple(v * self._band_width for v in self._vlim)
+            self._ax_v.set_xlim(*cut_lim[::-1])
+            self._ax_h.set_ylim(*cut_lim)
+        if (invalid & {'data', 'image'} or
+                (self._lut is not None and
+                 invalid & {'limits', 'cmap', 'norm'})):
+            # set the imshow data
+            self._set_im_data()
+        self._stale.update(invalid)
+
+    @timed('limits')
+    def _compute_limits(self):
+        known = self._image_limits
+        if (known is not None and known[0] is self._limit_func and
+                self._limit_region == 'frame' and
+                self._limit_pixels is None):
+            # e.g. computed by the pre-fetcher
+            return known[1]
+        im, mask = self._limit_image()
+        if mask is not None or frame_mask(im) is not None:
+            # the limit functions find the mask through the statistics
+            frame_stats(im, mask=False if mask is None else mask)
+        return tuple(self._limit_func(im))
+
+    def _limit_image(self):
+        """
+        The (part of the) image the limit function is applied to, and its
+        mask
+        """
+        im = self._imdata
+        mask = self._image_mask()
+        index = []
+        if self._limit_region == 'visible':
+            rows, cols = self._visible_slices()
+            if rows.stop > rows.start and cols.stop > cols.start:
+                index.append((rows, cols))
+        if self._limit_pixels is not None:
+            shape = im[index[0]].shape if index else im.shape
+            sample = subsample_index(shape, self._limit_pixels,
+                                     self._limit_sampling)
+            if sample is not None:
+                index.append(sample)
+        for idx in index:
+            im = im[idx]
+            if mask is not None:
+                mask = mask.subset(idx)
+        return im, mask
+
+    def _visible_slices(self):
+        """
+        The rows and columns of the image (partly) inside the view limits
+        """
+        numrows, numcols = self._imdata.shape
+        x0, x1 = sorted(self._im_ax.get_xlim())
+        y0, y1 = sorted(self._im_ax.get_ylim())
+        # pixel i covers [i - .5, i + .5]
+        cols = [min(max(int(v), 0), numcols)
+                for v in (np.floor(x0 + .5), np.ceil(x1 + .5))]
+        rows = [min(max(int(v), 0), numrows)
+                for v in (np.floor(y0 + .5), np.ceil(y1 + .5))]
+        return slice(*rows), slice(*cols)
+
+    def _stale_axes(self, stale):
+        """
+        The axes which have to be redrawn for the stale aspects
+        """
+        axes = set()
+        if stale & {'data', 'image', 'limits', 'cmap', 'norm', 'overlay'}:
+            axes.add(self._im_ax)
+        if stale & {'limits', 'cuts'}:
+            axes.update((self._ax_h, self._ax_v))
+        if stale & {'limits', 'cmap', 'norm', 'colorbar'}:
+            axes.add(self._ax_cb)
+        return axes
+
+    @timed('draw')
     def _draw(self):
-        self._fig.canvas.draw()
+        """
+        Redraw what is stale: only the affected axes, blitted, unless the
+        layout changed (or nothing has been drawn yet to blit onto)
+        """
+        stale, self._stale = self._stale, set()
+        if not stale:
+            return
+        canvas = self._fig.canvas
+        if ('layout' in stale or self._ax_v_bk is None or
+                not self._drawn_bbox or
+                not getattr(canvas, 'supports_blit', True) or
+                not hasattr(canvas, 'get_renderer')):
+            canvas.draw()
+            return
+        self._redraw_axes(self._stale_axes(stale))
+
+    def _redraw_axes(self, axes):
+        """
+        Draw the given axes over the last drawn figure and blit them
+        """
+        canvas = self._fig.canvas
+        regions = _blit_axes(canvas, self._blank, axes, self._drawn_bbox)
+        if regions is None:
+            # other axes in the way
+            canvas.draw()
+            return
+        # what is under the animated artists changed
+        self._capture_backgrounds()
+        for ax, ln in ((self._ax_h, self._ln_h), (self._ax_v, self._ln_v)):
+            if ax in regions and ln.get_visible():
+                ax.draw_artist(ln)
+                canvas.blit(ax.bbox)
+
+    def _pick_level(self):
+        """
+        Pick the pyramid level matching the current zoom and axes size
+        """
+        if self._pyramid_mode is None or self._imdata is None:
+            return 0
+        bbox = self._im_ax.bbox
+        if bbox.width <= 0 or bbox.height <= 0:
+            return 0
+        x0, x1 = self._im_ax.get_xlim()
+        y0, y1 = self._im_ax.get_ylim()
+        data_per_px = max(abs(x1 - x0) / bbox.width,
+                          abs(y1 - y0) / bbox.height)
+        if self._pyramid is None:
+            self._pyramid = ImagePyramid(self._imdata,
+                                         reduction=self._pyramid_mode)
+        return self._pyramid.level_for(data_per_px)
+
+    @timed('set_data')
+    def _set_im_data(self):
+        """
+        Give the image artist the data (full resolution or a pyramid
+        level) and matching extent for the current view
+        """
+        level = self._pick_level()
+        if level == 0:
+            data = self._imdata
+            extent = self._extent
+        else:
+            data = self._pyramid.level(level)
+            # a level can be a little larger than the image / 2**level
+            # when the shape is not a power of 2
+            factor = 2 ** level
+            nrows, ncols = self._imdata.shape
+            x0, x1, y0, y1 = self._extent
+            sx = data.shape[1] * factor / ncols
+            sy = data.shape[0] * factor / nrows
+            extent = [x0, x0 + (x1 - x0) * sx, y1 + (y0 - y1) * sy, y1]
+        mask = self._image_mask()
+        if self._lut is not None:
+            # the norm limits are already set by `_update_artists`
+            rgba = self._lut(data)
+            if rgba is not None:
+                data = rgba
+                if mask is not None:
+                    color = to_rgba(_get_cmap(self._colormap()).get_bad())
+                    color = np.round(np.multiply(color, 255)).astype(np.uint8)
+                    if level == 0:
+                        mask.paint(data, color)
+                    else:
+                        data[self._level_mask(level)] = color
+                    mask = None
+        if mask is not None:
+            data = np.ma.masked_array(data, mask=self._level_mask(level))
+        self._im.set_data(data)
+        # changing the extent must not move the view (which would call
+        # back into `_view_changed`)
+        autoscale = self._im_ax.get_autoscale_on()
+        self._im_ax.set_autoscale_on(False)
+        try:
+            self._im.set_extent(extent)
+        finally:
+            self._im_ax.set_autoscale_on(autoscale)
+        self._im_level = level
+
+    def _level_mask(self, level):
+        """
+        The boolean bad pixel mask of a pyramid level of the image: a
+        pixel is bad if any of the pixels it was reduced from is
+        """
+        if level == 0:
+            return self._mask.to_bool()
+        if self._mask_pyramid is None:
+            self._mask_pyramid = ImagePyramid(self._mask.to_bool(),
+                                              reduction='max')
+        return self._mask_pyramid.level(level)
+
+    def _view_changed(self, event):
+        """
+        Swap the pyramid level if the zoom level or the size of the axes
+        changed enough, and recompute the limits of the visible region
+        once the zooming/panning is over
+        """
+        if self._limit_region == 'visible' and self._imdata is not None:
+            self._schedule_limits()
+        if (self._pyramid_mode is None or self._imdata is None or
+                self._extent is None):
+            return
+        if self._pick_level() != self._im_level:
+            self._set_im_data()
+            self._fig.canvas.draw_idle()
 
     @auto_redraw
     def autoscale_horizontal(self, enable):
         self._ax_h.autoscale(enable=enable)
+        self._invalidate('cuts')
 
     @auto_redraw
     def autoscale_vertical(self, enable):
         self._ax_v.autoscale(enable=False)
+        self._invalidate('cuts')
@@ -0,0 +1,306 @@
+# ######################################################################
+# Copyright (c) 2014, Brookhaven Science Associates, Brookhaven        #
+# National Laboratory. All rights reserved.                            #
+#                                                                      #
+# Redistribution and use in source and binary forms, with or without   #
+# modification, are permitted provided that the following conditions   #
+# are met:                                                             #
+#                                                                      #
+# * Redistributions of source code must retain the above copyright     #
+#   notice, this list of conditions and the following disclaimer.      #
+#                                                                      #
+# * Redistributions in binary form must reproduce the above copyright  #
+#   notice this list of conditions and the following disclaimer in     #
+#   the documentation and/or other materials provided with the         #
+#   distribution.                                                      #
+#                                                                      #
+# * Neither the name of the Brookhaven Science Associates, Brookhaven  #
+#   National Laboratory nor the names of its contributors may be used  #
+#   to endorse or promote products derived from this software without  #
+#   specific prior written permission.                                 #
+#                                                                      #
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS  #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT    #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS    #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE       #
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,           #
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES   #
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR   #
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)   #
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,  #
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OTHERWISE) ARISING   #
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE   #
+# POSSIBILITY OF SUCH DAMAGE.                                          #
+########################################################################
+"""
+Headless export of image stacks to PNG files or a multi-frame TIFF.
+
+Frames are rendered in parallel by a pool of processes, each with its own
+Agg canvas (no GUI or event loop is involved), and written in frame order
+by the calling process.  The colour limits, normalization and colormap
+are applied exactly as `CrossSection` does.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from collections import deque
+import copy
+import io
+import multiprocessing
+import os
+
+from six.moves import zip
+import numpy as np
+from matplotlib import cm
+from matplotlib.colors import Normalize
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import matplotlib.image as mimage
+
+from ..frame_source import FrameSource, ArrayFrameSource
+from .cross_section_2d import CrossSection, fullrange_limit_factory
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+_FORMATS = ('png', 'tiff')
+_MODES = ('image', 'figure')
+
+
+def colormap_frame(frame, cmap='gray', norm=None, limit_func=None):
+    """
+    Colour-map a frame the way `CrossSection` shows it, at one pixel per
+    data point
+
+    Parameters
+    ----------
+    frame : np.ndarray
+        2D image
+    cmap : str or Colormap, optional
+        Defaults to gray
+    norm : Normalize, optional
+        Copied, then its limits are set from `limit_func`.  Defaults to a
+        linear normalization
+    limit_func : callable, optional
+        ``limit_func(frame) -> (vmin, vmax)``.  Defaults to the full range
+
+    Returns
+    -------
+    rgba : np.ndarray
+        (M, N, 4) uint8 array
+    """
+    if limit_func is None:
+        limit_func = fullrange_limit_factory()
+    norm = Normalize() if norm is None else copy.copy(norm)
+    norm.vmin, norm.vmax = limit_func(frame)
+    return cm.ScalarMappable(norm, cmap).to_rgba(frame, bytes=True)
+
+
+class _FrameRenderer(object):
+    """
+    Renders frames to RGBA arrays, one per worker process
+    """
+    def __init__(self, source, mode, cmap, norm, limit_func, interpolation,
+                 figsize, dpi):
+        self.source = source
+        self.mode = mode
+        self.cmap = cmap
+        self.norm = norm
+        self.limit_func = limit_func
+        if mode == 'figure':
+            fig = Figure(figsize=figsize, dpi=dpi)
+            self._canvas = FigureCanvasAgg(fig)
+            # the setters would each draw the figure, draw once per frame
+            self._xsection = CrossSection(fig, cmap=cmap,
+                                          norm=copy.copy(norm),
+                                          limit_func=limit_func,
+                                          interpolation=interpolation,
+                                          auto_redraw=False)
+
+    def render(self, idx):
+        frame = self.source.get_frame(idx)
+        if self.mode == 'image':
+            return colormap_frame(frame, self.cmap, self.norm,
+                                  self.limit_func)
+        self._xsection.update_image(frame)
+        self._xsection._update_artists()
+        self._canvas.draw()
+        width, height = self._canvas.get_width_height()
+        return np.frombuffer(self._canvas.buffer_rgba(), np.uint8).reshape(
+            height, width, 4).copy()
+
+
+def _encode_png(rgba):
+    buf = io.BytesIO()
+    mimage.imsave(buf, rgba, format='png')
+    return buf.getvalue()
+
+
+# the arguments of the renderer of the worker process, set by _init_worker,
+# and the renderer, made from them by the first task
+_renderer_args = None
+_renderer = None
+
+
+def _init_worker(args, fmt):
+    global _renderer_args, _renderer
+    # nothing which can fail here: a pool respawns the workers which die
+    # in their initializer forever, the errors have to come back through
+    # the tasks
+    _renderer_args = (args, fmt)
+    _renderer = None
+
+
+def _render_task(idx):
+    global _renderer
+    args, fmt = _renderer_args
+    if _renderer is None:
+        _renderer = _FrameRenderer(*args)
+    rgba = _renderer.render(idx)
+    # encode in the worker, the parent only writes bytes out
+    return _encode_png(rgba) if fmt == 'png' else rgba
+
+
+def _pool_context():
+    """
+    The multiprocessing context to start the workers with: fork wherever
+    it is available, so that `source` and `limit_func` (the closures made
+    by the limit factories cannot be pickled) are inherited rather than
+    pickled, whatever the default start method of the platform is
+    """
+    get_context = getattr(multiprocessing, 'get_context', None)
+    if get_context is None:
+        # python 2 always forks on posix
+        return multiprocessing
+    try:
+        return get_context('fork')
+    except ValueError:
+        return get_context()
+
+
+def _ordered_results(indices, processes, init_args, fmt):
+    """
+    Yield the rendered frames in order, keeping at most two frames per
+    process in flight so memory stays bounded however slow the writer is
+    """
+    if processes == 0:
+        _init_worker(init_args, fmt)
+        for idx in indices:
+            yield _render_task(idx)
+        return
+    pool = _pool_context().Pool(processes, _init_worker, (init_args, fmt))
+    try:
+        pending = deque()
+        indices = iter(indices)
+        for idx in indices:
+            pending.append(pool.apply_async(_render_task, (idx,)))
+            if len(pending) >= 2 * processes:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def export_stack(source, path, start=0, stop=None, fmt=None, mode='image',
+                 cmap='gray', norm=None, limit_func=None, interpolation=None,
+                 figsize=(8, 8), dpi=100, processes=None, progress=None):
+    """
+    Render a range of frames to PNG files or to a multi-frame TIFF
+
+    Parameters
+    ----------
+    source : FrameSource or array-like
+        The stack, a 3D array or a list of 2D frames work too
+    path : str
+        For PNG output a template which is formatted with the frame index,
+        eg. ``'movie/frame_{:05d}.png'``.  For TIFF output the file name
+    start, stop : int, optional
+        The range of frames to export.  Defaults to all of them
+    fmt : {'png', 'tiff'}, optional
+        Defaults to guessing from the extension of `path`
+    mode : {'image', 'figure'}, optional
+        'image' writes the colour-mapped frame, one pixel per data point.
+        'figure' writes the whole `CrossSection` figure (image, cross
+        sections and color bar) rendered at `figsize` and `dpi`.
+        Defaults to 'image'
+    cmap, norm, limit_func, interpolation
+        As for `CrossSection`
+    figsize : tuple, optional
+        Figure size (inches) for the 'figure' mode
+    dpi : float, optional
+        Resolution for the 'figure' mode
+    processes : int, optional
+        Number of worker processes.  0 renders in this process.  Defaults
+        to the number of CPUs.  The workers are forked wherever the
+        platform supports it, so `source` and `limit_func` need not be
+        picklable.  Where it does not (Windows) they are pickled, which
+        the limit functions made by the ``*_limit_factory`` functions are
+        not: pass ``processes=0`` there
+    progress : callable, optional
+        ``progress(n_written, n_total)`` is called after each frame is
+        written
+
+    Returns
+    -------
+    paths : list
+        The files written
+    """
+    if not isinstance(source, FrameSource):
+        source = ArrayFrameSource(source)
+    if stop is None:
+        stop = len(source)
+    if not 0 <= start < stop <= len(source):
+        raise ValueError("invalid frame range [{0}, {1}) for a source with "
+                         "{2} frames".format(start, stop, len(source)))
+    if fmt is None:
+        ext = os.path.splitext(path)[1].lower().lstrip('.')
+        fmt = 'tiff' if ext in ('tif', 'tiff') else ext
+    if fmt not in _FORMATS:
+        raise ValueError("fmt must be one of {0}, not "
+                         "{1!r}".format(_FORMATS, fmt))
+    if mode not in _MODES:
+        raise ValueError("mode must be one of {0}, not "
+                         "{1!r}".format(_MODES, mode))
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    init_args = (source, mode, cmap, norm, limit_func, interpolation,
+                 figsize, dpi)
+    total = stop - start
+    results = _ordered_results(range(start, stop), processes, init_args,
+                               fmt)
+    if fmt == 'png':
+        paths = []
+        for n, (idx, png) in enumerate(zip(range(start, stop), results), 1):
+            fname = path.format(idx)
+            with open(fname, 'wb') as fout:
+                fout.write(png)
+            paths.append(fname)
+            if progress is not None:
+                progress(n, total)
+        return paths
+    _write_tiff(path, results, total, progress)
+    return [path]
+
+
+def _write_tiff(path, frames, total, progress):
+    """
+    Stream the RGBA frames into a multi-frame TIFF
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ImportError("writing TIFF files requires PIL (pillow)")
+
+    def images():
+        for n, rgba in enumerate(frames, 1):
+            yield Image.fromarray(rgba)
+            if progress is not None:
+                progress(n, total)
+
+    images = images()
+    first = next(images)
+    first.save(path, format='TIFF', save_all=True, append_images=images)
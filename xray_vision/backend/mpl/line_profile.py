@@ -0,0 +1,374 @@
+# ######################################################################
+# Copyright (c) 2014, Brookhaven Science Associates, Brookhaven        #
+# National Laboratory. All rights reserved.                            #
+#                                                                      #
+# Redistribution and use in source and binary forms, with or without   #
+# modification, are permitted provided that the following conditions   #
+# are met:                                                             #
+#                                                                      #
+# * Redistributions of source code must retain the above copyright     #
+#   notice, this list of conditions and the following disclaimer.      #
+#                                                                      #
+# * Redistributions in binary form must reproduce the above copyright  #
+#   notice this list of conditions and the following disclaimer in     #
+#   the documentation and/or other materials provided with the         #
+#   distribution.                                                      #
+#                                                                      #
+# * Neither the name of the Brookhaven Science Associates, Brookhaven  #
+#   National Laboratory nor the names of its contributors may be used  #
+#   to endorse or promote products derived from this software without  #
+#   specific prior written permission.                                 #
+#                                                                      #
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS  #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT    #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS    #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE       #
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,           #
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES   #
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR   #
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)   #
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,  #
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OTHERWISE) ARISING   #
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE   #
+# POSSIBILITY OF SUCH DAMAGE.                                          #
+########################################################################
+"""
+Intensity profiles along arbitrary lines through an image.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from matplotlib.lines import Line2D
+import numpy as np
+
+from . import _AxesBlitter
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class LineSampler(object):
+    """
+    Pre-computed sampling of an image along a line segment.
+
+    All of the geometry (sample positions, the pixels they read and the
+    interpolation weights) is worked out once when the sampler is made, so
+    sampling a new image of the same shape is a single vectorized gather.
+
+    Parameters
+    ----------
+    start, end : tuple
+        (x, y) == (column, row) of the two ends of the line, in pixels
+    shape : tuple
+        (nrows, ncols) of the images that will be sampled
+    width : int, optional
+        Number of parallel lines, spaced 1 pixel apart perpendicular to
+        the line, that are averaged.  Defaults to 1
+    method : {'bilinear', 'nearest'}, optional
+        Interpolation method. Defaults to 'bilinear'
+    num : int, optional
+        Number of samples along the line.  Defaults to one per pixel of
+        length (plus one)
+
+    Attributes
+    ----------
+    distance : ndarray
+        Distance (in pixels) of each sample from `start`
+    """
+    methods = ('bilinear', 'nearest')
+
+    def __init__(self, start, end, shape, width=1, method='bilinear',
+                 num=None):
+        if method not in self.methods:
+            raise ValueError("method must be one of {0}, not "
+                             "{1!r}".format(self.methods, method))
+        width = int(width)
+        if width < 1:
+            raise ValueError("width must be at least 1, not "
+                             "{0}".format(width))
+        self.start = tuple(start)
+        self.end = tuple(end)
+        self.shape = tuple(shape)
+        self.width = width
+        self.method = method
+        nrows, ncols = self.shape
+
+        x0, y0 = self.start
+        x1, y1 = self.end
+        length = np.hypot(x1 - x0, y1 - y0)
+        if num is None:
+            num = int(np.ceil(length)) + 1
+        self.num = num
+        t = np.linspace(0, 1, num)
+        self.distance = t * length
+        # unit normal, used to offset the parallel lines
+        if length > 0:
+            nx, ny = -(y1 - y0) / length, (x1 - x0) / length
+        else:
+            nx, ny = 0., 0.
+        offsets = np.arange(width) - (width - 1) / 2
+        # (num, width) sample coordinates
+        xs = x0 + t[:, None] * (x1 - x0) + offsets[None, :] * nx
+        ys = y0 + t[:, None] * (y1 - y0) + offsets[None, :] * ny
+        valid = ((xs >= -.5) & (xs <= ncols - .5) &
+                 (ys >= -.5) & (ys <= nrows - .5))
+
+        if method == 'nearest':
+            cols = np.clip(np.round(xs).astype(np.intp), 0, ncols - 1)
+            rows = np.clip(np.round(ys).astype(np.intp), 0, nrows - 1)
+            idx = (rows * ncols + cols)[None]
+            weights = valid[None].astype(np.float64)
+        else:
+            # clamp to the pixel centres, the half pixel at the edges
+            # takes the edge value
+            xs = np.clip(xs, 0, ncols - 1)
+            ys = np.clip(ys, 0, nrows - 1)
+            c0 = np.floor(xs).astype(np.intp)
+            r0 = np.floor(ys).astype(np.intp)
+            fx = xs - c0
+            fy = ys - r0
+            c1 = np.minimum(c0 + 1, ncols - 1)
+            r1 = np.minimum(r0 + 1, nrows - 1)
+            idx = np.array([r0 * ncols + c0, r0 * ncols + c1,
+                            r1 * ncols + c0, r1 * ncols + c1])
+            weights = np.array([(1 - fx) * (1 - fy), fx * (1 - fy),
+                                (1 - fx) * fy, fx * fy]) * valid[None]
+        # average over the parallel lines which are in the image
+        n_valid = valid.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weights = weights / n_valid[None, :, None]
+        self._idx = idx.reshape(idx.shape[0], -1)
+        self._weights = weights.reshape(weights.shape[0], -1)
+        self._valid = n_valid > 0
+
+    def sample(self, image):
+        """
+        Sample an image along the line
+
+        Parameters
+        ----------
+        image : ndarray
+            2D image with the shape this sampler was made for
+
+        Returns
+        -------
+        profile : ndarray
+            One value per sample, NaN where the line is outside the image
+        """
+        if image.shape != self.shape:
+            raise ValueError("image shape {0} does not match the sampler "
+                             "shape {1}".format(image.shape, self.shape))
+        flat = image.ravel()
+        vals = (flat[self._idx] * self._weights).sum(axis=0)
+        profile = vals.reshape(self.num, self.width).sum(axis=1)
+        profile[~self._valid] = np.nan
+        return profile
+
+
+class LineProfileTool(object):
+    """
+    A draggable line on the image of a `CrossSection` and the intensity
+    profile along it, drawn on another axes.
+
+    Drag either end of the line to move that end, or the middle of the
+    line to move all of it.  The profile follows both the line and the
+    frames shown by the `CrossSection`.  The sampling geometry is cached,
+    so showing a new frame with the line fixed is a single gather, and
+    only the profile axes are redrawn.
+
+    Parameters
+    ----------
+    cross_section : CrossSection
+        The cross section viewer whose image is profiled
+    ax : matplotlib.axes.Axes
+        The axes to draw the profile on
+    start, end : tuple, optional
+        (x, y) of the ends of the line.  Defaults to a horizontal line
+        through the middle of the image
+    width : int, optional
+        Number of pixels perpendicular to the line to average. Defaults
+        to 1
+    method : {'bilinear', 'nearest'}, optional
+        Interpolation method. Defaults to 'bilinear'
+    pick_radius : float, optional
+        How close (in screen pixels) a click must be to the line to grab
+        it. Defaults to 8
+    """
+    def __init__(self, cross_section, ax, start=None, end=None, width=1,
+                 method='bilinear', pick_radius=8):
+        self._xsection = cross_section
+        self._ax = ax
+        self._width = width
+        self._method = method
+        self._pick_radius = pick_radius
+        self._sampler = None
+        self._grab = None
+
+        image = cross_section._imdata
+        if image is not None and (start is None or end is None):
+            nrows, ncols = image.shape
+            start = (0, nrows // 2)
+            end = (ncols - 1, nrows // 2)
+        elif start is None or end is None:
+            start, end = (0, 0), (1, 0)
+        self._start = tuple(start)
+        self._end = tuple(end)
+
+        im_ax = cross_section._im_ax
+        self._line = Line2D([self._start[0], self._end[0]],
+                            [self._start[1], self._end[1]],
+                            color='c', marker='o', linewidth=1.5)
+        im_ax.add_line(self._line)
+        self._profile_line, = ax.plot([], [], 'k-')
+        ax.set_xlabel('distance [px]')
+        self._blitter = _AxesBlitter(ax)
+
+        canvas = im_ax.figure.canvas
+        self._cids = [
+            canvas.mpl_connect('motion_notify_event', self._on_motion),
+            canvas.mpl_connect('button_release_event', self._on_release)]
+        # presses which grab the line do not freeze the cursor
+        cross_section.add_press_cb(self._on_press)
+        cross_section.add_image_cb(self._image_changed)
+        self._connected = True
+        self.update_profile()
+
+    @property
+    def line(self):
+        """
+        ((x0, y0), (x1, y1)) of the line
+        """
+        return self._start, self._end
+
+    def set_line(self, start, end):
+        """
+        Move the line
+
+        Parameters
+        ----------
+        start, end : tuple
+            (x, y) of the ends of the line
+        """
+        self._start = tuple(start)
+        self._end = tuple(end)
+        self._line.set_data([self._start[0], self._end[0]],
+                            [self._start[1], self._end[1]])
+        self.update_profile()
+        self._xsection.update_overlays()
+
+    def set_width(self, width):
+        self._width = width
+        self.update_profile()
+
+    def set_method(self, method):
+        self._method = method
+        self.update_profile()
+
+    def _get_sampler(self, shape):
+        """
+        Return the sampler for the current geometry, making a new one only
+        if the line, width, method or image shape changed
+        """
+        s = self._sampler
+        if (s is None or s.shape != shape or s.start != self._start or
+                s.end != self._end or s.width != self._width or
+                s.method != self._method):
+            self._sampler = LineSampler(self._start, self._end, shape,
+                                        width=self._width,
+                                        method=self._method)
+        return self._sampler
+
+    @property
+    def profile(self):
+        """
+        (distance, intensity) along the line for the current image
+        """
+        image = self._xsection._imdata
+        if image is None:
+            return np.array([]), np.array([])
+        sampler = self._get_sampler(image.shape)
+        return sampler.distance, sampler.sample(image)
+
+    def update_profile(self):
+        """
+        Re-sample the current image and redraw the profile axes
+        """
+        distance, values = self.profile
+        self._profile_line.set_data(distance, values)
+        self._ax.relim()
+        self._ax.autoscale_view()
+        self._blitter.redraw()
+
+    def _image_changed(self, image):
+        self.update_profile()
+
+    def _on_press(self, event):
+        """
+        Grab the line if the press is on it, returns whether it did
+        """
+        if event.inaxes is not self._xsection._im_ax or event.button != 1:
+            return False
+        trans = self._xsection._im_ax.transData
+        p0, p1, click = trans.transform([self._start, self._end,
+                                         (event.xdata, event.ydata)])
+        for name, p in (('start', p0), ('end', p1)):
+            if np.hypot(*(click - p)) <= self._pick_radius:
+                self._grab = (name, None)
+                return True
+        # distance from the segment
+        seg = p1 - p0
+        seg_len2 = np.dot(seg, seg)
+        t = 0 if seg_len2 == 0 else np.clip(np.dot(click - p0, seg) /
+                                             seg_len2, 0, 1)
+        if np.hypot(*(click - (p0 + t * seg))) <= self._pick_radius:
+            self._grab = ('line', (event.xdata, event.ydata,
+                                   self._start, self._end))
+            return True
+        return False
+
+    def _on_motion(self, event):
+        if (self._grab is None or event.inaxes is not self._xsection._im_ax
+                or event.xdata is None):
+            return
+        name, info = self._grab
+        if name == 'start':
+            self.set_line((event.xdata, event.ydata), self._end)
+        elif name == 'end':
+            self.set_line(self._start, (event.xdata, event.ydata))
+        else:
+            x, y, start, end = info
+            dx, dy = event.xdata - x, event.ydata - y
+            self.set_line((start[0] + dx, start[1] + dy),
+                          (end[0] + dx, end[1] + dy))
+
+    def _on_release(self, event):
+        self._grab = None
+
+    def disconnect(self):
+        """
+        Stop following the frames and the mouse, the line and the profile
+        stay as they are
+        """
+        if not self._connected:
+            return
+        canvas = self._xsection._im_ax.figure.canvas
+        for cid in self._cids:
+            canvas.mpl_disconnect(cid)
+        self._cids = []
+        self._grab = None
+        self._xsection.remove_press_cb(self._on_press)
+        self._xsection.remove_image_cb(self._image_changed)
+        self._blitter.disconnect()
+        self._connected = False
+
+    def remove(self):
+        """
+        Remove the line and the profile and disconnect from the canvas
+        """
+        self.disconnect()
+        self._line.remove()
+        self._profile_line.remove()
+        self._xsection.update_overlays()
+        canvas = self._ax.figure.canvas
+        if canvas is not None:
+            canvas.draw_idle()
@@ -0,0 +1,298 @@
+# ######################################################################
+# Copyright (c) 2014, Brookhaven Science Associates, Brookhaven        #
+# National Laboratory. All rights reserved.                            #
+#                                                                      #
+# Redistribution and use in source and binary forms, with or without   #
+# modification, are permitted provided that the following conditions   #
+# are met:                                                             #
+#                                                                      #
+# * Redistributions of source code must retain the above copyright     #
+#   notice, this list of conditions and the following disclaimer.      #
+#                                                                      #
+# * Redistributions in binary form must reproduce the above copyright  #
+#   notice this list of conditions and the following disclaimer in     #
+#   the documentation and/or other materials provided with the         #
+#   distribution.                                                      #
+#                                                                      #
+# * Neither the name of the Brookhaven Science Associates, Brookhaven  #
+#   National Laboratory nor the names of its contributors may be used  #
+#   to endorse or promote products derived from this software without  #
+#   specific prior written permission.                                 #
+#                                                                      #
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS  #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT    #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS    #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE       #
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,           #
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES   #
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR   #
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)   #
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,  #
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OTHERWISE) ARISING   #
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE   #
+# POSSIBILITY OF SUCH DAMAGE.                                          #
+########################################################################
+"""
+Several detectors shown side by side, stepped through and probed
+together: one frame index and one cursor drive all of the views.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class LinkedViewGroup(object):
+    """
+    Drives a group of `CrossSection2DView` (one per detector) from one
+    frame index and one cursor position.
+
+    The cursor is in detector-relative coordinates, (0, 0) the top left
+    corner and (1, 1) the bottom right corner of every image, so detectors
+    of different sizes show the same relative position.  Mouse motion over
+    any of the views moves the cursor of all of them; the views stop
+    following the mouse themselves (see `CrossSection.set_track_motion`)
+    and there is one motion handler per canvas.
+
+    `request_frame` and `request_cursor` only record the latest request
+    and start loading the frames, concurrently (one thread per view, so
+    the loads of a view never overlap).  A timer then applies them to all
+    of the views together, once the frames of all of them are in, with
+    the redraws batched so each view paints once per tick.  `set_frame`
+    and `set_cursor` do the same synchronously.
+
+    Parameters
+    ----------
+    views : list of CrossSection2DView
+    rate : float, optional
+        Maximum rate (Hz) at which requested frames and cursor positions
+        are shown.  Defaults to 30
+    """
+    def __init__(self, views, rate=30):
+        self._views = list(views)
+        if not self._views:
+            raise ValueError("a LinkedViewGroup needs at least one view")
+        self.rate = rate
+        # one loader per view: the views load in parallel, but each
+        # view's own caches only ever see one load at a time
+        self._executors = [ThreadPoolExecutor(max_workers=1)
+                           for v in self._views]
+        self._timer = None
+        self._index = None
+        self._xy = None
+        self._loads = None
+        self._pending_index = None
+        self._pending_xy = None
+        # one motion handler per canvas, instead of one per view
+        self._cids = []
+        canvases = []
+        for view in self._views:
+            view.set_track_motion(False)
+            canvas = view.figure.canvas
+            if canvas is not None and canvas not in canvases:
+                canvases.append(canvas)
+        for canvas in canvases:
+            self._cids.append((canvas, canvas.mpl_connect(
+                'motion_notify_event', self._move_cb)))
+
+    @property
+    def views(self):
+        return list(self._views)
+
+    @property
+    def num_frames(self):
+        """
+        The number of frames all of the views have
+        """
+        return min(view.num_frames for view in self._views)
+
+    @property
+    def index(self):
+        """
+        The index of the frame shown, None before the first one
+        """
+        return self._index
+
+    @property
+    def cursor(self):
+        """
+        The relative (x, y) position of the cursor, None if not set
+        """
+        return self._xy
+
+    def _check_index(self, index):
+        if not 0 <= index < self.num_frames:
+            raise IndexError("frame index {0} out of range for {1} "
+                             "frames".format(index, self.num_frames))
+
+    def _submit_loads(self, index):
+        """
+        Start loading frame index for every view
+        """
+        if self._loads is not None:
+            # a newer request supersedes the loads which have not started
+            for fut in self._loads[1]:
+                fut.cancel()
+        self._loads = (index, [ex.submit(view.fetch_frame, index)
+                               for ex, view in zip(self._executors,
+                                                   self._views)])
+
+    def set_frame(self, index):
+        """
+        Show frame index in every view, loading the frames concurrently
+
+        Parameters
+        ----------
+        index : int
+        """
+        self._check_index(index)
+        self._pending_index = None
+        self._submit_loads(index)
+        loads = self._loads[1]
+        self._loads = None
+        self._show([fut.result() for fut in loads], index, self._xy)
+
+    def request_frame(self, index):
+        """
+        Start loading frame index for every view and show it on the next
+        timer tick after the loads are done.  Requests made in the meantime
+        supersede it.
+
+        Parameters
+        ----------
+        index : int
+        """
+        self._check_index(index)
+        self._pending_index = index
+        self._submit_loads(index)
+        self._start_timer()
+
+    def set_cursor(self, x, y):
+        """
+        Move the cursor of every view to the relative position (x, y)
+
+        Parameters
+        ----------
+        x, y : float
+            Between 0 (left, top) and 1 (right, bottom)
+        """
+        self._pending_xy = None
+        self._show(None, self._index, (x, y))
+
+    def request_cursor(self, x, y):
+        """
+        Move the cursor of every view to the relative position (x, y) on
+        the next timer tick
+        """
+        self._pending_xy = (x, y)
+        self._start_timer()
+
+    @contextmanager
+    def _batch(self):
+        """
+        Hold back redrawing any of the views until the end of the block
+        """
+        for view in self._views:
+            view.begin_batch()
+        try:
+            yield
+        finally:
+            for view in self._views:
+                view.end_batch()
+
+    def _show(self, frames, index, xy):
+        """
+        Hand the views their frames (if not None) and move their cursors
+        to xy (if not None), each redrawing once
+        """
+        with self._batch():
+            if frames is not None:
+                for view, loaded in zip(self._views, frames):
+                    view.show_frame(index, loaded)
+                self._index = index
+            if xy is not None:
+                self._xy = xy
+                for view in self._views:
+                    self._move_view(view, xy)
+
+    @staticmethod
+    def _move_view(view, xy):
+        shape = view.image_shape
+        if shape is None:
+            return
+        numrows, numcols = shape
+        # pixel i covers [i - .5, i + .5]
+        view.move_cursor(xy[0] * numcols - .5, xy[1] * numrows - .5)
+
+    def _move_cb(self, event):
+        """
+        Motion handler shared by all of the canvases of the group
+        """
+        for view in self._views:
+            if event.inaxes is view.image_axes:
+                break
+        else:
+            return
+        shape = view.image_shape
+        if not view.cursor_active or shape is None:
+            return
+        numrows, numcols = shape
+        xy = ((event.xdata + .5) / numcols, (event.ydata + .5) / numrows)
+        if self.rate:
+            self.request_cursor(*xy)
+        else:
+            self.set_cursor(*xy)
+
+    def _start_timer(self):
+        if self._timer is not None:
+            return
+        canvas = self._views[0].figure.canvas
+        if canvas is None:
+            return
+        interval = max(1, int(1000 / self.rate)) if self.rate else 1
+        self._timer = canvas.new_timer(interval=interval)
+        self._timer.add_callback(self._on_tick)
+        self._timer.start()
+
+    def _on_tick(self):
+        """
+        Show what was requested since the last tick: the latest frame, if
+        all of its loads are done, and the latest cursor position
+        """
+        frames = index = None
+        loads = self._loads
+        if (self._pending_index is not None and loads is not None and
+                all(fut.done() for fut in loads[1])):
+            self._loads = self._pending_index = None
+            try:
+                frames = [fut.result() for fut in loads[1]]
+                index = loads[0]
+            except Exception:
+                logger.exception("loading frame %s failed", loads[0])
+        xy, self._pending_xy = self._pending_xy, None
+        if frames is not None or xy is not None:
+            self._show(frames, index, xy)
+        if (self._pending_index is None and self._pending_xy is None and
+                self._timer is not None):
+            # nothing left to do, stop ticking until the next request
+            self._timer.stop()
+            self._timer = None
+
+    def close(self):
+        """
+        Unlink the views: they follow the mouse on their own again
+        """
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+        for canvas, cid in self._cids:
+            canvas.mpl_disconnect(cid)
+        self._cids = []
+        for view in self._views:
+            view.set_track_motion(True)
+        for ex in self._executors:
+            ex.shutdown(wait=False)
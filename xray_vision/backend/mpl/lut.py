@@ -0,0 +1,160 @@
+# ######################################################################
+# Copyright (c) 2014, Brookhaven Science Associates, Brookhaven        #
+# National Laboratory. All rights reserved.                            #
+#                                                                      #
+# Redistribution and use in source and binary forms, with or without   #
+# modification, are permitted provided that the following conditions   #
+# are met:                                                             #
+#                                                                      #
+# * Redistributions of source code must retain the above copyright     #
+#   notice, this list of conditions and the following disclaimer.      #
+#                                                                      #
+# * Redistributions in binary form must reproduce the above copyright  #
+#   notice this list of conditions and the following disclaimer in     #
+#   the documentation and/or other materials provided with the         #
+#   distribution.                                                      #
+#                                                                      #
+# * Neither the name of the Brookhaven Science Associates, Brookhaven  #
+#   National Laboratory nor the names of its contributors may be used  #
+#   to endorse or promote products derived from this software without  #
+#   specific prior written permission.                                 #
+#                                                                      #
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS  #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT    #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS    #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE       #
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,           #
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES   #
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR   #
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)   #
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,  #
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OTHERWISE) ARISING   #
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE   #
+# POSSIBILITY OF SUCH DAMAGE.                                          #
+########################################################################
+"""
+Colour mapping of unsigned integer images through a lookup table.
+
+matplotlib colour-maps an image by normalizing it to float64 and passing
+that through the colormap, several full-size temporaries per draw.  For
+unsigned integer data there are only so many distinct values, so the
+colour of every one of them can be computed once (with the very same
+norm and colormap) and each frame mapped with a single indexed gather.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import numpy as np
+from matplotlib import cm
+
+from ..stats import frame_stats
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class ColormapLUT(object):
+    """
+    Maps uint8, uint16 and uint32 images to RGBA through a cached table
+
+    The table is built from the colormap and the norm (including its
+    current vmin and vmax) and is only rebuilt when those or the value
+    range it has to cover change.  uint8 and uint16 tables cover every
+    value of the type and are indexed directly by the image.  uint32
+    tables cover the range of the image, if that is no more than
+    `max_entries` values; wider images are not handled (`__call__`
+    returns None) and should be colour-mapped the usual way.
+
+    Parameters
+    ----------
+    cmap : str or Colormap
+    norm : Normalize
+    max_entries : int, optional
+        Largest table to build for uint32 images. Defaults to 2**20
+    """
+    def __init__(self, cmap, norm, max_entries=2 ** 20):
+        self.max_entries = max_entries
+        self._out = None
+        self._idx = None
+        self.update(cmap, norm)
+
+    def update(self, cmap, norm):
+        """
+        Set the colormap and norm, forcing the table to be rebuilt
+        """
+        self._cmap = cmap
+        self._norm = norm
+        self._table = None
+        self._key = None
+
+    @staticmethod
+    def supports(image):
+        """
+        True if images of this dtype can be colour-mapped by a table
+        """
+        return image.dtype.kind == 'u' and image.dtype.itemsize <= 4
+
+    def table(self, dtype, lo, hi):
+        """
+        The (hi - lo + 1, 4) uint8 RGBA colours of the values lo to hi
+        """
+        key = (np.dtype(dtype), lo, hi, self._norm.vmin, self._norm.vmax)
+        if key != self._key:
+            values = np.arange(lo, hi + 1, dtype=dtype)
+            self._table = cm.ScalarMappable(self._norm, self._cmap).to_rgba(
+                values, bytes=True)
+            self._key = key
+        return self._table
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by the table and the reused buffers
+        """
+        return sum(a.nbytes for a in (self._table, self._out, self._idx)
+                   if a is not None)
+
+    def _out_buffer(self, shape):
+        """
+        The RGBA output array, reused from frame to frame
+        """
+        shape = tuple(shape) + (4,)
+        if self._out is None or self._out.shape != shape:
+            self._out = np.empty(shape, dtype=np.uint8)
+        return self._out
+
+    def __call__(self, image):
+        """
+        Colour-map an image
+
+        Parameters
+        ----------
+        image : np.ndarray
+            2D unsigned integer image
+
+        Returns
+        -------
+        rgba : np.ndarray or None
+            (M, N, 4) uint8 image, which is overwritten by the next call.
+            None if the image is not supported
+        """
+        if not self.supports(image):
+            return None
+        out = self._out_buffer(image.shape)
+        if image.dtype.itemsize <= 2:
+            table = self.table(image.dtype, 0, np.iinfo(image.dtype).max)
+            return np.take(table, image, axis=0, out=out)
+        stats = frame_stats(image)
+        if stats.mask is not None:
+            # the masked range leaves the bad pixels out, but the table
+            # has to cover them too (the caller paints over them)
+            lo, hi = int(image.min()), int(image.max())
+        else:
+            lo, hi = int(stats.min), int(stats.max)
+        if hi - lo + 1 > self.max_entries:
+            return None
+        table = self.table(image.dtype, lo, hi)
+        if self._idx is None or self._idx.shape != image.shape:
+            self._idx = np.empty(image.shape, dtype=np.intp)
+        np.subtract(image, lo, out=self._idx, casting='unsafe')
+        return np.take(table, self._idx, axis=0, out=out)
@@ -0,0 +1,284 @@
+# ######################################################################
+# Copyright (c) 2014, Brookhaven Science Associates, Brookhaven        #
+# National Laboratory. All rights reserved.                            #
+#                                                                      #
+# Redistribution and use in source and binary forms, with or without   #
+# modification, are permitted provided that the following conditions   #
+# are met:                                                             #
+#                                                                      #
+# * Redistributions of source code must retain the above copyright     #
+#   notice, this list of conditions and the following disclaimer.      #
+#                                                                      #
+# * Redistributions in binary form must reproduce the above copyright  #
+#   notice this list of conditions and the following disclaimer in     #
+#   the documentation and/or other materials provided with the         #
+#   distribution.                                                      #
+#                                                                      #
+# * Neither the name of the Brookhaven Science Associates, Brookhaven  #
+#   National Laboratory nor the names of its contributors may be used  #
+#   to endorse or promote products derived from this software without  #
+#   specific prior written permission.                                 #
+#                                                                      #
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS  #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT    #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS    #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE       #
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,           #
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES   #
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR   #
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)   #
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,  #
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OTHERWISE) ARISING   #
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE   #
+# POSSIBILITY OF SUCH DAMAGE.                                          #
+########################################################################
+"""
+Non-linear normalizations (log, sqrt, power) which are cheap enough to
+re-apply to large frames on every redraw.
+
+matplotlib's `LogNorm` and `PowerNorm` work on masked float copies of the
+data, with several full-size temporaries per call.  The norms here
+transform integer data through a table of the transformed value of every
+possible pixel value, and float data chunk by chunk in place, into an
+output buffer which is reused from call to call.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import numpy as np
+from matplotlib.colors import Normalize
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class _TableNorm(Normalize):
+    """
+    Base class of the fast norms.  Sub-classes implement `_transform`
+    (in-place, from [vmin, vmax] to [0, 1]) and `inverse`.
+
+    Parameters
+    ----------
+    vmin, vmax : float, optional
+    clip : bool, optional
+        As for `matplotlib.colors.Normalize`
+    max_entries : int, optional
+        Largest table to build for wide (32/64-bit) integer data, wider
+        data is transformed as floats.  Defaults to 2**20
+    chunk_size : int, optional
+        Number of pixels transformed at a time for float data. Defaults
+        to 2**16
+    """
+    # arrays smaller than this (e.g. from the color bar) get a fresh
+    # output array rather than the shared buffer
+    _min_buffered = 2 ** 16
+
+    def __init__(self, vmin=None, vmax=None, clip=False, max_entries=2 ** 20,
+                 chunk_size=2 ** 16):
+        super(_TableNorm, self).__init__(vmin=vmin, vmax=vmax, clip=clip)
+        self.max_entries = max_entries
+        self.chunk_size = chunk_size
+        self._table = None
+        self._mask_table = None
+        self._table_key = None
+        self._out = None
+        self._idx = None
+
+    def _params(self):
+        """
+        Everything other than vmin and vmax the transform depends on
+        """
+        return ()
+
+    def _masks_nonpositive(self):
+        return False
+
+    def _transform(self, x):
+        """
+        Transform the float array x in place
+        """
+        raise NotImplementedError()
+
+    def _buffer(self, shape):
+        if np.prod(shape) < self._min_buffered:
+            return np.empty(shape, dtype=np.float64)
+        if self._out is None or self._out.shape != shape:
+            self._out = np.empty(shape, dtype=np.float64)
+        return self._out
+
+    def __call__(self, value, clip=None):
+        if clip is None:
+            clip = self.clip
+        if np.isscalar(value) or np.ndim(value) == 0:
+            return self(np.array([value], dtype=np.float64), clip)[0]
+        data = np.ma.getdata(value)
+        mask = np.ma.getmask(value)
+        if self.vmin is None or self.vmax is None:
+            self.autoscale_None(value)
+        if self.vmin > self.vmax:
+            raise ValueError("minvalue must be less than or equal to "
+                             "maxvalue")
+        out = None
+        if data.dtype.kind in 'iu':
+            out, nonpos = self._from_table(data)
+        if out is None:
+            out, nonpos = self._from_floats(data)
+        if clip:
+            np.clip(out, 0, 1, out=out)
+        if nonpos is not None:
+            mask = nonpos if mask is np.ma.nomask else mask | nonpos
+        if mask is np.ma.nomask:
+            return out
+        return np.ma.array(out, mask=mask, copy=False)
+
+    def _from_table(self, data):
+        """
+        Transform integer data with a gather from a table.  Returns
+        (None, None) if the data is too wide for a table
+        """
+        if data.dtype.itemsize <= 2:
+            # a table over every value, indexed by the bits of the data
+            # read as unsigned (so negative values need no offset)
+            udtype = np.dtype('u{0}'.format(data.dtype.itemsize))
+            lo, hi = 0, np.iinfo(udtype).max
+            values = np.arange(hi + 1, dtype=udtype).view(data.dtype)
+            data = data.view(udtype)
+        else:
+            lo, hi = int(data.min()), int(data.max())
+            if hi - lo + 1 > self.max_entries:
+                return None, None
+            values = np.arange(lo, hi + 1, dtype=np.int64)
+        key = (data.dtype, lo, hi, self.vmin, self.vmax) + self._params()
+        if key != self._table_key:
+            table = values.astype(np.float64)
+            self._mask_table = None
+            if self._masks_nonpositive() and values.min() <= 0:
+                self._mask_table = values <= 0
+            self._transform(table)
+            self._table = table
+            self._table_key = key
+        out = self._buffer(data.shape)
+        nonpos = None
+        if self._mask_table is not None:
+            nonpos = np.empty(data.shape, dtype=bool)
+        if self._idx is None or self._idx.size != self.chunk_size:
+            self._idx = np.empty(self.chunk_size, dtype=np.intp)
+        flat_in = data.reshape(-1)
+        flat_out = out.reshape(-1)
+        # gathering a chunk at a time keeps the intp copy of the indices
+        # small, and 'clip' skips the bounds checks (they are in range)
+        for start in range(0, flat_in.size, self.chunk_size):
+            chunk = slice(start, start + self.chunk_size)
+            idx = self._idx[:flat_in[chunk].size]
+            np.subtract(flat_in[chunk], lo, out=idx, casting='unsafe')
+            np.take(self._table, idx, out=flat_out[chunk], mode='clip')
+            if nonpos is not None:
+                np.take(self._mask_table, idx,
+                        out=nonpos.reshape(-1)[chunk], mode='clip')
+        return out, nonpos
+
+    def _from_floats(self, data):
+        """
+        Transform data chunk by chunk into the output buffer
+        """
+        out = self._buffer(data.shape)
+        nonpos = None
+        if self._masks_nonpositive():
+            nonpos = np.empty(data.shape, dtype=bool)
+        flat_in = data.reshape(-1)
+        flat_out = out.reshape(-1)
+        for start in range(0, flat_in.size, self.chunk_size):
+            chunk = slice(start, start + self.chunk_size)
+            np.copyto(flat_out[chunk], flat_in[chunk], casting='unsafe')
+            if nonpos is not None:
+                np.less_equal(flat_out[chunk], 0,
+                              out=nonpos.reshape(-1)[chunk])
+            self._transform(flat_out[chunk])
+        return out, nonpos
+
+
+class FastLogNorm(_TableNorm):
+    """
+    Logarithmic normalization, values <= 0 are masked (drawn in the
+    colormap's bad colour), as with `matplotlib.colors.LogNorm`.
+
+    If vmin is not positive, which is the full range of any detector frame
+    with empty pixels, the lower limit is taken to be 1 (the smallest
+    non-zero count), or vmax / 1000 if vmax is below 1.
+
+    See `_TableNorm` for the parameters.
+    """
+    def _masks_nonpositive(self):
+        return True
+
+    def _log_limits(self):
+        vmin, vmax = float(self.vmin), float(self.vmax)
+        if vmax <= 0:
+            # nothing to show, everything is masked anyway
+            return 0, 1
+        if vmin <= 0:
+            vmin = 1 if vmax > 1 else vmax / 1000
+        return np.log10(vmin), np.log10(vmax)
+
+    def _transform(self, x):
+        lo, hi = self._log_limits()
+        # the non-positive values are masked, give them something finite
+        np.maximum(x, np.finfo(np.float64).tiny, out=x)
+        np.log10(x, out=x)
+        x -= lo
+        if hi > lo:
+            x *= 1 / (hi - lo)
+        else:
+            x.fill(0)
+
+    def inverse(self, value):
+        lo, hi = self._log_limits()
+        return 10 ** (lo + np.asanyarray(value) * (hi - lo))
+
+
+class FastPowerNorm(_TableNorm):
+    """
+    Power-law normalization, ``((x - vmin) / (vmax - vmin)) ** gamma``.
+    Values below vmin stay linear (and below 0) so they are drawn in the
+    colormap's under colour.
+
+    Parameters
+    ----------
+    gamma : float
+        The exponent
+    vmin, vmax, clip, max_entries, chunk_size
+        See `_TableNorm`
+    """
+    def __init__(self, gamma, vmin=None, vmax=None, clip=False, **kwargs):
+        super(FastPowerNorm, self).__init__(vmin=vmin, vmax=vmax, clip=clip,
+                                            **kwargs)
+        self.gamma = gamma
+
+    def _params(self):
+        return (self.gamma, )
+
+    def _transform(self, x):
+        vmin, vmax = float(self.vmin), float(self.vmax)
+        if vmax == vmin:
+            x.fill(0)
+            return
+        x -= vmin
+        x *= 1 / (vmax - vmin)
+        pos = x > 0
+        np.power(x, self.gamma, out=x, where=pos)
+
+    def inverse(self, value):
+        vmin, vmax = float(self.vmin), float(self.vmax)
+        value = np.asanyarray(value, dtype=np.float64)
+        scaled = np.where(value > 0, np.abs(value) ** (1 / self.gamma),
+                          value)
+        return vmin + scaled * (vmax - vmin)
+
+
+class FastSqrtNorm(FastPowerNorm):
+    """
+    Square root normalization, see `FastPowerNorm`
+    """
+    def __init__(self, vmin=None, vmax=None, clip=False, **kwargs):
+        super(FastSqrtNorm, self).__init__(0.5, vmin=vmin, vmax=vmax,
+                                           clip=clip, **kwargs)
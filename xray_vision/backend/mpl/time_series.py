@@ -0,0 +1,193 @@
+# ######################################################################
+# Copyright (c) 2014, Brookhaven Science Associates, Brookhaven        #
+# National Laboratory. All rights reserved.                            #
+#                                                                      #
+# Redistribution and use in source and binary forms, with or without   #
+# modification, are permitted provided that the following conditions   #
+# are met:                                                             #
+#                                                                      #
+# * Redistributions of source code must retain the above copyright     #
+#   notice, this list of conditions and the following disclaimer.      #
+#                                                                      #
+# * Redistributions in binary form must reproduce the above copyright  #
+#   notice this list of conditions and the following disclaimer in     #
+#   the documentation and/or other materials provided with the         #
+#   distribution.                                                      #
+#                                                                      #
+# * Neither the name of the Brookhaven Science Associates, Brookhaven  #
+#   National Laboratory nor the names of its contributors may be used  #
+#   to endorse or promote products derived from this software without  #
+#   specific prior written permission.                                 #
+#                                                                      #
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS  #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT    #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS    #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE       #
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,           #
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES   #
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR   #
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)   #
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,  #
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OTHERWISE) ARISING   #
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE   #
+# POSSIBILITY OF SUCH DAMAGE.                                          #
+########################################################################
+"""
+Side plot of the intensity of the pixel under the cursor through the
+whole stack.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import numpy as np
+
+from . import _AxesBlitter
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class TimeSeriesProbe(object):
+    """
+    Plots the series of the pixel under the cursor (or a reduction of the
+    box around it) in every frame, from a
+    `xray_vision.backend.time_series.PixelSeriesCache`.
+
+    It is a cursor position callback: pass it to
+    `CrossSection.add_cursor_position_cb` (or use
+    `CrossSection2DView.add_time_series_probe`).  While the cache is
+    still being filled the frames not read yet are left out of the plot,
+    and the plot is refreshed every `refresh` seconds until it is done.
+
+    Once the figure has been drawn, only the probe axes are redrawn and
+    blitted, so it can share a figure with a `CrossSection` without
+    costing it full redraws.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        The axes to plot in
+    cache : PixelSeriesCache
+        Started if it is not already
+    size : int, optional
+        Edge of the box around the pixel.  Defaults to 1
+    reduction : {'mean', 'sum', 'max', 'min'}, optional
+        How the box is reduced.  Defaults to 'mean'
+    refresh : float, optional
+        Seconds between refreshes while the cache is being filled.
+        Defaults to .5
+    """
+    def __init__(self, ax, cache, size=1, reduction='mean', refresh=.5):
+        if reduction not in cache.reductions:
+            raise ValueError("reduction must be one of {0}, not "
+                             "{1!r}".format(cache.reductions, reduction))
+        self._ax = ax
+        self.cache = cache
+        self._size = int(size)
+        self._reduction = reduction
+        self._refresh = refresh
+        self._pixel = None
+        self._version = None
+        self._timer = None
+        self._line, = ax.plot([], [], 'k-')
+        self._marker = ax.axvline(0, color='r', visible=False)
+        ax.set_xlim(0, max(cache.num_frames - 1, 1))
+        ax.set_xlabel('frame')
+        # the probe redraws only its own axes
+        self._blitter = _AxesBlitter(ax)
+        cache.start()
+
+    @property
+    def pixel(self):
+        """
+        The (row, col) probed, None before the cursor first moves
+        """
+        return self._pixel
+
+    def __call__(self, col, row):
+        self._pixel = (row, col)
+        self.refresh()
+
+    def update_box(self, size, reduction=None):
+        """
+        Set the box around the pixel and how it is reduced
+
+        Parameters
+        ----------
+        size : int
+        reduction : {'mean', 'sum', 'max', 'min'}, optional
+            Defaults to keeping the current one
+        """
+        if reduction is None:
+            reduction = self._reduction
+        if reduction not in self.cache.reductions:
+            raise ValueError("reduction must be one of {0}, not "
+                             "{1!r}".format(self.cache.reductions,
+                                            reduction))
+        self._size = int(size)
+        self._reduction = reduction
+        self.refresh()
+
+    def set_frame(self, index):
+        """
+        Mark the frame shown in the image
+        """
+        self._marker.set_xdata([index, index])
+        self._marker.set_visible(True)
+        self._redraw()
+
+    def refresh(self):
+        """
+        Plot the series of the probed pixel again, e.g. with more frames
+        in the cache
+        """
+        if self._pixel is None:
+            return
+        cache = self.cache
+        self._version = cache.version
+        row, col = self._pixel
+        if not (0 <= row < cache.shape[0] and 0 <= col < cache.shape[1]):
+            return
+        series = cache.series(row, col, size=self._size,
+                              reduction=self._reduction)
+        self._line.set_data(np.arange(len(series)), series)
+        self._ax.set_xlim(0, max(cache.num_frames - 1, 1))
+        self._ax.relim()
+        self._ax.autoscale_view(scalex=False)
+        self._redraw()
+        if not cache.done:
+            self._start_timer()
+
+    def _redraw(self):
+        self._blitter.redraw()
+
+    def _start_timer(self):
+        canvas = self._ax.figure.canvas
+        if self._timer is not None or canvas is None:
+            return
+        self._timer = canvas.new_timer(interval=int(self._refresh * 1000))
+        self._timer.add_callback(self._on_tick)
+        self._timer.start()
+
+    def _on_tick(self):
+        if self.cache.version != self._version:
+            self.refresh()
+        if self.cache.done:
+            self._stop_timer()
+
+    def _stop_timer(self):
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+
+    def remove(self):
+        """
+        Remove the plot from the axes
+        """
+        self._stop_timer()
+        self._blitter.disconnect()
+        canvas = self._ax.figure.canvas
+        self._line.remove()
+        self._marker.remove()
+        if canvas is not None:
+            canvas.draw_idle()
@@ -0,0 +1,261 @@
+# ######################################################################
+# Copyright (c) 2014, Brookhaven Science Associates, Brookhaven        #
+# National Laboratory. All rights reserved.                            #
+#                                                                      #
+# Redistribution and use in source and binary forms, with or without   #
+# modification, are permitted provided that the following conditions   #
+# are met:                                                             #
+#                                                                      #
+# * Redistributions of source code must retain the above copyright     #
+#   notice, this list of conditions and the following disclaimer.      #
+#                                                                      #
+# * Redistributions in binary form must reproduce the above copyright  #
+#   notice this list of conditions and the following disclaimer in     #
+#   the documentation and/or other materials provided with the         #
+#   distribution.                                                      #
+#                                                                      #
+# * Neither the name of the Brookhaven Science Associates, Brookhaven  #
+#   National Laboratory nor the names of its contributors may be used  #
+#   to endorse or promote products derived from this software without  #
+#   specific prior written permission.                                 #
+#                                                                      #
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS  #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT    #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS    #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE       #
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,           #
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES   #
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR   #
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)   #
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,  #
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OTHERWISE) ARISING   #
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE   #
+# POSSIBILITY OF SUCH DAMAGE.                                          #
+########################################################################
+"""
+Bad (hot, dead, ...) pixel masks which are set up once per detector and
+let the statistics and limit computations skip those pixels without
+copying or masking every frame.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from collections import OrderedDict
+
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class BadPixelMask(object):
+    """
+    The bad pixels of a detector, stored as a sorted flat index: of the
+    bad pixels or, if there are more bad than good ones, of the good
+    pixels.
+
+    The values of the good pixels of a frame are handed out in chunks
+    (see `good_chunks`) so the statistics of frames can be computed
+    without making a masked copy of each frame.
+
+    Parameters
+    ----------
+    mask : ndarray
+        2D, True (non-zero) for the bad pixels
+    chunk_size : int, optional
+        Most values per chunk.  Defaults to 2**16
+
+    Attributes
+    ----------
+    shape : tuple
+        Shape of the frames the mask is for
+    index : ndarray
+        Sorted flat indices of the bad pixels if `indexes_bad`, of the
+        good pixels otherwise
+    indexes_bad : bool
+    """
+    def __init__(self, mask, chunk_size=2 ** 16):
+        mask = np.asarray(mask)
+        if mask.ndim != 2:
+            raise ValueError("mask must be 2D, not of shape "
+                             "{0}".format(mask.shape))
+        self._setup(mask.shape, np.flatnonzero(mask), True, chunk_size)
+
+    @classmethod
+    def from_index(cls, shape, index, bad=True, chunk_size=2 ** 16):
+        """
+        Make a mask from a flat index
+
+        Parameters
+        ----------
+        shape : tuple
+            Shape of the frames
+        index : array of int
+            Flat indices of the bad (or good) pixels
+        bad : bool, optional
+            True if `index` lists the bad pixels. Defaults to True
+        """
+        self = cls.__new__(cls)
+        self._setup(tuple(shape), np.unique(np.asarray(index, np.intp)),
+                    bad, chunk_size)
+        return self
+
+    def _setup(self, shape, index, bad, chunk_size):
+        self.shape = tuple(shape)
+        self.size = int(np.prod(self.shape))
+        self.chunk_size = chunk_size
+        if len(index) and (index[0] < 0 or index[-1] >= self.size):
+            raise ValueError("index out of range for shape "
+                             "{0}".format(self.shape))
+        if len(index) > self.size // 2:
+            # store whichever is smaller
+            keep = np.ones(self.size, dtype=bool)
+            keep[index] = False
+            index = np.flatnonzero(keep)
+            bad = not bad
+        self.index = index.astype(np.intp, copy=False)
+        self.indexes_bad = bad
+        self.n_bad = len(index) if bad else self.size - len(index)
+        self.n_good = self.size - self.n_bad
+        self._bool = None
+        self._subsets = OrderedDict()
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by the index (and the boolean mask, once made)
+        """
+        return self.index.nbytes + (0 if self._bool is None
+                                    else self._bool.nbytes)
+
+    def _check(self, frame):
+        if frame.shape != self.shape:
+            raise ValueError("frame of shape {0} does not match the mask "
+                             "of shape {1}".format(frame.shape, self.shape))
+
+    def good_chunks(self, frame):
+        """
+        The values of the good pixels of `frame`, in order, as 1D arrays
+        of at most about `chunk_size` values.  Parts of the frame without
+        bad pixels are handed out as views where possible, the others go
+        through one buffer which is overwritten by the next chunk, so
+        each chunk must be used before asking for the next.
+
+        Parameters
+        ----------
+        frame : ndarray
+            2D, of the shape of the mask
+        """
+        self._check(frame)
+        rows, cols = self.shape
+        if not self.indexes_bad:
+            if not len(self.index):
+                return
+            buf = np.empty(min(self.chunk_size, len(self.index)),
+                           dtype=frame.dtype)
+            flat = frame.ravel() if frame.flags.c_contiguous else None
+            for i in range(0, len(self.index), self.chunk_size):
+                idx = self.index[i:i + self.chunk_size]
+                if flat is not None:
+                    yield np.take(flat, idx, out=buf[:len(idx)])
+                else:
+                    yield frame[np.divmod(idx, cols)]
+            return
+        rows_per = max(self.chunk_size // max(cols, 1), 1)
+        buf = keep = None
+        for r0 in range(0, rows, rows_per):
+            r1 = min(r0 + rows_per, rows)
+            block = frame[r0:r1].ravel()
+            lo, hi = np.searchsorted(self.index, [r0 * cols, r1 * cols])
+            if lo == hi:
+                yield block
+                continue
+            if buf is None:
+                buf = np.empty(rows_per * cols, dtype=frame.dtype)
+                keep = np.ones(rows_per * cols, dtype=bool)
+            local = self.index[lo:hi] - r0 * cols
+            keep[local] = False
+            n = block.size
+            yield np.compress(keep[:n], block, out=buf[:n - (hi - lo)])
+            keep[local] = True
+
+    def good_values(self, frame):
+        """
+        The values of the good pixels of `frame`, as a new 1D array
+        """
+        out = np.empty(self.n_good, dtype=frame.dtype)
+        pos = 0
+        for chunk in self.good_chunks(frame):
+            out[pos:pos + chunk.size] = chunk
+            pos += chunk.size
+        return out
+
+    def to_bool(self):
+        """
+        The mask as a (cached) 2D boolean array, True for bad pixels
+        """
+        if self._bool is None:
+            flat = np.full(self.size, not self.indexes_bad, dtype=bool)
+            flat[self.index] = self.indexes_bad
+            self._bool = flat.reshape(self.shape)
+        return self._bool
+
+    def paint(self, rgba, color):
+        """
+        Colour the bad pixels of an RGBA image in place
+
+        Parameters
+        ----------
+        rgba : ndarray
+            (rows, cols, 4), C contiguous
+        color : array_like
+            4 values, of the dtype of `rgba`
+        """
+        if self.indexes_bad:
+            rgba.reshape(-1, 4)[self.index] = color
+        else:
+            rgba[self.to_bool()] = color
+
+    def subset(self, index):
+        """
+        The mask of ``frame[index]``
+
+        Parameters
+        ----------
+        index : tuple
+            Two slices (with positive steps), or two integer arrays
+            picking individual pixels (see
+            `xray_vision.backend.stats.subsample_index`)
+
+        Returns
+        -------
+        mask : BadPixelMask
+        """
+        rows, cols = self.shape
+        if not all(isinstance(i, slice) for i in index):
+            r, c = np.broadcast_arrays(*index)
+            flat = (r * cols + c).ravel()
+            pos = np.minimum(np.searchsorted(self.index, flat),
+                             max(len(self.index) - 1, 0))
+            member = (self.index[pos] == flat if len(self.index)
+                      else np.zeros(flat.shape, dtype=bool))
+            bad = member if self.indexes_bad else ~member
+            return BadPixelMask(bad.reshape(r.shape),
+                                chunk_size=self.chunk_size)
+        key = tuple(s.indices(n) for s, n in zip(index, self.shape))
+        try:
+            return self._subsets[key]
+        except KeyError:
+            pass
+        (r0, r1, rs), (c0, c1, cs) = key
+        shape = (len(range(r0, r1, rs)), len(range(c0, c1, cs)))
+        r, c = np.divmod(self.index, cols)
+        sel = ((r >= r0) & (r < r1) & ((r - r0) % rs == 0) &
+               (c >= c0) & (c < c1) & ((c - c0) % cs == 0))
+        sub = BadPixelMask.from_index(
+            shape, ((r[sel] - r0) // rs) * shape[1] + (c[sel] - c0) // cs,
+            bad=self.indexes_bad, chunk_size=self.chunk_size)
+        self._subsets[key] = sub
+        while len(self._subsets) > 8:
+            self._subsets.popitem(last=False)
+        return sub
@@ -0,0 +1,284 @@
+# ######################################################################
+# Copyright (c) 2014, Brookhaven Science Associates, Brookhaven        #
+# National Laboratory. All rights reserved.                            #
+#                                                                      #
+# Redistribution and use in source and binary forms, with or without   #
+# modification, are permitted provided that the following conditions   #
+# are met:                                                             #
+#                                                                      #
+# * Redistributions of source code must retain the above copyright     #
+#   notice, this list of conditions and the following disclaimer.      #
+#                                                                      #
+# * Redistributions in binary form must reproduce the above copyright  #
+#   notice this list of conditions and the following disclaimer in     #
+#   the documentation and/or other materials provided with the         #
+#   distribution.                                                      #
+#                                                                      #
+# * Neither the name of the Brookhaven Science Associates, Brookhaven  #
+#   National Laboratory nor the names of its contributors may be used  #
+#   to endorse or promote products derived from this software without  #
+#   specific prior written permission.                                 #
+#                                                                      #
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS  #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT    #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS    #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE       #
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,           #
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES   #
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR   #
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)   #
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,  #
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OTHERWISE) ARISING   #
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE   #
+# POSSIBILITY OF SUCH DAMAGE.                                          #
+########################################################################
+"""
+Background loading of the frames around the one being displayed, so that
+stepping through a disk-backed stack does not block on I/O.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from .stats import frame_stats
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class CachedFrame(object):
+    """
+    A loaded frame and what has been computed from it
+
+    Attributes
+    ----------
+    index : int
+        The index of the frame
+    frame : ndarray
+        The frame data
+    stats : xray_vision.backend.stats.FrameStats
+        The statistics of the frame
+    limits : tuple or None
+        The result of the prefetcher's limit function on the frame, None
+        if there was no limit function when the frame was loaded
+    limit_func : callable or None
+        The limit function `limits` came from
+    """
+    __slots__ = ('index', 'frame', 'stats', 'limits', 'limit_func')
+
+    def __init__(self, index, frame, stats, limits=None, limit_func=None):
+        self.index = index
+        self.frame = frame
+        self.stats = stats
+        self.limits = limits
+        self.limit_func = limit_func if limits is not None else None
+
+
+class FramePrefetcher(object):
+    """
+    Bounded cache of frames which is filled ahead of the current frame in
+    the direction the user is scrubbing by a pool of worker threads.
+
+    The workers load the frame and compute its statistics (and the color
+    limits, if a limit function is set) so that none of that happens on
+    the GUI thread when the frame is shown.
+
+    Parameters
+    ----------
+    loader : callable
+        ``loader(i)`` returns frame i.  Must be safe to call from a worker
+        thread.
+    num_frames : int
+        Number of frames
+    depth : int, optional
+        How many frames ahead of the current one to load. Defaults to 4
+    max_workers : int, optional
+        Number of loader threads. Defaults to 2
+    cache_size : int, optional
+        Maximum number of frames to keep.  Defaults to ``4 * depth + 1``,
+        which keeps some of the frames just stepped over around.
+    limit_func : callable, optional
+        Limit function to pre-compute the color limits with
+    mask : BadPixelMask, optional
+        Bad pixels to leave out of the statistics (and so the limits).
+        `clear` the prefetcher when changing it.
+
+    Attributes
+    ----------
+    hits : int
+        Number of `get` calls answered from the cache
+    waits : int
+        Number of `get` calls that had to wait for a frame which was
+        already being loaded
+    misses : int
+        Number of `get` calls which loaded the frame themselves
+    """
+    def __init__(self, loader, num_frames, depth=4, max_workers=2,
+                 cache_size=None, limit_func=None, mask=None):
+        self._loader = loader
+        self.num_frames = num_frames
+        self._depth = depth
+        self._cache_size = cache_size
+        self.limit_func = limit_func
+        self.mask = mask
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last = None
+        self._direction = 1
+        self.hits = self.waits = self.misses = 0
+
+    @property
+    def depth(self):
+        return self._depth
+
+    @depth.setter
+    def depth(self, depth):
+        self._depth = depth
+        self._trim()
+
+    @property
+    def cache_size(self):
+        if self._cache_size is None:
+            return 4 * self._depth + 1
+        return self._cache_size
+
+    def _load(self, i):
+        """
+        Load a frame and compute what we can from it.  Runs on the workers
+        """
+        frame = self._loader(i)
+        mask = self.mask
+        stats = frame_stats(frame, mask=False if mask is None else mask)
+        limit_func = self.limit_func
+        limits = None if limit_func is None else limit_func(frame)
+        return CachedFrame(i, frame, stats, limits, limit_func)
+
+    def _store(self, entry):
+        with self._lock:
+            self._cache.pop(entry.index, None)
+            self._cache[entry.index] = entry
+            self._trim_locked()
+
+    def _trim(self):
+        with self._lock:
+            self._trim_locked()
+
+    def _trim_locked(self):
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _collect(self):
+        """
+        Move finished background loads into the cache
+        """
+        for i, fut in list(self._pending.items()):
+            if not fut.done():
+                continue
+            del self._pending[i]
+            if fut.cancelled():
+                continue
+            exc = fut.exception()
+            if exc is not None:
+                logger.debug("prefetching frame %s failed: %r", i, exc)
+                continue
+            self._store(fut.result())
+
+    def get(self, i):
+        """
+        Return the `CachedFrame` for frame i, loading it if needed, and
+        start pre-fetching the frames after it in the scrub direction
+
+        Parameters
+        ----------
+        i : int
+            The frame index
+
+        Returns
+        -------
+        entry : CachedFrame
+        """
+        self._collect()
+        with self._lock:
+            entry = self._cache.pop(i, None)
+            if entry is not None:
+                # mark as most recently used
+                self._cache[i] = entry
+        if entry is not None:
+            self.hits += 1
+        elif i in self._pending:
+            self.waits += 1
+            fut = self._pending.pop(i)
+            entry = fut.result()
+            self._store(entry)
+        else:
+            self.misses += 1
+            entry = self._load(i)
+            self._store(entry)
+        self._prefetch_around(i)
+        return entry
+
+    def _prefetch_around(self, i):
+        if self._last is not None and i != self._last:
+            direction = 1 if i > self._last else -1
+            if direction != self._direction:
+                self._direction = direction
+                # the user turned around, drop what is queued the old way
+                self._cancel_outside(i)
+        self._last = i
+        for step in range(1, self._depth + 1):
+            j = i + step * self._direction
+            if not 0 <= j < self.num_frames:
+                break
+            if j in self._pending or j in self._cache:
+                continue
+            self._pending[j] = self._executor.submit(self._load, j)
+
+    def _cancel_outside(self, i):
+        """
+        Cancel the queued loads which are not ahead of frame i in the
+        current direction
+        """
+        for j, fut in list(self._pending.items()):
+            if (j - i) * self._direction <= 0 and fut.cancel():
+                del self._pending[j]
+
+    def clear(self):
+        """
+        Drop all cached frames and cancel any queued loads, e.g. because
+        the data changed
+        """
+        for fut in self._pending.values():
+            fut.cancel()
+        self._pending.clear()
+        with self._lock:
+            self._cache.clear()
+        self._last = None
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by the cached frames
+        """
+        with self._lock:
+            return sum(entry.frame.nbytes for entry in self._cache.values())
+
+    def clear_limits(self):
+        """
+        Forget the pre-computed limits, e.g. because the limit function
+        changed
+        """
+        with self._lock:
+            for entry in self._cache.values():
+                entry.limits = entry.limit_func = None
+
+    def shutdown(self, wait=False):
+        """
+        Stop the worker threads
+        """
+        self.clear()
+        self._executor.shutdown(wait=wait)
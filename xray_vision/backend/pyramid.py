@@ -0,0 +1,165 @@
+# ######################################################################
+# Copyright (c) 2014, Brookhaven Science Associates, Brookhaven        #
+# National Laboratory. All rights reserved.                            #
+#                                                                      #
+# Redistribution and use in source and binary forms, with or without   #
+# modification, are permitted provided that the following conditions   #
+# are met:                                                             #
+#                                                                      #
+# * Redistributions of source code must retain the above copyright     #
+#   notice, this list of conditions and the following disclaimer.      #
+#                                                                      #
+# * Redistributions in binary form must reproduce the above copyright  #
+#   notice this list of conditions and the following disclaimer in     #
+#   the documentation and/or other materials provided with the         #
+#   distribution.                                                      #
+#                                                                      #
+# * Neither the name of the Brookhaven Science Associates, Brookhaven  #
+#   National Laboratory nor the names of its contributors may be used  #
+#   to endorse or promote products derived from this software without  #
+#   specific prior written permission.                                 #
+#                                                                      #
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS  #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT    #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS    #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE       #
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,           #
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES   #
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR   #
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)   #
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,  #
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OTHERWISE) ARISING   #
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE   #
+# POSSIBILITY OF SUCH DAMAGE.                                          #
+########################################################################
+"""
+Multi-resolution (pyramid) representations of images, used to hand the
+renderer an array that is no bigger than what can actually be shown.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def _reduce_pairs(im, reduction):
+    """
+    Reduce each pair of rows of `im` to one row.  An odd trailing row is
+    kept as is.
+    """
+    nrows = im.shape[0]
+    top, bottom = im[0:nrows - 1:2], im[1::2]
+    if reduction == 'mean' and im.dtype.kind in 'iu':
+        # floor((a + b) / 2) without overflow, staying in the image dtype
+        out = top >> 1
+        out += bottom >> 1
+        out += top & bottom & 1
+    elif reduction == 'mean':
+        dtype = np.float64 if im.dtype == np.float64 else np.float32
+        out = np.add(top, bottom, dtype=dtype)
+        out *= .5
+    elif reduction == 'max':
+        out = np.maximum(top, bottom)
+    elif reduction == 'min':
+        out = np.minimum(top, bottom)
+    else:
+        raise ValueError("reduction must be one of {0}, not "
+                         "{1!r}".format(ImagePyramid.reductions, reduction))
+    if nrows % 2:
+        out = np.concatenate([out, im[-1:].astype(out.dtype)])
+    return out
+
+
+def _reduce_2x2(im, reduction):
+    """
+    Reduce each 2x2 block of `im` to one pixel
+    """
+    # strided element-wise ops are much faster than reducing a reshaped
+    # (n, 2, m, 2) view
+    return _reduce_pairs(_reduce_pairs(im, reduction).T, reduction).T
+
+
+class ImagePyramid(object):
+    """
+    Lazily built stack of down-sampled copies of an image.
+
+    Level 0 is the image itself, level ``k`` is reduced by a factor of
+    ``2**k`` along each axis.  Levels are only computed when first asked
+    for, each one from the level below it.
+
+    Parameters
+    ----------
+    image : ndarray
+        2D image data
+    reduction : {'mean', 'max', 'min'}, optional
+        How to combine blocks of pixels.  'max' keeps isolated bright
+        pixels (e.g. Bragg peaks) visible when zoomed out.  Defaults to
+        'mean'.  All levels keep the dtype of integer images (the 'mean'
+        of integers is rounded down)
+    min_size : int, optional
+        No level is made smaller than this along its longest axis.
+        Defaults to 256
+    """
+    reductions = ('mean', 'max', 'min')
+
+    def __init__(self, image, reduction='mean', min_size=256):
+        if reduction not in self.reductions:
+            raise ValueError("reduction must be one of {0}, not "
+                             "{1!r}".format(self.reductions, reduction))
+        self.reduction = reduction
+        self.shape = image.shape
+        self._levels = [image]
+        longest = max(image.shape)
+        self.max_level = 0
+        while longest > min_size:
+            longest = (longest + 1) // 2
+            self.max_level += 1
+
+    def level(self, n):
+        """
+        Return the image at level n
+
+        Parameters
+        ----------
+        n : int
+            Level, clipped to [0, max_level]
+
+        Returns
+        -------
+        im : ndarray
+            The image reduced by ``2**n`` along each axis
+        """
+        n = max(0, min(n, self.max_level))
+        while len(self._levels) <= n:
+            self._levels.append(_reduce_2x2(self._levels[-1],
+                                            self.reduction))
+        return self._levels[n]
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by the levels computed so far (not counting the image)
+        """
+        return sum(level.nbytes for level in self._levels[1:])
+
+    def level_for(self, data_per_screen_px):
+        """
+        Pick the coarsest level that still has at least one pixel per
+        screen pixel
+
+        Parameters
+        ----------
+        data_per_screen_px : float
+            How many image pixels currently share one screen pixel (the
+            larger of the two axes)
+
+        Returns
+        -------
+        n : int
+        """
+        if not data_per_screen_px >= 2:
+            return 0
+        return min(int(np.log2(data_per_screen_px)), self.max_level)
@@ -0,0 +1,479 @@
+# ######################################################################
+# Copyright (c) 2014, Brookhaven Science Associates, Brookhaven        #
+# National Laboratory. All rights reserved.                            #
+#                                                                      #
+# Redistribution and use in source and binary forms, with or without   #
+# modification, are permitted provided that the following conditions   #
+# are met:                                                             #
+#                                                                      #
+# * Redistributions of source code must retain the above copyright     #
+#   notice, this list of conditions and the following disclaimer.      #
+#                                                                      #
+# * Redistributions in binary form must reproduce the above copyright  #
+#   notice this list of conditions and the following disclaimer in     #
+#   the documentation and/or other materials provided with the         #
+#   distribution.                                                      #
+#                                                                      #
+# * Neither the name of the Brookhaven Science Associates, Brookhaven  #
+#   National Laboratory nor the names of its contributors may be used  #
+#   to endorse or promote products derived from this software without  #
+#   specific prior written permission.                                 #
+#                                                                      #
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS  #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT    #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS    #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE       #
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,           #
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES   #
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR   #
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)   #
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,  #
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OTHERWISE) ARISING   #
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE   #
+# POSSIBILITY OF SUCH DAMAGE.                                          #
+########################################################################
+"""
+Live frames through shared memory: a detector (or any producer process)
+writes frames into a ring of slots in a shared memory segment and the
+viewer shows them straight out of it, without pickling them through
+pipes or Qt signals.
+
+Each slot carries the sequence number of the frame in it.  The writer
+marks a slot as being written (-1) before filling it and stores the
+sequence number after, so a reader can tell whether the frame it looked
+at was (being) overwritten.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import multiprocessing
+import time
+
+import numpy as np
+import six
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # python < 3.8
+    shared_memory = None
+
+from .frame_source import FrameSource
+
+import logging
+logger = logging.getLogger(__name__)
+
+_MAGIC = b'xvring1'
+# layout of the segment: this header, then int64 counters (the number of
+# frames written so far followed by the sequence number of the frame in
+# each slot), then the slots, aligned
+_HEADER = np.dtype([('magic', 'S8'), ('dtype', 'S16'), ('rows', '<i8'),
+                    ('cols', '<i8'), ('n_slots', '<i8')])
+_ALIGN = 64
+# sequence number of a slot which is empty or being written
+_INVALID = -1
+
+
+def _check_shared_memory():
+    if shared_memory is None:
+        raise ImportError("shared memory frame rings need "
+                          "multiprocessing.shared_memory (python >= 3.8)")
+
+
+def _open_shared_memory(name):
+    """
+    Attach to an existing segment without this process taking ownership of
+    it
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # python < 3.13 registers every attachment with the resource
+        # tracker.  That is harmless for processes sharing the tracker of
+        # the owner (e.g. started by it with multiprocessing), others
+        # unlink the segment when they exit.
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedFrameRing(object):
+    """
+    Ring of `n_slots` frames in a shared memory segment
+
+    Use `create` in the process owning the segment and `attach` (by
+    `name`) in the others.  There must be only one writer.
+
+    Attributes
+    ----------
+    name : str
+        Name of the shared memory segment
+    shape : tuple
+        (rows, cols) of a frame
+    dtype : np.dtype
+    n_slots : int
+    """
+    def __init__(self, shm):
+        self._shm = shm
+        buf = shm.buf
+        header = np.ndarray((), _HEADER, buffer=buf)
+        if header['magic'].item() != _MAGIC:
+            raise ValueError("shared memory segment {0!r} is not a frame "
+                             "ring".format(shm.name))
+        self.name = shm.name
+        self.shape = (int(header['rows']), int(header['cols']))
+        self.dtype = np.dtype(header['dtype'].item().decode('ascii'))
+        self.n_slots = int(header['n_slots'])
+        offset = _HEADER.itemsize
+        self._counters = np.ndarray(self.n_slots + 1, np.int64, buffer=buf,
+                                    offset=offset)
+        # one sequence number per slot
+        self._slot_seq = self._counters[1:]
+        offset = -(-(offset + self._counters.nbytes) // _ALIGN) * _ALIGN
+        self._slots = np.ndarray((self.n_slots,) + self.shape, self.dtype,
+                                 buffer=buf, offset=offset)
+        # what readers are handed
+        self._frames = self._slots.view()
+        self._frames.flags.writeable = False
+
+    @staticmethod
+    def _size(shape, dtype, n_slots):
+        offset = _HEADER.itemsize + 8 * (n_slots + 1)
+        offset = -(-offset // _ALIGN) * _ALIGN
+        return offset + n_slots * int(np.prod(shape)) * np.dtype(dtype).itemsize
+
+    @classmethod
+    def create(cls, shape, dtype, n_slots=8, name=None):
+        """
+        Make a new ring, owned by this process (which should `unlink` it
+        when done)
+
+        Parameters
+        ----------
+        shape : tuple
+            (rows, cols) of a frame
+        dtype : numpy dtype
+        n_slots : int, optional
+            Number of frames kept.  A frame handed to a reader stays valid
+            until `n_slots` more have been written.  Defaults to 8
+        name : str, optional
+            Name of the segment.  Defaults to a random one
+
+        Returns
+        -------
+        ring : SharedFrameRing
+        """
+        _check_shared_memory()
+        dtype = np.dtype(dtype)
+        if len(shape) != 2:
+            raise ValueError("frames must be 2D, not of shape "
+                             "{0}".format(shape))
+        if n_slots < 1:
+            raise ValueError("n_slots must be at least 1, "
+                             "not {0}".format(n_slots))
+        shm = shared_memory.SharedMemory(
+            name=name, create=True, size=cls._size(shape, dtype, n_slots))
+        header = np.ndarray((), _HEADER, buffer=shm.buf)
+        header['magic'] = _MAGIC
+        header['dtype'] = dtype.str.encode('ascii')
+        header['rows'], header['cols'] = shape
+        header['n_slots'] = n_slots
+        del header
+        counters = np.ndarray(n_slots + 1, np.int64, buffer=shm.buf,
+                              offset=_HEADER.itemsize)
+        counters[0] = 0
+        counters[1:] = _INVALID
+        del counters
+        return cls(shm)
+
+    @classmethod
+    def attach(cls, name):
+        """
+        Attach to the ring made (by another process) with `create`
+
+        Parameters
+        ----------
+        name : str
+            The `name` of the ring
+        """
+        _check_shared_memory()
+        return cls(_open_shared_memory(name))
+
+    @property
+    def written(self):
+        """
+        Number of frames written so far, the sequence number of the next one
+        """
+        return int(self._counters[0])
+
+    def write(self, frame):
+        """
+        Copy a frame into the next slot
+
+        Returns
+        -------
+        seq : int
+            The sequence number of the frame
+        """
+        seq = self.written
+        slot = seq % self.n_slots
+        self._slot_seq[slot] = _INVALID
+        self._slots[slot] = frame
+        self._slot_seq[slot] = seq
+        self._counters[0] = seq + 1
+        return seq
+
+    def read(self, seq, copy=False):
+        """
+        Frame number `seq`
+
+        Parameters
+        ----------
+        seq : int
+            Sequence number of the frame
+        copy : bool, optional
+            If False (the default) return a read-only view of the slot,
+            which the writer overwrites once `n_slots` more frames have
+            been written.  If True return a copy, checked to not have
+            been overwritten while copying
+
+        Returns
+        -------
+        frame : ndarray or None
+            None if the frame is not in the ring (not written yet, or
+            overwritten)
+        """
+        if seq < 0:
+            return None
+        slot = seq % self.n_slots
+        if self._slot_seq[slot] != seq:
+            return None
+        frame = self._frames[slot]
+        if copy:
+            frame = frame.copy()
+            if self._slot_seq[slot] != seq:
+                return None
+        return frame
+
+    def close(self):
+        """
+        Detach from the segment.  Frames handed out must not be used
+        afterwards
+        """
+        self._counters = self._slot_seq = None
+        self._slots = self._frames = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # views of the slots are still around (e.g. shown by a
+            # figure), the mapping goes when they do
+            logger.debug("frames of %s still in use, not unmapping",
+                         self.name)
+
+    def unlink(self):
+        """
+        Destroy the segment (once every process has closed it).  Only
+        for the process which created it
+        """
+        self._shm.unlink()
+
+
+class RingBufferFrameSource(FrameSource):
+    """
+    Frame source showing the frames in a `SharedFrameRing`, as they are
+    written by another process
+
+    Frames are returned as read-only views of the shared memory (no
+    copies), which stay valid until the writer has written `n_slots` more
+    frames.
+
+    Parameters
+    ----------
+    ring : SharedFrameRing or str
+        The ring, or the name of one to attach to
+    follow_latest : bool, optional
+        If True (the default) every index shows the newest frame,
+        frames written since the last one shown are skipped (and counted
+        in `dropped`).  If False index ``i`` is the ``i``-th oldest frame
+        in the ring, the last index the newest
+    copy : bool, optional
+        Return copies rather than views of the frames.  Defaults to False
+
+    Attributes
+    ----------
+    seq : int or None
+        Sequence number of the last frame returned
+    shown : int
+        Number of frames returned (new ones only, re-reading the same
+        frame does not count)
+    dropped : int
+        Number of frames skipped over in follow-latest mode
+    overruns : int
+        Number of reads which lost the race against the writer (the slot
+        was overwritten while being read) and had to be retried
+    """
+    live = True
+
+    def __init__(self, ring, follow_latest=True, copy=False):
+        if isinstance(ring, six.string_types):
+            ring = SharedFrameRing.attach(ring)
+        self.ring = ring
+        self.follow_latest = follow_latest
+        self.copy = copy
+        self.seq = None
+        self.shown = 0
+        self.dropped = 0
+        self.overruns = 0
+        self._blank = None
+
+    @property
+    def name(self):
+        return 'ring buffer {0}'.format(self.ring.name)
+
+    @property
+    def version(self):
+        """
+        Changes every time a frame is written
+        """
+        return self.ring.written
+
+    def __len__(self):
+        return self.ring.n_slots
+
+    @property
+    def shape(self):
+        return self.ring.shape
+
+    @property
+    def dtype(self):
+        return self.ring.dtype
+
+    def _blank_frame(self):
+        if self._blank is None:
+            self._blank = np.zeros(self.shape, self.dtype)
+        return self._blank
+
+    def get_frame(self, i):
+        while True:
+            written = self.ring.written
+            if self.follow_latest:
+                seq = written - 1
+            else:
+                seq = written - len(self) + i
+            if seq < 0:
+                # nothing there yet
+                return self._blank_frame()
+            frame = self.ring.read(seq, copy=self.copy)
+            if frame is not None:
+                break
+            # the writer got to the slot first, look again
+            self.overruns += 1
+        if seq != self.seq:
+            if (self.follow_latest and self.seq is not None and
+                    seq > self.seq + 1):
+                self.dropped += seq - self.seq - 1
+            self.seq = seq
+            self.shown += 1
+        return frame
+
+    def close(self):
+        """
+        Detach from the ring
+        """
+        self.ring.close()
+
+
+def _detector_frames(shape, dtype, seed):
+    """
+    Endless synthetic detector frames: a powder ring and a few Bragg
+    peaks, pulsing, over noise
+    """
+    rs = np.random.RandomState(seed)
+    rows, cols = shape
+    y, x = np.ogrid[:rows, :cols]
+    r = np.hypot(y - rows / 2, x - cols / 2)
+    pattern = np.exp(-((r - min(shape) / 3) / (min(shape) / 50 + 1)) ** 2)
+    for py, px in rs.randint(0, min(shape), size=(8, 2)):
+        pattern += np.exp(-((y - py) ** 2 + (x - px) ** 2) / 8.)
+    dtype = np.dtype(dtype)
+    top = np.iinfo(dtype).max / 2 if dtype.kind in 'iu' else 1000
+    noise = [rs.random_sample(shape) * top * .05 for _ in range(4)]
+    frame = np.empty(shape, np.float64)
+    n = 0
+    while True:
+        np.multiply(pattern, top * (.6 + .4 * np.sin(n / 10)), out=frame)
+        frame += noise[n % len(noise)]
+        yield frame.astype(dtype)
+        n += 1
+
+
+def _simulate(name, rate, num_frames, stop, seed):
+    ring = SharedFrameRing.attach(name)
+    try:
+        frames = _detector_frames(ring.shape, ring.dtype, seed)
+        due = time.time()
+        n = 0
+        while not stop.is_set() and (num_frames is None or n < num_frames):
+            ring.write(next(frames))
+            n += 1
+            if rate:
+                due += 1 / rate
+                time.sleep(max(0, due - time.time()))
+    finally:
+        ring.close()
+
+
+class SimulatedDetector(object):
+    """
+    Stand-in for a detector: a separate process writing synthetic frames
+    into a `SharedFrameRing` at a fixed rate
+
+    Parameters
+    ----------
+    ring : SharedFrameRing or str
+        The ring (or its name) to write to
+    rate : float, optional
+        Frames per second, None writes as fast as possible.  Defaults to 10
+    num_frames : int, optional
+        Stop after this many frames.  Defaults to running until `stop`
+    seed : int, optional
+        Seed of the synthetic frames
+    """
+    def __init__(self, ring, rate=10., num_frames=None, seed=0):
+        self.ring_name = getattr(ring, 'name', ring)
+        self.rate = rate
+        self.num_frames = num_frames
+        self.seed = seed
+        self._stop = multiprocessing.Event()
+        self._process = None
+
+    def start(self):
+        """
+        Start writing frames
+
+        Returns
+        -------
+        self
+        """
+        self._stop.clear()
+        self._process = multiprocessing.Process(
+            target=_simulate, args=(self.ring_name, self.rate,
+                                    self.num_frames, self._stop, self.seed))
+        self._process.daemon = True
+        self._process.start()
+        return self
+
+    def is_alive(self):
+        return self._process is not None and self._process.is_alive()
+
+    def join(self, timeout=None):
+        """
+        Wait for the detector to finish its `num_frames`
+        """
+        if self._process is not None:
+            self._process.join(timeout)
+
+    def stop(self, timeout=None):
+        """
+        Stop writing frames and wait for the process to exit
+        """
+        self._stop.set()
+        self.join(timeout)
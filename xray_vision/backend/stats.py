@@ -0,0 +1,711 @@
+# ######################################################################
+# Copyright (c) 2014, Brookhaven Science Associates, Brookhaven        #
+# National Laboratory. All rights reserved.                            #
+#                                                                      #
+# Redistribution and use in source and binary forms, with or without   #
+# modification, are permitted provided that the following conditions   #
+# are met:                                                             #
+#                                                                      #
+# * Redistributions of source code must retain the above copyright     #
+#   notice, this list of conditions and the following disclaimer.      #
+#                                                                      #
+# * Redistributions in binary form must reproduce the above copyright  #
+#   notice this list of conditions and the following disclaimer in     #
+#   the documentation and/or other materials provided with the         #
+#   distribution.                                                      #
+#                                                                      #
+# * Neither the name of the Brookhaven Science Associates, Brookhaven  #
+#   National Laboratory nor the names of its contributors may be used  #
+#   to endorse or promote products derived from this software without  #
+#   specific prior written permission.                                 #
+#                                                                      #
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS  #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT    #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS    #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE       #
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,           #
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES   #
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR   #
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)   #
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,  #
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OTHERWISE) ARISING   #
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE   #
+# POSSIBILITY OF SUCH DAMAGE.                                          #
+########################################################################
+"""
+GUI-independent helpers for summarizing image frames (min/max, sums,
+histograms and percentile look-ups) so that the views do not have to
+re-scan a frame every time they need its color limits.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from collections import OrderedDict
+import threading
+import weakref
+
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+# integer frames whose value range fits in this many bins get an exact,
+# one-bin-per-value histogram
+_EXACT_INT_RANGE = 2 ** 16
+
+
+class ImageHistogram(object):
+    """
+    Cumulative histogram of a single image which can answer percentile
+    queries without touching the pixels again.
+
+    Parameters
+    ----------
+    im : ndarray
+        image data, nominally 2D.  Non-finite values are ignored.
+    bins : int, optional
+        Number of bins to use.  Defaults to 1024
+    log : bool, optional
+        If True, space the bins logarithmically between the smallest
+        positive value and the max.  Values <= 0 all land in a single
+        extra bin below the smallest positive value.
+    finite_range : tuple, optional
+        (min, max) of `im` if they are already known *and* `im` is known
+        to contain only finite values.  Saves the passes over the data
+        needed to find them.
+    mask : BadPixelMask, optional
+        Leave out the pixels it marks bad.  The histogram is then
+        accumulated chunk by chunk (see `BadPixelMask.good_chunks`),
+        without copying the image
+
+    Attributes
+    ----------
+    exact : bool
+        True if the histogram has one bin per integer value, in which case
+        `percentile` agrees with `np.percentile`
+    error_bound : float
+        Upper bound on the absolute error of any value returned by
+        `percentile`.  This is the width of the widest bin (0 if exact).
+    """
+    def __init__(self, im, bins=1024, log=False, finite_range=None,
+                 mask=None):
+        im = np.asarray(im)
+        self.bins = bins
+        self.log = log
+        self.exact = False
+        filter_finite = finite_range is None and im.dtype.kind == 'f'
+        if mask is None:
+            data = im.ravel()
+            if filter_finite:
+                data = data[np.isfinite(data)]
+
+            def chunks():
+                yield data
+        else:
+            def chunks():
+                for chunk in mask.good_chunks(im):
+                    if filter_finite:
+                        chunk = chunk[np.isfinite(chunk)]
+                    yield chunk
+        if finite_range is None:
+            self.count = 0
+            lo = hi = None
+            for chunk in chunks():
+                if chunk.size:
+                    self.count += chunk.size
+                    lo = chunk.min() if lo is None else min(lo, chunk.min())
+                    hi = chunk.max() if hi is None else max(hi, chunk.max())
+        else:
+            self.count = im.size if mask is None else mask.n_good
+            lo, hi = finite_range
+        if self.count == 0:
+            self.lo = self.hi = np.nan
+            self._edges = np.array([np.nan, np.nan])
+            self._cdf = np.zeros(1, dtype=np.int64)
+            self.error_bound = np.nan
+            return
+        self.lo, self.hi = lo, hi
+        dtype = im.dtype
+
+        if (dtype.kind in 'iu' and
+                int(self.hi) - int(self.lo) < _EXACT_INT_RANGE):
+            # small integer range -> exact counting, no binning error
+            self.exact = True
+            n_values = int(self.hi) - int(self.lo) + 1
+            counts = 0
+            for chunk in chunks():
+                # offset in the native dtype rather than an intp copy.  A
+                # signed difference may wrap but is right read as unsigned
+                offset = chunk - dtype.type(self.lo)
+                offset = offset.view('u{0}'.format(dtype.itemsize))
+                if offset.dtype.itemsize == 8:
+                    # bincount won't take uint64
+                    offset = offset.astype(np.intp)
+                counts = counts + np.bincount(offset, minlength=n_values)
+            self._edges = np.arange(n_values + 1) + int(self.lo)
+            self.error_bound = 0
+        elif log and self.hi > 0:
+            pos_min = None
+            n_nonpos = 0
+            for chunk in chunks():
+                pos = chunk[chunk > 0]
+                n_nonpos += chunk.size - pos.size
+                if pos.size:
+                    pos_min = (pos.min() if pos_min is None
+                               else min(pos_min, pos.min()))
+            if pos_min == self.hi:
+                edges = np.array([pos_min, self.hi], dtype=np.float64)
+                counts = np.array([self.count - n_nonpos])
+            else:
+                edges = np.geomspace(pos_min, self.hi, bins + 1)
+                counts = 0
+                for chunk in chunks():
+                    counts = counts + np.histogram(chunk[chunk > 0],
+                                                   bins=edges)[0]
+            # prepend the bin which holds everything <= 0
+            self._edges = np.r_[min(self.lo, 0), edges]
+            counts = np.r_[n_nonpos, counts]
+            self.error_bound = np.max(np.diff(self._edges))
+        else:
+            if self.lo == self.hi:
+                edges = np.array([self.lo, self.hi], dtype=np.float64)
+                counts = np.array([self.count])
+            else:
+                counts = 0
+                for chunk in chunks():
+                    c, edges = np.histogram(chunk, bins=bins,
+                                            range=(self.lo, self.hi))
+                    counts = counts + c
+            self._edges = edges
+            self.error_bound = edges[1] - edges[0]
+        self._counts = counts
+        self._cdf = np.cumsum(counts)
+
+    def _value_at_rank(self, rank):
+        """
+        Approximate value of the `rank`-th (0 based) smallest pixel
+        """
+        idx = np.searchsorted(self._cdf, rank, side='right')
+        idx = np.minimum(idx, self._cdf.size - 1)
+        if self.exact:
+            return self._edges[idx]
+        below = np.where(idx > 0, self._cdf[idx - 1], 0)
+        in_bin = self._counts[idx]
+        frac = (rank - below + .5) / np.maximum(in_bin, 1)
+        left = self._edges[idx]
+        return left + np.clip(frac, 0, 1) * (self._edges[idx + 1] - left)
+
+    def percentile(self, q):
+        """
+        Look up percentile(s) from the cumulative histogram
+
+        Parameters
+        ----------
+        q : float or sequence of floats in [0, 100]
+
+        Returns
+        -------
+        values : float or ndarray
+            Same shape as `q`.  Values are within `error_bound` of what
+            `np.percentile(im, q)` would return.
+        """
+        q = np.asarray(q, dtype=np.float64)
+        if self.count == 0:
+            return np.full(q.shape, np.nan)
+        rank = q / 100 * (self.count - 1)
+        if self.exact:
+            # same linear interpolation between neighbours as np.percentile
+            lo_rank = np.floor(rank)
+            v0 = self._value_at_rank(lo_rank)
+            v1 = self._value_at_rank(np.ceil(rank))
+            ret = v0 + (rank - lo_rank) * (v1 - v0)
+        else:
+            ret = self._value_at_rank(rank)
+        # the end points are known exactly
+        return np.clip(ret, self.lo, self.hi)
+
+
+class _ArrayCache(object):
+    """
+    Small cache of objects derived from arrays, keyed on the identity of
+    the array.  Entries are dropped when the array is garbage collected
+    or when more than `maxsize` entries are held.
+
+    Note that this can not see in-place modification of an array; call
+    `clear` if you mutate frames behind its back.
+
+    This is safe to use from several threads, but the values may be
+    computed more than once if two threads ask for the same array at the
+    same time.
+    """
+    def __init__(self, maxsize=16):
+        self.maxsize = maxsize
+        self._cache = {}
+        self._order = []
+        # re-entrant because the weakref callbacks can fire (and take the
+        # lock) whenever an array is freed
+        self._lock = threading.RLock()
+
+    def get(self, arr, factory):
+        cache_key = id(arr)
+        with self._lock:
+            try:
+                ref, val = self._cache[cache_key]
+            except KeyError:
+                pass
+            else:
+                if ref() is arr:
+                    return val
+        val = factory(arr)
+        self.put(arr, val)
+        return val
+
+    def peek(self, arr):
+        """
+        The value cached for arr, None if there is none
+        """
+        with self._lock:
+            ref, val = self._cache.get(id(arr), (None, None))
+            return val if ref is not None and ref() is arr else None
+
+    def put(self, arr, val):
+        cache_key = id(arr)
+
+        def _drop(_, cache_key=cache_key, self_ref=weakref.ref(self)):
+            self = self_ref()
+            if self is not None:
+                self._discard(cache_key)
+        try:
+            ref = weakref.ref(arr, _drop)
+        except TypeError:
+            # can not tell when this object goes away, don't cache it
+            return
+        with self._lock:
+            self._discard(cache_key)
+            self._cache[cache_key] = (ref, val)
+            self._order.append(cache_key)
+            while len(self._order) > self.maxsize:
+                self._discard(self._order[0])
+
+    def _discard(self, cache_key):
+        with self._lock:
+            self._cache.pop(cache_key, None)
+            try:
+                self._order.remove(cache_key)
+            except ValueError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._order[:] = []
+
+
+class FrameStats(object):
+    """
+    Summary statistics of a single frame.
+
+    min, max, sum, mean and the NaN count are computed when the object is
+    created.  Histograms are computed on first request (see `histogram`)
+    and kept.  Only a weak reference to the frame is held so that caching
+    these objects does not keep frames alive.
+
+    Parameters
+    ----------
+    frame : ndarray
+        image data, nominally 2D
+    mask : BadPixelMask, optional
+        Leave out the pixels it marks bad (of the histograms too).  The
+        frame is then summarized chunk by chunk, without a masked copy.
+
+    Attributes
+    ----------
+    min, max : scalar
+        range of the non-NaN values
+    sum : scalar
+        sum of the non-NaN values
+    mean : float
+        mean of the non-NaN values
+    nan_count : int
+        number of NaN pixels
+    size : int
+        total number of (good) pixels
+    mask : BadPixelMask or None
+    """
+    def __init__(self, frame, mask=None):
+        frame = np.asarray(frame)
+        self.mask = mask
+        self.size = frame.size if mask is None else mask.n_good
+        self.dtype = frame.dtype
+        self._frame_ref = _weakref_or_ref(frame)
+        self._histograms = {}
+        if mask is not None:
+            self._summarize_chunks(mask.good_chunks(frame))
+            return
+        if frame.size == 0:
+            self.min = self.max = self.mean = np.nan
+            self.sum = 0
+            self.nan_count = 0
+            self._finite = False
+            return
+        self.sum = np.sum(frame)
+        # a finite sum means there are no NaN (or inf) values, which
+        # saves the extra passes for the common case
+        self._finite = frame.dtype.kind != 'f' or np.isfinite(self.sum)
+        if self._finite:
+            self.nan_count = 0
+            self.min = np.min(frame)
+            self.max = np.max(frame)
+        else:
+            self.nan_count = int(np.count_nonzero(np.isnan(frame)))
+            if self.nan_count == frame.size:
+                self.min = self.max = np.nan
+            else:
+                self.min = np.nanmin(frame)
+                self.max = np.nanmax(frame)
+                self.sum = np.nansum(frame)
+        n_valid = self.size - self.nan_count
+        self.mean = self.sum / n_valid if n_valid else np.nan
+
+    def _summarize_chunks(self, chunks):
+        """
+        Compute the summary from the chunks of good pixel values
+        """
+        self.sum = 0
+        self.nan_count = 0
+        lo = hi = None
+        for chunk in chunks:
+            if not chunk.size:
+                continue
+            total = np.sum(chunk)
+            if chunk.dtype.kind == 'f' and not np.isfinite(total):
+                nan = np.isnan(chunk)
+                n_nan = int(np.count_nonzero(nan))
+                self.nan_count += n_nan
+                if n_nan == chunk.size:
+                    continue
+                total = np.nansum(chunk)
+                c_lo, c_hi = np.nanmin(chunk), np.nanmax(chunk)
+            else:
+                c_lo, c_hi = np.min(chunk), np.max(chunk)
+            self.sum = self.sum + total
+            lo = c_lo if lo is None else min(lo, c_lo)
+            hi = c_hi if hi is None else max(hi, c_hi)
+        # infinities make the sums non-finite without being NaN
+        self._finite = self.nan_count == 0 and (
+            self.dtype.kind != 'f' or np.isfinite(self.sum))
+        if lo is None:
+            self.min = self.max = np.nan
+        else:
+            self.min, self.max = lo, hi
+        n_valid = self.size - self.nan_count
+        self.mean = self.sum / n_valid if n_valid else np.nan
+
+    def histogram(self, bins=1024, log=False, frame=None):
+        """
+        The histogram of the frame
+
+        Parameters
+        ----------
+        bins : int, optional
+            Number of bins. Defaults to 1024
+        log : bool, optional
+            Use logarithmically spaced bins. Defaults to False
+        frame : ndarray, optional
+            The frame these statistics describe.  Only needed if the
+            histogram has not been computed yet and the frame this object
+            was created from has since been garbage collected.
+
+        Returns
+        -------
+        hist : ImageHistogram
+        """
+        key = (bins, log)
+        try:
+            return self._histograms[key]
+        except KeyError:
+            pass
+        if frame is None:
+            frame = self._frame_ref()
+        if frame is None:
+            raise ValueError("The frame has been released, pass it in "
+                             "explicitly to compute a new histogram")
+        finite_range = (self.min, self.max) if self._finite else None
+        hist = ImageHistogram(frame, bins=bins, log=log,
+                              finite_range=finite_range, mask=self.mask)
+        self._histograms[key] = hist
+        return hist
+
+
+def _weakref_or_ref(obj):
+    """
+    Return a weakref to obj, or a callable holding a strong reference if
+    obj can not be weakly referenced
+    """
+    try:
+        return weakref.ref(obj)
+    except TypeError:
+        return lambda: obj
+
+
+class FrameStatsCache(object):
+    """
+    Least-recently-used cache of `FrameStats` keyed on frame key.
+
+    Getting a frame's stats also registers them for that array object, so
+    that the limit functions in `xray_vision.backend.mpl.cross_section_2d`
+    which are handed the same array find them without another pass over
+    the data.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Maximum number of frames to keep statistics for. Defaults to 256
+    mask : BadPixelMask, optional
+        Bad pixels to leave out of the statistics computed by `get`.
+        Invalidate the cache when changing it.
+    """
+    def __init__(self, maxsize=256, mask=None):
+        self.maxsize = maxsize
+        self.mask = mask
+        self._cache = OrderedDict()
+
+    def get(self, key, frame=None):
+        """
+        Return the statistics of `frame`, computing them if `key` is not
+        in the cache
+
+        Parameters
+        ----------
+        key : hashable
+            The key of the frame
+        frame : ndarray, optional
+            The frame data.  Only required if `key` is not in the cache.
+
+        Raises
+        ------
+        KeyError
+            If `key` is not in the cache and no frame is passed in
+        """
+        try:
+            stats = self._cache.pop(key)
+        except KeyError:
+            if frame is None:
+                raise
+            stats = frame_stats(
+                frame, mask=False if self.mask is None else self.mask)
+        # (re)insert at the most-recently used end
+        self._cache[key] = stats
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        if frame is not None:
+            _stats_cache.put(frame, stats)
+        return stats
+
+    def add(self, key, stats, frame=None):
+        """
+        Put already computed statistics in the cache
+
+        Parameters
+        ----------
+        key : hashable
+            The key of the frame
+        stats : FrameStats
+            The statistics of the frame
+        frame : ndarray, optional
+            The frame data, to register the statistics for
+        """
+        self._cache.pop(key, None)
+        self._cache[key] = stats
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        if frame is not None:
+            _stats_cache.put(frame, stats)
+
+    def invalidate(self, keys=None):
+        """
+        Drop cached statistics
+
+        Parameters
+        ----------
+        keys : iterable, optional
+            The frame keys to drop.  Drops everything if None
+        """
+        if keys is None:
+            self._cache.clear()
+            return
+        for k in keys:
+            self._cache.pop(k, None)
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def __iter__(self):
+        return iter(list(self._cache))
+
+    def __len__(self):
+        return len(self._cache)
+
+
+_stats_cache = _ArrayCache(maxsize=64)
+
+
+def frame_stats(frame, mask=None):
+    """
+    Return the (cached) `FrameStats` of a frame
+
+    The statistics are computed once per array object.
+
+    Parameters
+    ----------
+    frame : ndarray
+        image data
+    mask : BadPixelMask or False, optional
+        Leave out the pixels it marks bad, replacing statistics cached for
+        the frame with another mask.  False replaces statistics cached
+        with a mask by unmasked ones.  If None, return whatever is cached
+        for the frame (e.g. statistics a view computed with its mask, so
+        the limit functions leave the same pixels out), computing them
+        without a mask if nothing is.  A mask for frames of another shape
+        is ignored.
+
+    Returns
+    -------
+    stats : FrameStats
+    """
+    if mask is None:
+        return _stats_cache.get(frame, FrameStats)
+    if mask is False or mask.shape != np.shape(frame):
+        mask = None
+    stats = _stats_cache.peek(frame)
+    if stats is None or stats.mask is not mask:
+        stats = FrameStats(frame, mask=mask)
+        _stats_cache.put(frame, stats)
+    return stats
+
+
+def frame_mask(frame):
+    """
+    The `BadPixelMask` the cached statistics of `frame` leave out, None if
+    there is none (or nothing is cached), without computing anything
+    """
+    stats = _stats_cache.peek(frame)
+    return None if stats is None else stats.mask
+
+
+def image_histogram(im, bins=1024, log=False):
+    """
+    Return the (cached) `ImageHistogram` of an image
+
+    The histogram is computed once per image object, so repeatedly asking
+    for percentiles of the same frame is cheap.
+
+    Parameters
+    ----------
+    im : ndarray
+        image data
+    bins : int, optional
+        Number of bins. Defaults to 1024
+    log : bool, optional
+        Use logarithmically spaced bins. Defaults to False
+
+    Returns
+    -------
+    hist : ImageHistogram
+    """
+    return frame_stats(im).histogram(bins=bins, log=log, frame=im)
+
+
+def subsample_index(shape, max_pixels, method='stride', seed=0):
+    """
+    The index of the pixels `subsample` picks from an image of `shape`
+
+    Returns
+    -------
+    index : tuple or None
+        Two slices ('stride') or two (1, max_pixels) integer arrays
+        ('random'), None if the image is small enough to be used whole
+    """
+    if max_pixels < 1:
+        raise ValueError("max_pixels must be at least 1, "
+                         "not {0}".format(max_pixels))
+    rows, cols = shape
+    if rows * cols <= max_pixels:
+        return None
+    if method == 'stride':
+        step = max(int(np.ceil(np.sqrt(rows * cols / max_pixels))), 1)
+        while -(-rows // step) * -(-cols // step) > max_pixels:
+            step += 1
+        return (slice(None, None, step), slice(None, None, step))
+    if method == 'random':
+        rs = np.random.RandomState(seed)
+        return (rs.randint(0, rows, (1, max_pixels)),
+                rs.randint(0, cols, (1, max_pixels)))
+    raise ValueError("method must be 'stride' or 'random', "
+                     "not {0!r}".format(method))
+
+
+def subsample(im, max_pixels, method='stride', seed=0):
+    """
+    Pick at most `max_pixels` pixels of an image to estimate its
+    statistics from
+
+    Parameters
+    ----------
+    im : ndarray
+        2D image data
+    max_pixels : int
+        Most pixels to return.  Images that are no bigger are returned
+        as they are
+    method : {'stride', 'random'}, optional
+        'stride' takes every n-th row and column (a view, no copy), which
+        is the cheapest but can alias with periodic structure in the
+        image.  'random' draws pixels uniformly (with replacement), for
+        which `subsample_error` holds exactly.  Defaults to 'stride'
+    seed : int, optional
+        Seed of the 'random' draw.  The same image size always gives the
+        same pixels, so the estimates don't flicker
+
+    Returns
+    -------
+    sample : ndarray
+        2D, (1, max_pixels) for 'random'
+    """
+    index = subsample_index(im.shape, max_pixels, method=method, seed=seed)
+    if index is None:
+        return im
+    return im[index]
+
+
+def subsample_error(n, confidence=0.95):
+    """
+    Bound on the error of percentiles estimated from `n` pixels drawn at
+    random (see `subsample`)
+
+    By the Dvoretzky-Kiefer-Wolfowitz inequality, with probability
+    `confidence` the empirical CDF of the sample is within ``eps`` of
+    that of the whole image everywhere.  So the ``p``-th percentile of
+    the sample lies between the ``p - 100 * eps``-th and the
+    ``p + 100 * eps``-th percentiles of the image, and at most a fraction
+    ``eps`` of the image is above the maximum (below the minimum) of the
+    sample.  For n = 2**16 and 95% confidence, eps is about 0.0053.
+
+    Parameters
+    ----------
+    n : int
+        Number of pixels in the sample
+    confidence : float, optional
+        Defaults to 0.95
+
+    Returns
+    -------
+    eps : float
+        As a fraction of the pixels, in [0, 1]
+    """
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be in (0, 1), "
+                         "not {0}".format(confidence))
+    if n < 1:
+        return 1.
+    return min(np.sqrt(np.log(2 / (1 - confidence)) / (2 * n)), 1.)
@@ -0,0 +1,310 @@
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from xray_vision.backend.mpl.cross_section_2d import (CrossSection,
+                                                      absolute_limit_factory)
+import numpy as np
+
+
+def _xsection(limit_func):
+    calls = []
+
+    def counting_limit_func(im):
+        calls.append(1)
+        return limit_func(im)
+
+    fig = Figure(figsize=(6, 6))
+    FigureCanvasAgg(fig)
+    xs = CrossSection(fig, limit_func=counting_limit_func)
+    xs.update_image(np.random.randint(0, 500, size=(60, 80)))
+    return fig, xs, calls
+
+
+def _check_partial_redraw(update):
+    fig, xs, calls = _xsection(absolute_limit_factory((10, 400)))
+    update(xs)
+    partial = np.array(fig.canvas.buffer_rgba())
+    fig.canvas.draw()
+    np.testing.assert_array_equal(partial, np.array(fig.canvas.buffer_rgba()))
+
+
+def test_partial_redraw():
+    new_image = np.random.randint(0, 500, size=(60, 80))
+    for update in (lambda xs: xs.update_image(new_image),
+                   lambda xs: xs.update_cmap('viridis'),
+                   lambda xs: xs.update_limit_func(
+                       absolute_limit_factory((0, 100))),
+                   lambda xs: xs.update_interpolation('nearest')):
+        yield _check_partial_redraw, update
+
+
+def test_invalidation():
+    fig, xs, calls = _xsection(absolute_limit_factory((10, 400)))
+    del calls[:]
+    # a colormap change does not re-scan the frame
+    xs.update_cmap('viridis')
+    assert not calls
+    # a new frame with fixed limits only redraws the image
+    redrawn = []
+    xs._redraw_axes = redrawn.extend
+    xs.update_image(np.random.randint(0, 500, size=(60, 80)))
+    assert redrawn == [xs._im_ax]
+
+
+def test_batch():
+    from matplotlib.colors import LogNorm
+    from xray_vision.backend.mpl.cross_section_2d import (
+        fullrange_limit_factory)
+    fig, xs, calls = _xsection(fullrange_limit_factory())
+    draws = []
+    fig.canvas.mpl_connect('draw_event', draws.append)
+    redrawn = []
+    xs._redraw_axes = redrawn.append
+    del calls[:]
+    with xs.batch():
+        xs.update_cmap('viridis')
+        xs.update_norm(LogNorm())
+        with xs.batch():
+            xs.update_image(np.random.randint(1, 500, size=(60, 80)))
+            xs.update_interpolation('nearest')
+        assert not calls and not redrawn
+    # one pass of the limit function and one (partial) draw
+    assert len(calls) == 1
+    assert len(redrawn) == 1 and not draws
+    # a new shape needs a full draw, but only one
+    with xs.batch():
+        xs.update_image(np.random.randint(1, 500, size=(30, 40)))
+        xs.update_cmap('gray')
+    assert len(draws) == 1
+    # nothing changed, nothing drawn
+    xs.flush()
+    assert len(draws) == 1 and len(redrawn) == 1
+
+
+def test_update_burst():
+    from xray_vision.backend.mpl.cross_section_2d import (
+        fullrange_limit_factory)
+    fig, xs, calls = _xsection(fullrange_limit_factory())
+    fig.canvas.draw()
+    draws = []
+    fig.canvas.mpl_connect('draw_event', draws.append)
+    redrawn = []
+    xs._redraw_axes = redrawn.append
+    del calls[:]
+    images = [np.random.randint(0, 500, size=(60, 80)) for i in range(5)]
+    with xs.batch():
+        for im in images:
+            xs.update_image(im)
+    # only the last frame is scanned and drawn, once
+    assert len(calls) == 1 and len(redrawn) == 1 and not draws
+    assert xs._imdata is images[-1]
+
+
+def _mouse_move(fig, xs, xy):
+    from matplotlib.backend_bases import MouseEvent
+    x, y = xs._im_ax.transData.transform(xy)
+    event = MouseEvent('motion_notify_event', fig.canvas, x, y)
+    fig.canvas.callbacks.process('motion_notify_event', event)
+
+
+def test_cursor_rate():
+    fig, xs, calls = _xsection(absolute_limit_factory((0, 500)))
+    fig.canvas.draw()
+    drawn = []
+    update_cursor = xs._update_cursor
+
+    def recording_update_cursor(x, y):
+        drawn.append((int(x + .5), int(y + .5)))
+        update_cursor(x, y)
+    xs._update_cursor = recording_update_cursor
+    xs.set_cursor_rates(cursor_rate=30)
+    # a burst of motion events only records the position
+    for xy in ((10, 10), (20, 15), (30, 20)):
+        _mouse_move(fig, xs, xy)
+    assert not drawn and xs._cursor_timer is not None
+    # the timer draws the latest one, once
+    xs._on_cursor_tick()
+    assert drawn == [(30, 20)] and (xs._row, xs._col) == (20, 30)
+    xs._on_cursor_tick()
+    assert drawn == [(30, 20)] and xs._cursor_timer is None
+
+
+def test_cursor_cb_rate():
+    fig, xs, calls = _xsection(absolute_limit_factory((0, 500)))
+    fig.canvas.draw()
+    seen = []
+    xs.add_cursor_position_cb(lambda col, row: seen.append((col, row)))
+    xs.set_cursor_rates(cursor_cb_rate=5)
+    for xy in ((10, 10), (20, 15), (30, 20)):
+        _mouse_move(fig, xs, xy)
+    # the first position goes out at once, the rest are held back
+    assert seen == [(10, 10)] and xs._cursor_timer is not None
+    xs._on_cursor_tick()
+    assert seen == [(10, 10)]
+    # until the interval is over, then only the latest one goes out
+    xs._last_cb_time -= 1
+    xs._on_cursor_tick()
+    assert seen == [(10, 10), (30, 20)] and xs._cursor_timer is None
+
+
+def test_visible_limits():
+    from xray_vision.backend.mpl.cross_section_2d import (
+        fullrange_limit_factory)
+    fig, xs, calls = _xsection(fullrange_limit_factory())
+    im = np.zeros((60, 80))
+    im[:30, :40] = np.arange(1200).reshape(30, 40)
+    im[50, 70] = 5000
+    xs.update_image(im)
+    assert xs._vlim == (0, 5000)
+    xs.update_limit_region('visible')
+    assert xs._vlim == (0, 5000)
+    # zoom in, the limits follow once the view settles
+    del calls[:]
+    xs._im_ax.set_xlim(9.6, 20.4)
+    xs._im_ax.set_ylim(5.4, 2.6)
+    assert not calls
+    xs.refresh_limits()
+    assert len(calls) == 1
+    assert xs._vlim == (im[3, 10], im[5, 20])
+    # an estimate from a subsample
+    xs._im_ax.set_xlim(-.5, 79.5)
+    xs._im_ax.set_ylim(59.5, -.5)
+    xs.update_limit_region('visible', max_pixels=100)
+    lo, hi = xs._vlim
+    assert lo == 0 and hi <= 5000
+    xs.update_limit_region('frame')
+    assert xs._vlim == (0, 5000)
+
+
+def test_mask():
+    from xray_vision.backend.mpl.cross_section_2d import (
+        fullrange_limit_factory, percentile_limit_factory)
+    fig, xs, calls = _xsection(fullrange_limit_factory())
+    im = np.random.randint(0, 500, size=(60, 80)).astype(np.uint16)
+    im[10, 20] = 60000
+    bad = np.zeros(im.shape, dtype=bool)
+    bad[10, 20] = True
+    xs.update_mask(bad)
+    xs.update_image(im)
+    assert xs._vlim == (im[~bad].min(), im[~bad].max())
+    # drawn in the bad colour
+    assert np.ma.getmaskarray(xs._im.get_array())[10, 20]
+    xs.update_limit_func(percentile_limit_factory([0, 100]))
+    assert xs._vlim == (im[~bad].min(), im[~bad].max())
+    xs.update_bad_color('red')
+    xs.update_lut(True)
+    assert tuple(xs._im.get_array()[10, 20]) == (255, 0, 0, 255)
+    # a mask for another shape is not applied
+    xs.update_image(im[:30])
+    assert xs._vlim == (im[:30].min(), im[:30].max())
+    xs.update_mask(None)
+    xs.update_image(im)
+    assert xs._vlim[1] == 60000
+
+
+def test_clipped_cuts():
+    fig, xs, calls = _xsection(absolute_limit_factory((0, 500)))
+    im = np.random.randint(0, 500, size=(60, 8000))
+    im[20, 4321] = 10000
+    xs.update_image(im)
+    # zoomed out, more columns than pixels: min/max decimated
+    xs._update_cursor(4321, 20)
+    x, y = xs._ln_h.get_data()
+    assert len(y) <= 2 * xs._ax_h.bbox.width + 2
+    assert np.max(y) == 10000 and np.min(y) == im[20].min()
+    # zoomed in, only the visible columns and a margin
+    xs._im_ax.set_xlim(4199.5, 4499.5)
+    xs._update_cursor(4300, 21)
+    x, y = xs._ln_h.get_data()
+    np.testing.assert_array_equal(y, im[21, x])
+    assert x[0] <= 4200 and x[-1] >= 4499 and len(x) < 600
+    # the band cuts are clipped the same way
+    xs.update_band(3, 'sum')
+    xs._update_cursor(4300, 20)
+    x, y = xs._ln_h.get_data()
+    np.testing.assert_array_equal(y, im[19:22, x].sum(axis=0))
+    x, y = xs._ln_v.get_data()
+    np.testing.assert_array_equal(x, im[y, 4299:4302].sum(axis=1))
+
+
+def test_box_stats():
+    fig, xs, calls = _xsection(absolute_limit_factory((0, 500)))
+    im = np.random.randint(0, 500, size=(60, 80)).astype(np.uint16)
+    xs.update_image(im)
+    for size in (1, 4, 15):
+        stats = xs.box_stats(30, 40, size)
+        half = (size - 1) // 2
+        box = im[30 - half:30 - half + size, 40 - half:40 - half + size]
+        assert stats.sum == box.sum() and stats.max == box.max()
+        assert np.isclose(stats.mean, box.mean()) and stats.count == box.size
+    # clipped at the edges
+    assert xs.box_stats(0, 79, 5).sum == im[:3, 77:].sum()
+    # bad and NaN pixels are left out
+    fim = im.astype(float)
+    fim[31, 41] = np.nan
+    bad = np.zeros(im.shape, dtype=bool)
+    bad[29, 39] = True
+    xs.update_mask(bad)
+    xs.update_image(fim)
+    stats = xs.box_stats(30, 40, 3)
+    good = np.ones((3, 3), dtype=bool)
+    good[0, 0] = good[2, 2] = False
+    box = fim[29:32, 39:42]
+    assert stats.count == 7 and np.isclose(stats.sum, box[good].sum())
+    assert stats.max == box[good].max()
+    # and so are inf pixels, which do not spoil the boxes away from them
+    inf_im = fim.copy()
+    inf_im[5, 5] = np.inf
+    inf_im[30, 41] = -np.inf
+    xs.update_image(inf_im)
+    inf_stats = xs.box_stats(30, 40, 3)
+    good[1, 2] = False
+    assert inf_stats.count == 6
+    assert np.isclose(inf_stats.sum, box[good].sum())
+    assert inf_stats.max == box[good].max()
+    assert xs.box_stats(50, 70, 5).sum == im[48:53, 68:73].sum()
+    xs.update_image(fim)
+    # in the readout and the callbacks
+    seen = []
+    xs.add_box_stats_cb(lambda col, row, stats: seen.append(stats))
+    xs.update_box_size(3)
+    assert 'sum: {0:.6g}'.format(stats.sum) in xs._im_ax.format_coord(40, 30)
+    xs._update_cursor(40, 30)
+    assert seen == [stats]
+
+
+def test_band_non_finite():
+    from xray_vision.backend.mpl.cross_section_2d import (_band_cut,
+                                                          _cumsum_rows)
+    d = np.ones((10, 4))
+    d[1, 0] = np.nan
+    d[2, 1] = np.inf
+    cs = _cumsum_rows(d)
+    # bands away from the bad pixels are not affected by them
+    for reduction, expected in (('mean', 1), ('sum', 3)):
+        np.testing.assert_array_equal(_band_cut(cs, d, 8, 3, reduction),
+                                      [expected] * 4)
+    # bands over them leave them out
+    np.testing.assert_array_equal(_band_cut(cs, d, 1, 3, 'mean'), [1] * 4)
+    np.testing.assert_array_equal(_band_cut(cs, d, 1, 3, 'sum'),
+                                  [2, 2, 3, 3])
+
+
+def test_box_stats_large_ints():
+    from xray_vision.backend.mpl.cross_section_2d import _sum_dtype
+    fig, xs, calls = _xsection(absolute_limit_factory((0, 500)))
+    for dtype in (np.uint64, np.int64, np.uint32):
+        info = np.iinfo(dtype)
+        # values near the top of the range, the sums of which overflow
+        # every integer type for 64 bit frames
+        im = np.array(info.max, dtype=dtype) - np.random.randint(
+            0, 1000, size=(60, 80)).astype(dtype)
+        xs.update_image(im)
+        stats = xs.box_stats(30, 40, 15)
+        exact = sum(int(v) for v in im[23:38, 33:48].ravel())
+        assert np.isclose(float(stats.sum), exact, rtol=1e-9)
+        assert stats.max == im[23:38, 33:48].max()
+    # exact integer sums as long as they fit
+    assert _sum_dtype(np.dtype(np.uint32), 60 * 80, signed=True) == np.int64
+    assert _sum_dtype(np.dtype(np.uint64), 2) == np.float64
@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.image as mimage
+from xray_vision.backend.mpl.cross_section_2d import percentile_limit_factory
+from xray_vision.backend.mpl.export import export_stack, colormap_frame
+import numpy as np
+from nose.plugins.skip import SkipTest
+
+
+def _check_png_export(processes, mode):
+    stack = np.random.randint(0, 500, size=(7, 20, 30)).astype(np.uint16)
+    limit_func = percentile_limit_factory([1, 99])
+    tmp = tempfile.mkdtemp()
+    try:
+        paths = export_stack(stack, os.path.join(tmp, 'f{:02d}.png'),
+                             start=2, stop=6, mode=mode,
+                             limit_func=limit_func, processes=processes,
+                             figsize=(2, 2), dpi=50)
+        assert [os.path.basename(p) for p in paths] == [
+            'f02.png', 'f03.png', 'f04.png', 'f05.png']
+        im = mimage.imread(paths[1])
+        if mode == 'image':
+            expected = colormap_frame(stack[3], limit_func=limit_func)
+            np.testing.assert_array_equal(
+                np.round(im * 255).astype(np.uint8), expected)
+        else:
+            assert im.shape[:2] == (100, 100)
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_png_export():
+    for processes in (0, 2):
+        for mode in ('image', 'figure'):
+            yield _check_png_export, processes, mode
+
+
+def test_fork_context():
+    import multiprocessing
+    from xray_vision.backend.mpl.export import _pool_context
+    # the closures of the limit factories are inherited, never pickled
+    if 'fork' in multiprocessing.get_all_start_methods():
+        assert _pool_context().get_start_method() == 'fork'
+
+
+def _check_tiff_export(processes):
+    try:
+        from PIL import Image
+    except ImportError:
+        raise SkipTest("no PIL")
+    stack = np.random.rand(5, 20, 30)
+    limit_func = percentile_limit_factory([1, 99])
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, 'stack.tif')
+        seen = []
+        paths = export_stack(stack, path, start=1, limit_func=limit_func,
+                             processes=processes,
+                             progress=lambda n, total: seen.append(
+                                 (n, total)))
+        assert paths == [path]
+        assert seen == [(n, 4) for n in range(1, 5)]
+        tiff = Image.open(path)
+        assert tiff.n_frames == 4
+        for n, idx in enumerate(range(1, 5)):
+            tiff.seek(n)
+            np.testing.assert_array_equal(
+                np.asarray(tiff.convert('RGBA')),
+                colormap_frame(stack[idx], limit_func=limit_func))
+        tiff.close()
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_tiff_export():
+    for processes in (0, 2):
+        yield _check_tiff_export, processes
+
+
+def _check_bad_argument(processes):
+    stack = np.random.rand(4, 10, 10)
+    tmp = tempfile.mkdtemp()
+    try:
+        export_stack(stack, os.path.join(tmp, 'f{}.png'), mode='figure',
+                     cmap='no_such_cmap', processes=processes)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("a bad cmap did not raise")
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_bad_argument():
+    # the workers report the error instead of dying over and over
+    for processes in (0, 2):
+        yield _check_bad_argument, processes
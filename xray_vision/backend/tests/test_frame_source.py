@@ -0,0 +1,63 @@
+import os
+import shutil
+import tempfile
+
+import matplotlib
+matplotlib.use('Agg')
+from xray_vision.backend import frame_source as fs
+import numpy as np
+
+
+def _check_source(source, stack):
+    assert len(source) == stack.shape[0]
+    assert tuple(source.shape) == stack.shape[1:]
+    assert source.dtype == stack.dtype
+    for i in (0, len(source) - 1, -1):
+        np.testing.assert_array_equal(source[i], stack[i])
+
+
+def test_frame_sources():
+    tmpdir = tempfile.mkdtemp()
+    try:
+        stack = np.random.randint(0, 2**12, size=(5, 6, 7)).astype(np.uint16)
+
+        npy_path = os.path.join(tmpdir, 'stack.npy')
+        np.save(npy_path, stack)
+        _check_source(fs.NpyFrameSource(npy_path), stack)
+
+        raw_path = os.path.join(tmpdir, 'stack.raw')
+        with open(raw_path, 'wb') as f:
+            f.write(b'\0' * 16)
+            for frame in stack:
+                f.write(b'\1' * 4)
+                f.write(frame.astype('>u2').tobytes())
+        _check_source(fs.RawFrameSource(raw_path, (6, 7), '>u2',
+                                        header_size=16, frame_header_size=4),
+                      stack.astype('>u2'))
+
+        frame_dir = os.path.join(tmpdir, 'frames')
+        os.mkdir(frame_dir)
+        for i, frame in enumerate(stack):
+            np.save(os.path.join(frame_dir, 'frame_{0:03d}.npy'.format(i)),
+                    frame)
+        _check_source(fs.DirectoryFrameSource(frame_dir), stack)
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def test_frame_source_dict_is_lazy():
+    loaded = []
+
+    class Source(fs.ArrayFrameSource):
+        def get_frame(self, i):
+            loaded.append(i)
+            return super(Source, self).get_frame(i)
+
+    stack = np.random.random((10, 4, 4))
+    data = fs.FrameSourceDict(Source(stack), list('abcdefghij'))
+    assert len(data) == 10
+    assert not loaded
+    np.testing.assert_array_equal(data['c'], stack[2])
+    assert loaded == [2]
+    del data['a']
+    assert 'a' not in data and len(data) == 9
@@ -0,0 +1,106 @@
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backend_bases import MouseEvent
+from xray_vision.backend.mpl.cross_section_2d import CrossSection
+from xray_vision.backend.mpl.line_profile import (LineSampler,
+                                                  LineProfileTool)
+import numpy as np
+
+
+def test_axis_aligned_nearest():
+    image = np.random.random((20, 30))
+    sampler = LineSampler((0, 7), (29, 7), image.shape, method='nearest')
+    np.testing.assert_allclose(sampler.sample(image), image[7])
+    np.testing.assert_allclose(sampler.distance, np.arange(30))
+
+
+def test_bilinear_on_plane():
+    # bilinear interpolation is exact for a plane
+    rows, cols = np.mgrid[:40, :50]
+    image = 2. * cols + 3. * rows
+    start, end = (2.5, 3.25), (40.1, 30.7)
+    sampler = LineSampler(start, end, image.shape, num=25)
+    t = np.linspace(0, 1, 25)
+    x = start[0] + t * (end[0] - start[0])
+    y = start[1] + t * (end[1] - start[1])
+    np.testing.assert_allclose(sampler.sample(image), 2 * x + 3 * y)
+    # averaging symmetric parallel lines on a plane gives the same values
+    wide = LineSampler(start, end, image.shape, width=5, num=25)
+    np.testing.assert_allclose(wide.sample(image), 2 * x + 3 * y)
+    # the geometry is reused for a new image
+    np.testing.assert_allclose(sampler.sample(image * 2), 4 * x + 6 * y)
+
+
+def test_outside_is_nan():
+    image = np.ones((10, 10))
+    sampler = LineSampler((-5, 5), (5, 5), image.shape, num=11)
+    profile = sampler.sample(image)
+    assert np.all(np.isnan(profile[:5]))
+    np.testing.assert_allclose(profile[5:], 1)
+
+
+def _tool():
+    fig = Figure(figsize=(6, 6))
+    FigureCanvasAgg(fig)
+    xs = CrossSection(fig)
+    xs.update_image(np.random.random((40, 60)))
+    profile_fig = Figure()
+    FigureCanvasAgg(profile_fig)
+    tool = LineProfileTool(xs, profile_fig.add_subplot(1, 1, 1),
+                           start=(0, 10), end=(59, 10), method='nearest')
+    fig.canvas.draw()
+    profile_fig.canvas.draw()
+    return fig, profile_fig, xs, tool
+
+
+def _mouse(fig, xs, name, xy):
+    x, y = xs._im_ax.transData.transform(xy)
+    event = MouseEvent(name, fig.canvas, x, y, button=1)
+    fig.canvas.callbacks.process(name, event)
+
+
+def test_tool_follows_image():
+    fig, profile_fig, xs, tool = _tool()
+    draws = []
+    for f in (fig, profile_fig):
+        f.canvas.mpl_connect('draw_event', draws.append)
+    im = np.random.random((40, 60))
+    xs.update_image(im)
+    np.testing.assert_allclose(tool._profile_line.get_ydata(), im[10])
+    # the profile axes are blitted, neither figure is drawn in full
+    assert not draws
+
+
+def test_tool_drag():
+    fig, profile_fig, xs, tool = _tool()
+    # drag the end
+    _mouse(fig, xs, 'button_press_event', (59, 10))
+    _mouse(fig, xs, 'motion_notify_event', (50, 20))
+    _mouse(fig, xs, 'button_release_event', (50, 20))
+    np.testing.assert_allclose(tool.line, ((0, 10), (50, 20)))
+    # grabbing the line does not freeze the cursor
+    assert xs.active
+    # drag the whole line
+    _mouse(fig, xs, 'button_press_event', (25, 15))
+    _mouse(fig, xs, 'motion_notify_event', (27, 20))
+    _mouse(fig, xs, 'button_release_event', (27, 20))
+    np.testing.assert_allclose(tool.line, ((2, 15), (52, 25)))
+    # moving the mouse without a grab leaves it alone
+    _mouse(fig, xs, 'motion_notify_event', (5, 5))
+    np.testing.assert_allclose(tool.line, ((2, 15), (52, 25)))
+
+
+def test_tool_disconnect():
+    fig, profile_fig, xs, tool = _tool()
+    before = tool._profile_line.get_ydata().copy()
+    tool.disconnect()
+    xs.update_image(np.random.random((40, 60)))
+    np.testing.assert_array_equal(tool._profile_line.get_ydata(), before)
+    # presses on the line go to the cross section again
+    _mouse(fig, xs, 'button_press_event', (59, 10))
+    _mouse(fig, xs, 'motion_notify_event', (50, 20))
+    assert tool.line == ((0, 10), (59, 10))
+    assert not xs.active
+    tool.remove()
@@ -0,0 +1,73 @@
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backend_bases import MouseEvent
+from xray_vision.backend.mpl.cross_section_2d import CrossSection2DView
+from xray_vision.backend.mpl.linked_views import LinkedViewGroup
+import numpy as np
+
+
+def _views():
+    views = []
+    for shape in ((40, 50), (80, 100)):
+        fig = Figure(figsize=(4, 4))
+        FigureCanvasAgg(fig)
+        data = [np.random.randint(0, 500, size=shape) for i in range(5)]
+        views.append(CrossSection2DView(fig, data,
+                                        [str(i) for i in range(5)]))
+    return views
+
+
+def test_linked_frames():
+    views = _views()
+    group = LinkedViewGroup(views)
+    group.set_frame(2)
+    for view in views:
+        assert view._xsection._imdata is view._data_dict['2']
+    draws = []
+    for view in views:
+        view._fig.canvas.mpl_connect('draw_event', draws.append)
+    # only the latest request is shown, each view draws once
+    group.request_frame(1)
+    group.request_frame(3)
+    for fut in group._loads[1]:
+        fut.result()
+    group._on_tick()
+    assert group.index == 3 and group._timer is None
+    for view in views:
+        assert view._xsection._imdata is view._data_dict['3']
+    assert len(draws) <= len(views)
+    group.close()
+
+
+def test_linked_cursor():
+    views = _views()
+    group = LinkedViewGroup(views, rate=None)
+    group.set_frame(0)
+    # the views no longer follow the mouse themselves
+    assert all(view._xsection._move_cid is None for view in views)
+    group.set_cursor(.5, .25)
+    assert [(v._xsection._row, v._xsection._col) for v in views] == [
+        (10, 25), (20, 50)]
+    # moving over the second view moves the first too
+    xs = views[1]._xsection
+    x, y = xs._im_ax.transData.transform((10, 40))
+    event = MouseEvent('motion_notify_event', views[1]._fig.canvas, x, y)
+    views[1]._fig.canvas.callbacks.process('motion_notify_event', event)
+    assert (xs._row, xs._col) == (40, 10)
+    assert (views[0]._xsection._row, views[0]._xsection._col) == (20, 5)
+    group.close()
+    assert all(view._xsection._move_cid is not None for view in views)
+
+
+def test_linked_probe():
+    views = _views()
+    group = LinkedViewGroup(views, rate=None)
+    ax = Figure().add_subplot(1, 1, 1)
+    probe = views[0].add_time_series_probe(ax)
+    # the probes of the views follow the shared frame
+    group.set_frame(3)
+    assert tuple(probe._marker.get_xdata()) == (3, 3)
+    views[0].remove_time_series_probe(probe)
+    group.close()
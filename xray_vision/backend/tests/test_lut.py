@@ -0,0 +1,32 @@
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib import cm
+from matplotlib.colors import Normalize, LogNorm
+from xray_vision.backend.mpl.lut import ColormapLUT
+import numpy as np
+
+
+def _check_lut(dtype, norm):
+    im = np.random.randint(0, 300, size=(40, 30)).astype(dtype)
+    lut = ColormapLUT('viridis', norm)
+    expected = cm.ScalarMappable(norm, 'viridis').to_rgba(im, bytes=True)
+    np.testing.assert_array_equal(lut(im), expected)
+    # the table is only rebuilt when the limits change
+    table = lut._table
+    lut(im)
+    assert lut._table is table
+    norm.vmax += 10
+    expected = cm.ScalarMappable(norm, 'viridis').to_rgba(im, bytes=True)
+    np.testing.assert_array_equal(lut(im), expected)
+
+
+def test_lut():
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        for norm in (Normalize(10, 150), LogNorm(3, 150)):
+            yield _check_lut, dtype, norm
+
+
+def test_lut_unsupported():
+    lut = ColormapLUT('gray', Normalize(0, 1), max_entries=100)
+    assert lut(np.zeros((3, 3))) is None
+    assert lut(np.arange(1000, dtype=np.uint32).reshape(10, 100)) is None
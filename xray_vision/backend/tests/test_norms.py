@@ -0,0 +1,42 @@
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.colors import LogNorm, PowerNorm
+from xray_vision.backend.mpl.norms import (FastLogNorm, FastPowerNorm,
+                                           FastSqrtNorm)
+import numpy as np
+
+
+def _check_norm(fast, ref, data):
+    expected = ref(data)
+    result = fast(data)
+    mask = np.ma.getmaskarray(expected)
+    np.testing.assert_array_equal(np.ma.getmaskarray(result), mask)
+    np.testing.assert_allclose(np.ma.getdata(result)[~mask],
+                               np.ma.getdata(expected)[~mask], rtol=1e-6,
+                               atol=1e-6)
+    # the inverse maps back onto the data
+    np.testing.assert_allclose(fast.inverse(np.ma.getdata(result)[~mask]),
+                               data[~mask], rtol=1e-6)
+
+
+def test_norms():
+    base = np.random.randint(-20, 5000, size=(300, 400))
+    # large enough to use the shared buffer and several chunks
+    for dtype in (np.int16, np.uint16, np.int32, np.float32, np.float64):
+        data = base.astype(dtype)
+        if data.dtype.kind == 'u':
+            data = np.abs(base).astype(dtype)
+        yield (_check_norm, FastLogNorm(3, 4000, chunk_size=5000),
+               LogNorm(3, 4000), data)
+        yield (_check_norm, FastSqrtNorm(10, 4000, chunk_size=5000),
+               PowerNorm(.5, 10, 4000), data)
+        yield (_check_norm, FastPowerNorm(2, 10, 4000), PowerNorm(2, 10, 4000),
+               data)
+
+
+def test_log_nonpositive_vmin():
+    norm = FastLogNorm(0, 1000)
+    result = norm(np.array([0, 1, 10, 1000], dtype=np.uint16))
+    assert np.ma.getmaskarray(result).tolist() == [True, False, False, False]
+    np.testing.assert_allclose(np.ma.getdata(result)[1:], [0, 1 / 3, 1])
+    assert norm(np.uint16(10)) == norm(10.)
@@ -0,0 +1,52 @@
+from xray_vision.backend.pixel_mask import BadPixelMask
+from xray_vision.backend.stats import FrameStats, subsample_index
+import numpy as np
+
+
+def _check_mask(fraction, chunk_size):
+    rs = np.random.RandomState(0)
+    bad = rs.rand(50, 70) < fraction
+    frame = rs.rand(50, 70)
+    mask = BadPixelMask(bad, chunk_size=chunk_size)
+    # only the smaller of the two index sets is stored
+    assert len(mask.index) == min(bad.sum(), (~bad).sum())
+    assert mask.n_bad == bad.sum()
+    np.testing.assert_array_equal(mask.to_bool(), bad)
+    np.testing.assert_array_equal(mask.good_values(frame), frame[~bad])
+    # non-contiguous frames too
+    np.testing.assert_array_equal(mask.good_values(frame[:, ::-1]),
+                                  frame[:, ::-1][~bad])
+    for index in ((slice(3, 40, 2), slice(5, 60, 3)),
+                  subsample_index(bad.shape, 100, 'random')):
+        np.testing.assert_array_equal(mask.subset(index).to_bool(),
+                                      bad[index])
+    rgba = np.zeros(bad.shape + (4,), dtype=np.uint8)
+    mask.paint(rgba, (255, 0, 0, 255))
+    np.testing.assert_array_equal(rgba[..., 0] == 255, bad)
+
+
+def test_mask():
+    for fraction in (.01, .9):
+        for chunk_size in (7, 100, 2 ** 16):
+            yield _check_mask, fraction, chunk_size
+
+
+def test_masked_stats():
+    rs = np.random.RandomState(1)
+    bad = rs.rand(50, 70) < .05
+    mask = BadPixelMask(bad)
+    frame = rs.randint(0, 100, size=(50, 70)).astype(np.uint16)
+    frame[bad] = 65535
+    stats = FrameStats(frame, mask=mask)
+    good = frame[~bad]
+    assert stats.size == good.size
+    assert (stats.min, stats.max) == (good.min(), good.max())
+    assert np.isclose(stats.mean, good.mean())
+    hist = stats.histogram(frame=frame)
+    assert hist.exact
+    np.testing.assert_array_equal(hist.percentile([10, 90]),
+                                  np.percentile(good, [10, 90]))
+    frame = rs.rand(50, 70)
+    frame[bad] = np.nan
+    stats = FrameStats(frame, mask=mask)
+    assert stats.nan_count == 0 and np.isclose(stats.sum, frame[~bad].sum())
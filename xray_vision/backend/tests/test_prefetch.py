@@ -0,0 +1,108 @@
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+from xray_vision.backend.prefetch import FramePrefetcher
+import numpy as np
+
+
+def _wait_for(prefetcher, indices, timeout=5):
+    start = time.time()
+    while time.time() - start < timeout:
+        prefetcher._collect()
+        if all(i in prefetcher._cache for i in indices):
+            return
+        time.sleep(.01)
+    raise AssertionError("frames {0} were not pre-fetched".format(indices))
+
+
+def test_prefetch_direction():
+    stack = np.random.random((20, 8, 8))
+    loaded = []
+
+    def loader(i):
+        loaded.append(i)
+        return stack[i]
+
+    pf = FramePrefetcher(loader, len(stack), depth=3)
+    try:
+        entry = pf.get(5)
+        np.testing.assert_array_equal(entry.frame, stack[5])
+        assert entry.stats.max == stack[5].max()
+        assert pf.misses == 1
+        _wait_for(pf, [6, 7, 8])
+        pf.get(6)
+        assert pf.hits == 1
+        # turn around
+        pf.get(5)
+        pf.get(4)
+        _wait_for(pf, [3, 2, 1])
+        assert pf.misses == 1
+        assert len(pf._cache) <= pf.cache_size
+    finally:
+        pf.shutdown(wait=True)
+
+
+def test_prefetched_limits():
+    import threading
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from xray_vision.backend.mpl.cross_section_2d import (
+        CrossSection2DView, fullrange_limit_factory)
+    full_range = fullrange_limit_factory()
+    gui_thread = threading.current_thread()
+    on_gui_thread = []
+
+    def limit_func(im):
+        if threading.current_thread() is gui_thread:
+            on_gui_thread.append(1)
+        return full_range(im)
+
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    data = [np.random.randint(0, 100 * (i + 1), size=(30, 40))
+            for i in range(10)]
+    view = CrossSection2DView(fig, data, [str(i) for i in range(10)],
+                              limit_func=limit_func, prefetch_depth=3)
+    try:
+        view.update_image(0)
+        _wait_for(view.prefetcher, [1, 2, 3])
+        del on_gui_thread[:]
+        # the limits computed in the background are used as they are
+        view.update_image(1)
+        assert not on_gui_thread
+        assert view._xsection._vlim == (data[1].min(), data[1].max())
+        # but not for the visible region
+        view.update_limit_region('visible')
+        view.update_image(2)
+        assert on_gui_thread
+    finally:
+        view.prefetcher.shutdown(wait=True)
+
+
+def test_rolling_not_prefetched():
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from xray_vision.backend.mpl.cross_section_2d import CrossSection2DView
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    data = [np.random.random((30, 40)) for i in range(20)]
+    view = CrossSection2DView(fig, data, [str(i) for i in range(20)],
+                              prefetch_depth=3)
+    try:
+        view.set_rolling(5)
+        rolling = view._virtual
+        for i in range(2, 12):
+            view.update_image(i)
+            np.testing.assert_allclose(view._xsection._imdata,
+                                       np.mean(data[i - 2:i + 3], axis=0))
+        # read in order on this thread only: one frame in and one out per
+        # step, nothing loaded ahead
+        assert rolling.frames_read == 5 + 9 * 2
+        assert view.prefetcher.misses == 0 and not view.prefetcher._cache
+        # the plain frames are pre-fetched again
+        view.set_rolling(1)
+        view.update_image(4)
+        assert view.prefetcher.misses == 1
+    finally:
+        view.prefetcher.shutdown(wait=True)
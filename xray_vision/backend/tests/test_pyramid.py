@@ -0,0 +1,51 @@
+import matplotlib
+matplotlib.use('Agg')
+from xray_vision.backend.pyramid import ImagePyramid
+from nose.tools import raises
+import numpy as np
+
+
+def _check_level(data, reduction):
+    pyr = ImagePyramid(data, reduction=reduction, min_size=8)
+    lvl = pyr.level(1)
+    assert lvl.shape == ((data.shape[0] + 1) // 2, (data.shape[1] + 1) // 2)
+    # compare against a padded, reshaped reduction
+    padded = np.pad(data, ((0, data.shape[0] % 2), (0, data.shape[1] % 2)),
+                    mode='edge').astype(np.float64)
+    blocks = padded.reshape(lvl.shape[0], 2, lvl.shape[1], 2)
+    expected = getattr(blocks, reduction)(axis=(1, 3))
+    assert lvl.dtype == data.dtype
+    if reduction == 'mean':
+        # integer means are rounded down at each halving
+        assert ((lvl <= expected) & (expected - lvl <= 1)).all()
+    else:
+        np.testing.assert_allclose(lvl, expected, rtol=1e-6)
+
+
+def test_pyramid_levels():
+    for shape in ((64, 64), (63, 70)):
+        data = np.random.randint(0, 1000, size=shape).astype(np.uint16)
+        for reduction in ImagePyramid.reductions:
+            yield _check_level, data, reduction
+
+
+def test_level_for():
+    pyr = ImagePyramid(np.zeros((1024, 1024)), min_size=256)
+    assert pyr.max_level == 2
+    assert pyr.level_for(1) == 0
+    assert pyr.level_for(2.5) == 1
+    assert pyr.level_for(100) == 2
+    assert pyr.level(10).shape == (256, 256)
+
+
+@raises(ValueError)
+def test_bad_reduction():
+    ImagePyramid(np.zeros((4, 4)), reduction='median')
+
+
+def test_float_mean():
+    data = np.random.random((30, 20)).astype(np.float32)
+    lvl = ImagePyramid(data, min_size=8).level(1)
+    assert lvl.dtype == np.float32
+    expected = data.reshape(15, 2, 10, 2).mean(axis=(1, 3))
+    np.testing.assert_allclose(lvl, expected, rtol=1e-5)
@@ -0,0 +1,69 @@
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from nose.plugins.skip import SkipTest
+from xray_vision.backend import ring_buffer
+from xray_vision.backend.ring_buffer import (SharedFrameRing,
+                                             RingBufferFrameSource,
+                                             SimulatedDetector)
+from xray_vision.backend.mpl.cross_section_2d import CrossSection2DView
+import numpy as np
+
+
+def _ring(n_slots=4):
+    if ring_buffer.shared_memory is None:
+        raise SkipTest("no multiprocessing.shared_memory")
+    return SharedFrameRing.create((6, 5), np.uint16, n_slots=n_slots)
+
+
+def test_sequence_and_drops():
+    ring = _ring()
+    try:
+        source = RingBufferFrameSource(ring.name)
+        # nothing written yet
+        assert not source.get_frame(0).any()
+        assert source.seq is None
+        for n in range(3):
+            ring.write(np.full((6, 5), n))
+        frame = source.get_frame(0)
+        assert frame[0, 0] == 2 and source.seq == 2
+        # a view of the shared memory, not a copy
+        assert not frame.flags.writeable and not frame.flags.owndata
+        for n in range(3, 7):
+            ring.write(np.full((6, 5), n))
+        assert source.get_frame(3)[0, 0] == 6
+        assert source.dropped == 3 and source.shown == 2
+        assert source.version == ring.written == 7
+        # overwritten frames are gone
+        assert ring.read(2) is None and ring.read(3)[0, 0] == 3
+        oldest_first = RingBufferFrameSource(ring, follow_latest=False)
+        assert [f[0, 0] for f in oldest_first] == [3, 4, 5, 6]
+        del frame
+        source.close()
+    finally:
+        ring.close()
+        ring.unlink()
+
+
+def test_detector_to_view():
+    ring = _ring(n_slots=8)
+    try:
+        SimulatedDetector(ring, rate=None, num_frames=20).start().join(30)
+        assert ring.written == 20
+        source = RingBufferFrameSource(ring)
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        view = CrossSection2DView(fig, source)
+        assert view.live_source is source
+        view.update_image(0)
+        np.testing.assert_array_equal(view._xsection._imdata, ring.read(19))
+        stats = view.frame_stats(0)
+        ring.write(np.zeros((6, 5)))
+        # the statistics follow the new frame
+        view.update_image(0)
+        assert view.frame_stats(0) is not stats
+        assert view.frame_stats(0).max == 0
+    finally:
+        ring.close()
+        ring.unlink()
@@ -0,0 +1,90 @@
+import matplotlib
+matplotlib.use('Agg')
+from xray_vision.backend import stats
+import numpy as np
+
+
+def _check_percentile(data, hist, q):
+    approx = hist.percentile(q)
+    exact = np.percentile(data, q)
+    assert np.all(np.abs(approx - exact) <= hist.error_bound + 1e-12)
+
+
+def test_histogram_percentile():
+    data = np.random.random((100, 200)) * 50
+    for log in (False, True):
+        hist = stats.ImageHistogram(data, bins=256, log=log)
+        assert not hist.exact
+        for q in ([0, 100], [1, 99], [5, 95], [50, 50]):
+            yield _check_percentile, data, hist, q
+
+
+def _check_exact_int(high):
+    data = np.random.randint(0, high, size=(64, 64)).astype(np.uint16)
+    hist = stats.ImageHistogram(data)
+    assert hist.exact
+    assert hist.error_bound == 0
+    for q in ([0, 100], [1, 99], [33, 66]):
+        np.testing.assert_allclose(hist.percentile(q),
+                                   np.percentile(data, q))
+
+
+def test_histogram_exact_int():
+    # any uint16 range gets one bin per value
+    for high in (4000, 65535):
+        yield _check_exact_int, high
+
+
+def test_image_histogram_cached():
+    data = np.random.random((20, 20))
+    assert stats.image_histogram(data) is stats.image_histogram(data)
+    assert (stats.image_histogram(data) is not
+            stats.image_histogram(data.copy()))
+
+
+def test_frame_stats():
+    data = np.random.random((30, 40))
+    data[3, 4] = np.nan
+    st = stats.FrameStats(data)
+    assert st.nan_count == 1
+    assert st.min == np.nanmin(data)
+    assert st.max == np.nanmax(data)
+    np.testing.assert_allclose(st.sum, np.nansum(data))
+    np.testing.assert_allclose(st.mean, np.nanmean(data))
+
+
+def test_frame_stats_cache_lru():
+    cache = stats.FrameStatsCache(maxsize=2)
+    frames = {k: np.random.random((5, 5)) for k in 'abc'}
+    st_a = cache.get('a', frames['a'])
+    assert cache.get('a', frames['a']) is st_a
+    cache.get('b', frames['b'])
+    # touch 'a' so that 'b' is the least recently used
+    cache.get('a', frames['a'])
+    cache.get('c', frames['c'])
+    assert 'a' in cache and 'c' in cache and 'b' not in cache
+    # stats are shared with the per-array look up
+    assert stats.frame_stats(frames['a']) is st_a
+    cache.invalidate(['a'])
+    assert 'a' not in cache
+
+
+def test_subsample():
+    from xray_vision.backend.stats import subsample, subsample_error
+    im = np.random.random((1000, 700))
+    for method in ('stride', 'random'):
+        sample = subsample(im, 10000, method=method)
+        assert sample.ndim == 2 and sample.size <= 10000
+        eps = subsample_error(sample.size, confidence=.999)
+        # the sample percentiles fall within the documented bound
+        for p in (1, 50, 99):
+            lo, hi = np.percentile(im, [max(p - 100 * eps, 0),
+                                        min(p + 100 * eps, 100)])
+            assert lo <= np.percentile(sample, p) <= hi
+    # the same pixels every time
+    np.testing.assert_array_equal(subsample(im, 500, 'random'),
+                                  subsample(im, 500, 'random'))
+    # small images are left alone
+    assert subsample(im, im.size) is im
+    assert subsample_error(1) == 1
+    assert abs(subsample_error(2 ** 16) - 0.0053) < 1e-4
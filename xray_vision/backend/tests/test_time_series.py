@@ -0,0 +1,105 @@
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from xray_vision.backend.time_series import PixelSeriesCache
+from xray_vision.backend.mpl.cross_section_2d import CrossSection2DView
+import numpy as np
+import os
+
+
+def _check_cache(max_memory):
+    stack = np.random.randint(0, 1000, size=(130, 37, 45)).astype(np.uint16)
+    cache = PixelSeriesCache(stack, tile=16, block=50, max_memory=max_memory)
+    assert cache.wait(10)
+    assert cache.on_disk == (max_memory == 0)
+    np.testing.assert_array_equal(cache.series(20, 30), stack[:, 20, 30])
+    # boxes across tiles and clipped at the edges
+    np.testing.assert_allclose(cache.series(15, 15, size=4),
+                               stack[:, 14:18, 14:18].mean(axis=(1, 2)))
+    np.testing.assert_array_equal(
+        cache.series(0, 44, size=5, reduction='max'),
+        stack[:, :3, 42:].max(axis=(1, 2)))
+    path = cache._path
+    cache.close()
+    assert path is None or not os.path.exists(path)
+
+
+def test_cache():
+    for max_memory in (2 ** 28, 0):
+        yield _check_cache, max_memory
+
+
+def test_cache_reset():
+    frames = [np.random.randint(0, 10, size=(20, 30)).astype(np.uint8)
+              for i in range(12)]
+    cache = PixelSeriesCache(frames, tile=8, block=5)
+    assert cache.wait(10)
+    # the frames change, to another dtype
+    frames[:] = [np.random.rand(20, 30) for i in range(12)]
+    cache.reset()
+    assert cache.wait(10)
+    assert cache.dtype == np.float64
+    np.testing.assert_array_equal(cache.series(19, 29),
+                                  [frame[19, 29] for frame in frames])
+    cache.close()
+
+
+def test_probe():
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    data = [np.random.rand(30, 40) for i in range(20)]
+    view = CrossSection2DView(fig, data, [str(i) for i in range(20)])
+    ax = Figure().add_subplot(1, 1, 1)
+    probe = view.add_time_series_probe(ax, size=3, block=7)
+    probe.cache.wait(10)
+    view.update_image(4)
+    view._xsection._update_cursor(10, 5)
+    assert probe.pixel == (5, 10)
+    x, y = probe._line.get_data()
+    np.testing.assert_allclose(
+        y, [frame[4:7, 9:12].mean() for frame in data])
+    assert tuple(probe._marker.get_xdata()) == (4, 4)
+    view.remove_time_series_probe(probe)
+    assert not view._xsection._cursor_position_cbs
+
+
+def test_probe_partial_redraw():
+    from xray_vision.backend.mpl.time_series import TimeSeriesProbe
+    fig = Figure(figsize=(6, 6))
+    FigureCanvasAgg(fig)
+    fig.add_subplot(2, 1, 1).imshow(np.random.rand(10, 10))
+    ax = fig.add_subplot(2, 1, 2)
+    stack = np.random.rand(30, 10, 10)
+    cache = PixelSeriesCache(stack)
+    cache.wait(10)
+    probe = TimeSeriesProbe(ax, cache)
+    fig.canvas.draw()
+    draws = []
+    fig.canvas.mpl_connect('draw_event', draws.append)
+    # only the probe axes are drawn, and they end up as a full draw would
+    probe(3, 4)
+    probe.set_frame(7)
+    partial = np.array(fig.canvas.buffer_rgba())
+    assert not draws
+    fig.canvas.draw()
+    np.testing.assert_array_equal(partial, np.array(fig.canvas.buffer_rgba()))
+    cache.close()
+
+
+def test_probe_overlapping_redraw():
+    from xray_vision.backend.mpl.time_series import TimeSeriesProbe
+    fig = Figure(figsize=(6, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+    # an inset the blanked out region would wipe
+    fig.add_axes([.3, .3, .3, .3]).plot([0, 1])
+    cache = PixelSeriesCache(np.random.rand(30, 10, 10))
+    cache.wait(10)
+    probe = TimeSeriesProbe(ax, cache)
+    fig.canvas.draw()
+    draws = []
+    fig.canvas.mpl_connect('draw_event', draws.append)
+    probe.set_frame(7)
+    assert len(draws) == 1
+    cache.close()
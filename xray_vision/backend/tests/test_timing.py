@@ -0,0 +1,48 @@
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from xray_vision.backend.timing import StageTimings
+from xray_vision.backend.mpl.cross_section_2d import CrossSection
+import numpy as np
+from numpy.testing import assert_allclose
+
+
+def test_rolling_percentiles():
+    timings = StageTimings(window=100)
+    for v in range(200):
+        timings.add('draw', v)
+    with timings.time('limits'):
+        pass
+    assert timings.stages == ['draw', 'limits']
+    # only the last 100 calls count
+    assert len(timings.samples('draw')) == 100
+    assert_allclose(timings.percentiles('draw', (0, 50, 100)),
+                    [100, 149.5, 199])
+    summary = timings.summary()
+    assert summary['draw']['count'] == 100
+    assert summary['draw']['max'] == 199
+    assert summary['limits']['p50'] >= 0
+    assert np.isnan(timings.percentiles('load')).all()
+    assert 'limits' in timings.format()
+    timings.clear()
+    assert timings.stages == []
+
+
+def test_cross_section_stages():
+    fig = Figure(figsize=(4, 4))
+    FigureCanvasAgg(fig)
+    xs = CrossSection(fig)
+    im = np.random.rand(40, 50)
+    xs.update_image(im)
+    # off, nothing recorded
+    assert xs.timings is None
+    timings = xs.enable_timing()
+    xs.update_image(im + 1)
+    xs.update_image(im + 2)
+    for stage in ('update_image', 'limits', 'set_data', 'update_artists',
+                  'draw'):
+        assert len(timings.samples(stage)) == 2, stage
+    xs.disable_timing()
+    xs.update_image(im)
+    assert len(timings.samples('draw')) == 2
@@ -0,0 +1,137 @@
+import threading
+
+import matplotlib
+matplotlib.use('Agg')
+from xray_vision.backend.frame_source import ArrayFrameSource
+from xray_vision.backend.virtual_frames import (RollingFrameSource,
+                                                StackProjection)
+import numpy as np
+
+
+def _expected(stack, i, window, reduction):
+    lo = max(i - (window - 1) // 2, 0)
+    hi = min(i - (window - 1) // 2 + window, len(stack))
+    return getattr(stack[lo:hi].astype(np.float64), reduction)(axis=0)
+
+
+def test_rolling():
+    stack = np.random.randint(0, 1000, size=(30, 6, 5)).astype(np.uint16)
+    for reduction in ('mean', 'sum'):
+        rolling = RollingFrameSource(ArrayFrameSource(stack), 5,
+                                     reduction=reduction, recompute_every=7)
+        for i in list(range(30)) + list(range(29, -1, -3)) + [0, 17]:
+            np.testing.assert_allclose(rolling.get_frame(i),
+                                       _expected(stack, i, 5, reduction))
+
+
+def test_rolling_is_incremental():
+    stack = np.random.random((50, 4, 4))
+    rolling = RollingFrameSource(ArrayFrameSource(stack), 9,
+                                 recompute_every=1000)
+    rolling.get_frame(20)
+    assert rolling.frames_read == 9
+    for i in range(21, 31):
+        rolling.get_frame(i)
+    # one frame in and one frame out per step
+    assert rolling.frames_read == 9 + 10 * 2
+
+
+def _check_projection(stack, reduction, start, stop, chunk_size):
+    proj = StackProjection(ArrayFrameSource(stack), reduction, start=start,
+                           stop=stop, chunk_size=chunk_size, max_workers=3)
+    expected = getattr(stack[start:stop].astype(np.float64), reduction)(
+        axis=0)
+    np.testing.assert_allclose(proj.start().result(timeout=10), expected)
+    assert proj.done
+    # every frame of the source is the projection
+    np.testing.assert_allclose(proj[len(stack) - 1], expected)
+
+
+def test_projection():
+    stack = np.random.randint(0, 1000, size=(37, 6, 5)).astype(np.uint16)
+    for reduction in StackProjection.reductions:
+        for start, stop, chunk_size in ((0, None, 4), (5, 20, 16), (3, 4, 2)):
+            yield (_check_projection, stack, reduction, start,
+                   stop or len(stack), chunk_size)
+
+
+def test_projection_progress():
+    stack = np.random.random((20, 4, 4))
+    seen = []
+    proj = StackProjection(ArrayFrameSource(stack), 'max', chunk_size=3,
+                           callback=lambda p: seen.append(p.frames_done))
+    proj.start().result(timeout=10)
+    # one partial result per chunk
+    assert len(seen) == 7 and max(seen) == 20
+    assert proj.version == 7
+
+
+class _GatedSource(ArrayFrameSource):
+    """
+    Frames which are only read once the gate opens, and which raise from
+    frame `bad` on
+    """
+    def __init__(self, frames, bad=None):
+        super(_GatedSource, self).__init__(frames)
+        self.gate = threading.Event()
+        self.bad = bad
+
+    def get_frame(self, i):
+        self.gate.wait(10)
+        if self.bad is not None and i >= self.bad:
+            raise ValueError("bad frame {0}".format(i))
+        return super(_GatedSource, self).get_frame(i)
+
+
+def _get_frame_in_thread(proj):
+    out = []
+
+    def target():
+        try:
+            out.append(proj.get_frame(0))
+        except Exception as exc:
+            out.append(exc)
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread, out
+
+
+def test_projection_cancel():
+    source = _GatedSource(np.random.random((20, 4, 4)))
+    proj = StackProjection(source, 'max', chunk_size=4, max_workers=1)
+    proj.start()
+    thread, out = _get_frame_in_thread(proj)
+    proj.cancel()
+    # the waiter is woken up instead of waiting for a chunk forever
+    thread.join(5)
+    assert not thread.is_alive()
+    assert isinstance(out[0], RuntimeError)
+    assert proj.cancelled and proj.stopped and not proj.done
+    source.gate.set()
+
+
+def test_projection_failed_chunk():
+    stack = np.random.random((20, 4, 4))
+    source = _GatedSource(stack, bad=0)
+    proj = StackProjection(source, 'sum', chunk_size=4, max_workers=2)
+    proj.start()
+    thread, out = _get_frame_in_thread(proj)
+    source.gate.set()
+    thread.join(5)
+    assert not thread.is_alive()
+    # the error of the chunk itself
+    assert isinstance(out[0], ValueError)
+    assert isinstance(proj.error, ValueError)
+    assert proj.stopped and not proj.done
+    for call in (lambda: proj.get_frame(0), lambda: proj.result(5)):
+        try:
+            call()
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("the failure was not raised")
+    # a reset tries again
+    source.bad = None
+    proj.reset()
+    np.testing.assert_allclose(proj.result(timeout=10),
+                               stack.sum(axis=0))
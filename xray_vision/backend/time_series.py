@@ -0,0 +1,339 @@
+# ######################################################################
+# Copyright (c) 2014, Brookhaven Science Associates, Brookhaven        #
+# National Laboratory. All rights reserved.                            #
+#                                                                      #
+# Redistribution and use in source and binary forms, with or without   #
+# modification, are permitted provided that the following conditions   #
+# are met:                                                             #
+#                                                                      #
+# * Redistributions of source code must retain the above copyright     #
+#   notice, this list of conditions and the following disclaimer.      #
+#                                                                      #
+# * Redistributions in binary form must reproduce the above copyright  #
+#   notice this list of conditions and the following disclaimer in     #
+#   the documentation and/or other materials provided with the         #
+#   distribution.                                                      #
+#                                                                      #
+# * Neither the name of the Brookhaven Science Associates, Brookhaven  #
+#   National Laboratory nor the names of its contributors may be used  #
+#   to endorse or promote products derived from this software without  #
+#   specific prior written permission.                                 #
+#                                                                      #
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS  #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT    #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS    #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE       #
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,           #
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES   #
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR   #
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)   #
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,  #
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OTHERWISE) ARISING   #
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE   #
+# POSSIBILITY OF SUCH DAMAGE.                                          #
+########################################################################
+"""
+Time series of single pixels (or small boxes) through a whole stack.
+
+Reading one pixel from each of thousands of disk-backed frames means one
+random read per frame.  `PixelSeriesCache` instead reads the stack once,
+in order, in the background, and keeps it transposed: time runs along
+the fast axis of small tiles of pixels, so the series of any pixel is one
+short contiguous read.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from .frame_source import FrameSource, ArrayFrameSource
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class PixelSeriesCache(object):
+    """
+    Tiled, time-major copy of a stack of frames, filled in the background
+
+    The frames are cut into `tile` x `tile` pixel tiles, stored as an
+    array of shape ``(tile rows, tile cols, frames, tile, tile)``, in
+    memory if it takes no more than `max_memory` bytes and in a temporary
+    file otherwise.  One worker thread reads the frames in order,
+    `block` at a time, and scatters them into the tiles; `series` can be
+    called while it does and returns NaN for the frames not read yet.
+
+    Call `start` to begin filling the cache.  It is meant for stacks
+    which do not change; call `reset` if they do.
+
+    Parameters
+    ----------
+    source : FrameSource or sequence of ndarray
+        The frames
+    tile : int, optional
+        Edge of the tiles, in pixels.  Defaults to 16
+    block : int, optional
+        Number of frames read between writes.  Defaults to 64
+    max_memory : int, optional
+        Largest cache (bytes) kept in memory.  Defaults to 2**28
+    directory : str, optional
+        Where to put the temporary file.  Defaults to the system default
+    callback : callable, optional
+        ``callback(cache)`` is called (from the worker thread) after every
+        block
+
+    Attributes
+    ----------
+    frames_done : int
+        Number of frames (from the first one) in the cache
+    version : int
+        Bumped whenever frames are added
+    """
+    reductions = ('mean', 'sum', 'max', 'min')
+
+    def __init__(self, source, tile=16, block=64, max_memory=2 ** 28,
+                 directory=None, callback=None):
+        if not isinstance(source, FrameSource):
+            source = ArrayFrameSource(source)
+        self.source = source
+        self.tile = int(tile)
+        self.block = int(block)
+        self.max_memory = max_memory
+        self.directory = directory
+        self.callback = callback
+        self.num_frames = len(source)
+        self.shape = tuple(source.shape)
+        self.dtype = np.dtype(source.dtype)
+        self._store = None
+        self._path = None
+        self._executor = None
+        self._future = None
+        self._stop = threading.Event()
+        self._cond = threading.Condition()
+        self._failed = False
+        self.frames_done = 0
+        self.version = 0
+
+    @property
+    def done(self):
+        return self.frames_done == self.num_frames
+
+    @property
+    def _tiles(self):
+        rows, cols = self.shape
+        return -(-rows // self.tile), -(-cols // self.tile)
+
+    @property
+    def nbytes(self):
+        """
+        Size of the cache (in memory or on disk)
+        """
+        n_tr, n_tc = self._tiles
+        return (n_tr * n_tc * self.num_frames * self.tile ** 2 *
+                self.dtype.itemsize)
+
+    @property
+    def on_disk(self):
+        return self._path is not None
+
+    def _allocate(self):
+        n_tr, n_tc = self._tiles
+        shape = (n_tr, n_tc, self.num_frames, self.tile, self.tile)
+        if self.nbytes <= self.max_memory:
+            self._store = np.empty(shape, dtype=self.dtype)
+            return
+        fd, self._path = tempfile.mkstemp(prefix='xray_vision_series_',
+                                          suffix='.dat', dir=self.directory)
+        os.close(fd)
+        self._store = np.memmap(self._path, dtype=self.dtype, mode='w+',
+                                shape=shape)
+
+    def start(self):
+        """
+        Start filling the cache in the background
+        """
+        if self._future is not None:
+            return self
+        if self._store is None:
+            self._allocate()
+        self._stop.clear()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        self._future = self._executor.submit(self._fill)
+        return self
+
+    def _fill(self):
+        try:
+            for lo in range(self.frames_done, self.num_frames, self.block):
+                if self._stop.is_set():
+                    return
+                hi = min(lo + self.block, self.num_frames)
+                self._write(lo, [self.source.get_frame(i)
+                                 for i in range(lo, hi)])
+                with self._cond:
+                    self.frames_done = hi
+                    self.version += 1
+                    self._cond.notify_all()
+                if self.callback is not None:
+                    self.callback(self)
+        except Exception:
+            logger.exception("filling the pixel series cache failed")
+            with self._cond:
+                self._failed = True
+                self._cond.notify_all()
+
+    def _write(self, lo, frames):
+        """
+        Scatter frames lo, lo + 1... into the tiles, one row of tiles at a
+        time, so the only copy made is of `tile` rows of the block
+        """
+        t = self.tile
+        n_tr, n_tc = self._tiles
+        rows, cols = self.shape
+        n = len(frames)
+        # the columns past the edge of the frames stay zero
+        buf = np.zeros((n, t, n_tc * t), dtype=self.dtype)
+        for tr in range(n_tr):
+            r0 = tr * t
+            r1 = min(r0 + t, rows)
+            for i, frame in enumerate(frames):
+                buf[i, :r1 - r0, :cols] = frame[r0:r1]
+            if r1 - r0 < t:
+                buf[:, r1 - r0:] = 0
+            # (frames, row, tile col, col) -> (tile col, frames, row, col)
+            self._store[tr, :, lo:lo + n] = buf.reshape(
+                n, t, n_tc, t).transpose(2, 0, 1, 3)
+
+    def wait(self, timeout=None):
+        """
+        Wait for the cache to be filled
+
+        Returns
+        -------
+        done : bool
+            False if it timed out
+        """
+        self.start()
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while not self.done:
+                if self._failed:
+                    raise RuntimeError("filling the pixel series cache "
+                                       "failed")
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return False
+                self._cond.wait(remaining)
+        return True
+
+    def series(self, row, col, size=1, reduction='mean'):
+        """
+        The value of a pixel, or reduction of a box of pixels, in every
+        frame
+
+        Parameters
+        ----------
+        row, col : int
+            The pixel (the centre of the box)
+        size : int, optional
+            Edge of the box, clipped at the edges of the frames.
+            Defaults to 1
+        reduction : {'mean', 'sum', 'max', 'min'}, optional
+            How the box is reduced.  Defaults to 'mean'
+
+        Returns
+        -------
+        series : ndarray
+            float64, one value per frame, NaN for the frames not in the
+            cache yet
+        """
+        if reduction not in self.reductions:
+            raise ValueError("reduction must be one of {0}, not "
+                             "{1!r}".format(self.reductions, reduction))
+        rows, cols = self.shape
+        if not (0 <= row < rows and 0 <= col < cols):
+            raise IndexError("pixel ({0}, {1}) outside of frames of shape "
+                             "{2}".format(row, col, self.shape))
+        r0 = max(row - (size - 1) // 2, 0)
+        c0 = max(col - (size - 1) // 2, 0)
+        r1 = min(row - (size - 1) // 2 + size, rows)
+        c1 = min(col - (size - 1) // 2 + size, cols)
+        out = np.full(self.num_frames, np.nan)
+        n = self.frames_done
+        if not n:
+            return out
+        t = self.tile
+        parts = []
+        for tr in range(r0 // t, (r1 - 1) // t + 1):
+            for tc in range(c0 // t, (c1 - 1) // t + 1):
+                rs = slice(max(r0 - tr * t, 0), min(r1 - tr * t, t))
+                cs = slice(max(c0 - tc * t, 0), min(c1 - tc * t, t))
+                box = self._store[tr, tc, :n, rs, cs]
+                parts.append(box.reshape(n, -1))
+        values = np.concatenate(parts, axis=1) if len(parts) > 1 else parts[0]
+        if reduction == 'mean':
+            out[:n] = values.mean(axis=1)
+        elif reduction == 'sum':
+            out[:n] = values.sum(axis=1, dtype=np.float64)
+        elif reduction == 'max':
+            out[:n] = values.max(axis=1)
+        else:
+            out[:n] = values.min(axis=1)
+        return out
+
+    def cancel(self):
+        """
+        Stop filling the cache (after the block being read)
+        """
+        self._stop.set()
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+
+    def reset(self):
+        """
+        Throw away what is cached (e.g. because the frames changed) and
+        fill the cache again
+        """
+        self.cancel()
+        self._close_executor()
+        with self._cond:
+            self.frames_done = 0
+            self.num_frames = len(self.source)
+            self.shape = tuple(self.source.shape)
+            self.dtype = np.dtype(self.source.dtype)
+            self.version += 1
+            self._failed = False
+        self._release()
+        self.start()
+
+    def _close_executor(self):
+        if self._executor is not None:
+            # wait for the block being read, it writes to the store
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _release(self):
+        self._store = None
+        if self._path is not None:
+            try:
+                os.remove(self._path)
+            except OSError:
+                logger.debug("could not remove %s", self._path)
+            self._path = None
+
+    def close(self):
+        """
+        Stop filling the cache and free it (removing its file)
+        """
+        self.cancel()
+        self._close_executor()
+        self._release()
@@ -0,0 +1,184 @@
+# ######################################################################
+# Copyright (c) 2014, Brookhaven Science Associates, Brookhaven        #
+# National Laboratory. All rights reserved.                            #
+#                                                                      #
+# Redistribution and use in source and binary forms, with or without   #
+# modification, are permitted provided that the following conditions   #
+# are met:                                                             #
+#                                                                      #
+# * Redistributions of source code must retain the above copyright     #
+#   notice, this list of conditions and the following disclaimer.      #
+#                                                                      #
+# * Redistributions in binary form must reproduce the above copyright  #
+#   notice this list of conditions and the following disclaimer in     #
+#   the documentation and/or other materials provided with the         #
+#   distribution.                                                      #
+#                                                                      #
+# * Neither the name of the Brookhaven Science Associates, Brookhaven  #
+#   National Laboratory nor the names of its contributors may be used  #
+#   to endorse or promote products derived from this software without  #
+#   specific prior written permission.                                 #
+#                                                                      #
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS  #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT    #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS    #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE       #
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,           #
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES   #
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR   #
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)   #
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,  #
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OTHERWISE) ARISING   #
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE   #
+# POSSIBILITY OF SUCH DAMAGE.                                          #
+########################################################################
+"""
+Optional timing of the stages of showing a frame (loading, limits, colour
+mapping, drawing, ...), to find out where a slow frame flip spends its
+time.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+import functools
+from timeit import default_timer
+
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class StageTimings(object):
+    """
+    Rolling record of how long each stage took, the last `window` calls
+    per stage
+
+    Parameters
+    ----------
+    window : int, optional
+        Number of calls per stage the statistics are computed over.
+        Defaults to 256
+    """
+    def __init__(self, window=256):
+        if window < 1:
+            raise ValueError("window must be at least 1, "
+                             "not {0}".format(window))
+        self.window = window
+        self._samples = OrderedDict()
+
+    def add(self, stage, seconds):
+        """
+        Record one call of `stage` which took `seconds`
+        """
+        try:
+            samples = self._samples[stage]
+        except KeyError:
+            samples = self._samples[stage] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    @contextmanager
+    def time(self, stage):
+        """
+        Context manager recording how long its block took as `stage`
+        """
+        start = default_timer()
+        try:
+            yield
+        finally:
+            self.add(stage, default_timer() - start)
+
+    @property
+    def stages(self):
+        """
+        The stages timed so far, in the order they were first seen
+        """
+        return list(self._samples)
+
+    def samples(self, stage):
+        """
+        The recorded durations of `stage`, oldest first, in seconds
+        """
+        return np.array(self._samples.get(stage, ()), dtype=float)
+
+    def percentiles(self, stage, q=(50, 90, 99)):
+        """
+        Percentiles of the recorded durations of `stage`
+
+        Parameters
+        ----------
+        stage : str
+        q : sequence of float, optional
+            Percentiles to compute, in [0, 100]
+
+        Returns
+        -------
+        values : ndarray
+            In seconds, NaN if `stage` has not been timed
+        """
+        samples = self.samples(stage)
+        if not len(samples):
+            return np.full(len(q), np.nan)
+        return np.percentile(samples, q)
+
+    def summary(self, q=(50, 90, 99)):
+        """
+        Statistics of every stage
+
+        Returns
+        -------
+        summary : OrderedDict
+            stage -> dict with the number of recorded calls ('count'),
+            'mean', 'max' and one 'p<q>' entry per percentile, in seconds
+        """
+        out = OrderedDict()
+        for stage in self._samples:
+            samples = self.samples(stage)
+            stats = {'count': len(samples), 'mean': samples.mean(),
+                     'max': samples.max()}
+            for p, v in zip(q, np.percentile(samples, q)):
+                stats['p{0:g}'.format(p)] = v
+            out[stage] = stats
+        return out
+
+    def format(self, q=(50, 90, 99)):
+        """
+        The summary as a text table, in milliseconds
+        """
+        names = ['p{0:g}'.format(p) for p in q]
+        lines = ['{0:<14}{1}'.format(
+            'stage [ms]', ''.join('{0:>8}'.format(n) for n in names))]
+        for stage, stats in self.summary(q).items():
+            lines.append('{0:<14}{1}'.format(
+                stage, ''.join('{0:>8.2f}'.format(stats[n] * 1e3)
+                               for n in names)))
+        return '\n'.join(lines)
+
+    def clear(self):
+        """
+        Forget everything recorded
+        """
+        self._samples.clear()
+
+
+def timed(stage):
+    """
+    Decorator recording the duration of a method as `stage` in the
+    `StageTimings` found in ``self._timings``.  When that is None (timing
+    is off) the method is called directly.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def inner(self, *args, **kwargs):
+            timings = self._timings
+            if timings is None:
+                return func(self, *args, **kwargs)
+            start = default_timer()
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                timings.add(stage, default_timer() - start)
+        return inner
+    return decorator
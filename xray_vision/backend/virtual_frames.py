@@ -0,0 +1,487 @@
+# ######################################################################
+# Copyright (c) 2014, Brookhaven Science Associates, Brookhaven        #
+# National Laboratory. All rights reserved.                            #
+#                                                                      #
+# Redistribution and use in source and binary forms, with or without   #
+# modification, are permitted provided that the following conditions   #
+# are met:                                                             #
+#                                                                      #
+# * Redistributions of source code must retain the above copyright     #
+#   notice, this list of conditions and the following disclaimer.      #
+#                                                                      #
+# * Redistributions in binary form must reproduce the above copyright  #
+#   notice this list of conditions and the following disclaimer in     #
+#   the documentation and/or other materials provided with the         #
+#   distribution.                                                      #
+#                                                                      #
+# * Neither the name of the Brookhaven Science Associates, Brookhaven  #
+#   National Laboratory nor the names of its contributors may be used  #
+#   to endorse or promote products derived from this software without  #
+#   specific prior written permission.                                 #
+#                                                                      #
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS  #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT    #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS    #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE       #
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,           #
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES   #
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR   #
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)   #
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,  #
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OTHERWISE) ARISING   #
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE   #
+# POSSIBILITY OF SUCH DAMAGE.                                          #
+########################################################################
+"""
+Virtual frames: frame sources whose frames are computed from the frames
+of another source rather than loaded.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+import threading
+import time
+
+import numpy as np
+
+from .frame_source import FrameSource
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class RollingFrameSource(FrameSource):
+    """
+    Sliding-window sum or mean of the frames of another source.
+
+    Frame i is the sum (mean) of the `window` frames centred on frame i of
+    `source`, clipped at the ends of the stack.  The sum is kept in a
+    float64 accumulator and updated incrementally: stepping from frame i
+    to i + 1 adds the frame entering the window and subtracts the one
+    leaving it, rather than re-summing the whole window.  To keep floating
+    point drift bounded the window is re-summed from scratch every
+    `recompute_every` incremental updates (and whenever the requested
+    window does not overlap the current one).
+
+    Parameters
+    ----------
+    source : FrameSource
+        The frames to combine
+    window : int
+        Number of frames in the window
+    reduction : {'mean', 'sum'}, optional
+        Defaults to 'mean'
+    recompute_every : int, optional
+        Number of incremental updates between full re-sums. Defaults to
+        64
+
+    Attributes
+    ----------
+    frames_read : int
+        Number of frames read from `source` so far
+    """
+    reductions = ('mean', 'sum')
+    # every frame read ahead would cost a re-sum of its window, and move
+    # the accumulator away from where the next frame needs it
+    prefetch = False
+
+    def __init__(self, source, window, reduction='mean', recompute_every=64):
+        if reduction not in self.reductions:
+            raise ValueError("reduction must be one of {0}, not "
+                             "{1!r}".format(self.reductions, reduction))
+        if int(window) < 1:
+            raise ValueError("window must be at least 1, not "
+                             "{0}".format(window))
+        self.source = source
+        self.window = int(window)
+        self.reduction = reduction
+        self.recompute_every = recompute_every
+        self.frames_read = 0
+        # the frames can be asked for from worker threads (e.g. by
+        # linked views)
+        self._lock = threading.Lock()
+        self.reset()
+
+    @property
+    def name(self):
+        return 'rolling {0} {1}'.format(self.reduction, self.window)
+
+    def __len__(self):
+        return len(self.source)
+
+    @property
+    def shape(self):
+        return self.source.shape
+
+    @property
+    def dtype(self):
+        return np.dtype(np.float64)
+
+    def reset(self):
+        """
+        Drop the accumulator, e.g. because the underlying frames changed
+        """
+        self._acc = None
+        self._lo = self._hi = 0
+        self._n_incremental = 0
+
+    def _bounds(self, i):
+        lo = i - (self.window - 1) // 2
+        hi = min(lo + self.window, len(self.source))
+        return max(lo, 0), hi
+
+    def _read(self, i):
+        self.frames_read += 1
+        return self.source.get_frame(i)
+
+    def _recompute(self, lo, hi):
+        acc = np.zeros(self.shape, dtype=np.float64)
+        for j in range(lo, hi):
+            acc += self._read(j)
+        self._acc = acc
+        self._lo, self._hi = lo, hi
+        self._n_incremental = 0
+
+    def _move_to(self, lo, hi):
+        """
+        Move the accumulated window to [lo, hi)
+        """
+        overlap = min(hi, self._hi) - max(lo, self._lo)
+        n_changes = (hi - lo) + (self._hi - self._lo) - 2 * overlap
+        if (self._acc is None or overlap <= 0 or
+                n_changes >= hi - lo or
+                self._n_incremental + n_changes > self.recompute_every):
+            self._recompute(lo, hi)
+            return
+        # add the frames entering the window, drop the ones leaving it
+        for j in range(lo, self._lo):
+            self._acc += self._read(j)
+        for j in range(self._hi, hi):
+            self._acc += self._read(j)
+        for j in range(self._lo, lo):
+            self._acc -= self._read(j)
+        for j in range(hi, self._hi):
+            self._acc -= self._read(j)
+        self._lo, self._hi = lo, hi
+        self._n_incremental += n_changes
+
+    def get_frame(self, i):
+        lo, hi = self._bounds(i)
+        with self._lock:
+            if (lo, hi) != (self._lo, self._hi) or self._acc is None:
+                self._move_to(lo, hi)
+            if self.reduction == 'sum':
+                return self._acc.copy()
+            return self._acc / (hi - lo)
+
+
+def _cpu_count():
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+
+def _reduce_chunk(source, lo, hi, reduction):
+    """
+    Reduce frames [lo, hi) of source to a partial result which can be
+    combined with `_combine`.  Runs on the workers.
+    """
+    if reduction == 'max':
+        acc = None
+        for j in range(lo, hi):
+            frame = source.get_frame(j)
+            acc = np.array(frame) if acc is None else np.maximum(acc, frame,
+                                                                 out=acc)
+        return acc
+    if reduction in ('sum', 'mean'):
+        acc = np.zeros(source.shape, dtype=np.float64)
+        for j in range(lo, hi):
+            acc += source.get_frame(j)
+        return hi - lo, acc
+    # std: Welford's running mean and sum of squared deviations
+    mean = np.zeros(source.shape, dtype=np.float64)
+    m2 = np.zeros(source.shape, dtype=np.float64)
+    for n, j in enumerate(range(lo, hi), 1):
+        frame = source.get_frame(j)
+        delta = frame - mean
+        mean += delta / n
+        m2 += delta * (frame - mean)
+    return hi - lo, mean, m2
+
+
+def _combine(reduction, a, b):
+    """
+    Combine two partial results of `_reduce_chunk`
+    """
+    if a is None:
+        return b
+    if reduction == 'max':
+        return np.maximum(a, b)
+    if reduction in ('sum', 'mean'):
+        return a[0] + b[0], a[1] + b[1]
+    # std: combine the partial (n, mean, M2) following Chan et al.
+    na, mean_a, m2_a = a
+    nb, mean_b, m2_b = b
+    n = na + nb
+    delta = mean_b - mean_a
+    mean = mean_a + delta * (nb / n)
+    m2 = m2_a + m2_b + delta * delta * (na * nb / n)
+    return n, mean, m2
+
+
+def _finalize(reduction, partial):
+    if reduction == 'max':
+        return partial
+    if reduction == 'sum':
+        return partial[1]
+    if reduction == 'mean':
+        return partial[1] / partial[0]
+    n, mean, m2 = partial
+    return np.sqrt(m2 / n)
+
+
+class StackProjection(FrameSource):
+    """
+    Projection (max, sum, mean or standard deviation) of a range of the
+    frames of another source.
+
+    The range is split into chunks which are reduced in parallel on an
+    executor (a thread pool by default), so only ``chunk_size`` frames per
+    worker are ever loaded at once.  The partial results are combined as
+    the chunks finish, and the projection so far is available while the
+    reduction runs: every frame of this source is the current (partial)
+    projection, and `version` is bumped each time it improves.
+
+    Call `start` to begin computing.
+
+    Parameters
+    ----------
+    source : FrameSource
+        The frames to project
+    reduction : {'max', 'sum', 'mean', 'std'}
+    start, stop : int, optional
+        The range of frames to project.  Defaults to all of them
+    chunk_size : int, optional
+        Number of frames per work unit. Defaults to 16
+    executor : concurrent.futures.Executor, optional
+        Where to run the chunks.  Defaults to a private thread pool with
+        `max_workers` threads (numpy releases the GIL in the reductions
+        and file reads, so threads use several cores).
+    max_workers : int, optional
+        Size of the default thread pool. Defaults to the number of CPUs
+    callback : callable, optional
+        ``callback(projection)`` is called (from a worker thread) every
+        time a chunk has been combined into the result
+    """
+    reductions = ('max', 'sum', 'mean', 'std')
+    live = True
+
+    def __init__(self, source, reduction, start=0, stop=None, chunk_size=16,
+                 executor=None, max_workers=None, callback=None):
+        if reduction not in self.reductions:
+            raise ValueError("reduction must be one of {0}, not "
+                             "{1!r}".format(self.reductions, reduction))
+        if stop is None:
+            stop = len(source)
+        if not 0 <= start < stop <= len(source):
+            raise ValueError("invalid frame range [{0}, {1}) for a source "
+                             "with {2} frames".format(start, stop,
+                                                      len(source)))
+        self.source = source
+        self.reduction = reduction
+        self.start_frame = start
+        self.stop_frame = stop
+        self.chunk_size = chunk_size
+        self.callback = callback
+        self._executor = executor
+        self._max_workers = max_workers
+        self._own_pool = None
+        self._futures = []
+        # bumped by reset so late chunks of a previous run are dropped
+        self._generation = 0
+        self._partial = None
+        self._value = None
+        self._value_version = -1
+        self.frames_done = 0
+        self.version = 0
+        self._error = None
+        self._cancelled = False
+        self._cond = threading.Condition()
+
+    @property
+    def name(self):
+        return '{0} projection {1}:{2}'.format(self.reduction,
+                                               self.start_frame,
+                                               self.stop_frame)
+
+    def __len__(self):
+        return len(self.source)
+
+    @property
+    def shape(self):
+        return self.source.shape
+
+    @property
+    def dtype(self):
+        if self.reduction == 'max':
+            return self.source.dtype
+        return np.dtype(np.float64)
+
+    @property
+    def total_frames(self):
+        return self.stop_frame - self.start_frame
+
+    @property
+    def done(self):
+        return self.frames_done == self.total_frames
+
+    @property
+    def error(self):
+        """
+        The exception a chunk raised, None if none failed
+        """
+        return self._error
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    @property
+    def stopped(self):
+        """
+        True once the projection will not change any more: it is done,
+        a chunk failed or it was cancelled
+        """
+        return self.done or self._error is not None or self._cancelled
+
+    def _check_stopped(self):
+        """
+        Raise if a chunk failed, or if the projection was cancelled before
+        it was done.  Call with the condition held.
+        """
+        if self._error is not None:
+            raise self._error
+        if self._cancelled and not self.done:
+            raise RuntimeError("projection cancelled")
+
+    def start(self):
+        """
+        Submit the chunks to the executor
+        """
+        if self._futures:
+            return self
+        executor = self._executor
+        if executor is None:
+            executor = self._own_pool = ThreadPoolExecutor(
+                max_workers=self._max_workers or _cpu_count())
+        gen = self._generation
+        for lo in range(self.start_frame, self.stop_frame, self.chunk_size):
+            hi = min(lo + self.chunk_size, self.stop_frame)
+            fut = executor.submit(_reduce_chunk, self.source, lo, hi,
+                                  self.reduction)
+            fut.add_done_callback(
+                lambda fut, n=hi - lo: self._chunk_done(fut, n, gen))
+            self._futures.append(fut)
+        return self
+
+    def _chunk_done(self, fut, n_frames, gen):
+        if fut.cancelled():
+            return
+        exc = fut.exception()
+        with self._cond:
+            if gen != self._generation:
+                return
+            if exc is None:
+                self._partial = _combine(self.reduction, self._partial,
+                                         fut.result())
+                self.frames_done += n_frames
+                self.version += 1
+            else:
+                logger.error("projection chunk failed: %r", exc)
+                if self._error is None:
+                    self._error = exc
+            self._cond.notify_all()
+            finished = self.done
+        if exc is not None:
+            # the projection is wrong whatever the other chunks give
+            for other in list(self._futures):
+                other.cancel()
+        if finished or exc is not None:
+            self._shutdown_pool()
+        if self.callback is not None:
+            self.callback(self)
+
+    def _shutdown_pool(self):
+        if self._own_pool is not None:
+            self._own_pool.shutdown(wait=False)
+            self._own_pool = None
+
+    def cancel(self):
+        """
+        Cancel the chunks which have not started yet.  Anyone waiting for
+        the projection gets a RuntimeError (unless it is done already)
+        """
+        for fut in self._futures:
+            fut.cancel()
+        self._shutdown_pool()
+        with self._cond:
+            self._cancelled = True
+            self._cond.notify_all()
+
+    def reset(self):
+        """
+        Throw away the projection (e.g. because the frames changed) and
+        compute it again
+        """
+        self.cancel()
+        with self._cond:
+            self._generation += 1
+            self._futures = []
+            self._partial = None
+            self.frames_done = 0
+            self._error = None
+            self._cancelled = False
+            self.version += 1
+        self.start()
+
+    def result(self, timeout=None):
+        """
+        Wait for the projection to finish and return it
+        """
+        if not self._futures:
+            self.start()
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while not self.done:
+                self._check_stopped()
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise RuntimeError("projection did not finish in "
+                                           "time")
+                self._cond.wait(remaining)
+        return self.get_frame(0)
+
+    def get_frame(self, i):
+        """
+        The projection so far.  Waits for the first chunk if nothing has
+        been computed yet.  The frame index is ignored.  Raises the
+        exception of a failed chunk, or RuntimeError if the projection was
+        cancelled before anything was computed.
+        """
+        if not self._futures:
+            self.start()
+        with self._cond:
+            if self._error is not None:
+                raise self._error
+            while self._partial is None:
+                self._check_stopped()
+                self._cond.wait()
+            if self._value_version != self.version:
+                self._value = _finalize(self.reduction, self._partial)
+                self._value_version = self.version
+            return self._value
@@ -47,6 +47,9 @@ from .. import AbstractMessenger2D
 from ...backend.mpl.cross_section_2d import CrossSection2DView
 from ...backend.mpl import cross_section_2d as View
 from ...backend.mpl import AbstractMPLDataView
+from ...backend.mpl.norms import FastLogNorm, FastSqrtNorm
+from ...backend.stats import frame_stats
+from ...backend.timing import timed
 import logging
 logger = logging.getLogger(__name__)
 
@@ -58,7 +61,10 @@ class CrossSection2DMessenger(AbstractMessenger2D, AbstractMPLMessenger):
     to pass commands down to the gui-independent layer
     """
 
-    def __init__(self, data_list, key_list, parent=None,
+    # most pixels the 'visible (sampled)' limits are estimated from
+    _sampled_pixels = 2 ** 18
+
+    def __init__(self, data_list, key_list=None, parent=None,
                  *args, **kwargs):
         # call up the inheritance chain
         super(CrossSection2DMessenger, self).__init__(*args, **kwargs)
@@ -69,7 +75,25 @@ class CrossSection2DMessenger(AbstractMessenger2D, AbstractMPLMessenger):
         # TODO: Address issue of data storage in the cross section widget
         self._ctrl_widget = CrossSection2DControlWidget(
             name="2-D CrossSection Controls", init_img=data_list[0],
-            num_images=len(key_list))
+            num_images=len(self._view._key_list))
+        # polls a projection being computed in the background so the
+        # partial results are drawn from the GUI thread
+        self._projection_timer = QtCore.QTimer(parent)
+        self._projection_timer.setInterval(200)
+        self._projection_timer.timeout.connect(self._poll_projection)
+        self._projection_version = None
+        # shows new frames of a live data source (e.g. a detector
+        # writing into a ring buffer) as they come in
+        self._live_timer = QtCore.QTimer(parent)
+        self._live_timer.setInterval(50)
+        self._live_timer.timeout.connect(self._poll_live)
+        self._live_version = None
+        if self._view.live_source is not None:
+            self._live_timer.start()
+        # refreshes the timing overlay while timing is on
+        self._timing_timer = QtCore.QTimer(parent)
+        self._timing_timer.setInterval(1000)
+        self._timing_timer.timeout.connect(self._show_timings)
         # connect signals to slots
         self.connect_sigs_to_slots()
 
@@ -93,16 +117,109 @@ class CrossSection2DMessenger(AbstractMessenger2D, AbstractMPLMessenger):
         self._ctrl_widget._slider_img.valueChanged.connect(self.sl_update_image)
         self._ctrl_widget.sig_update_interpolation.connect(
             self._view.update_interpolation)
+        self._ctrl_widget.sig_update_band.connect(self._view.update_band)
+        self._ctrl_widget.sig_update_box_size.connect(
+            self._view.update_box_size)
+        self._ctrl_widget.sig_update_rolling.connect(self.sl_update_rolling)
+        self._ctrl_widget.sig_update_projection.connect(
+            self.sl_update_projection)
+        self._ctrl_widget.sig_update_timing.connect(self.sl_update_timing)
+        self._ctrl_widget.sig_update_limit_region.connect(
+            self.sl_update_limit_region)
+
+    @property
+    def _timings(self):
+        return self._view.timings
 
     @QtCore.Slot(int)
+    @timed('frame')
     def sl_update_image(self, img_idx):
         """
         updates the image shown in the widget, assumed to be the same size
         """
-        self._view.update_image(img_idx)
-        self.sl_update_view()
-        im = self._view._data_dict[self._view._key_list[img_idx]]
-        self._ctrl_widget.set_im_lim(lo=np.min(im), hi=np.max(im))
+        # updating the spin boxes may hand the view a new limit function,
+        # draw once for both
+        with self._view.batch():
+            self._view.update_image(img_idx)
+            # cached by the view, no extra pass over the frame
+            stats = self._view.frame_stats(img_idx)
+            self._ctrl_widget.set_im_lim(lo=stats.min, hi=stats.max)
+
+    @QtCore.Slot(int, str)
+    def sl_update_rolling(self, window, reduction):
+        """
+        Show the rolling mean/sum of `window` frames around the current
+        one (1 shows the plain frames)
+        """
+        self._projection_timer.stop()
+        with self._view.batch():
+            self._view.set_rolling(window, reduction)
+            self.sl_update_image(self._ctrl_widget._slider_img.value())
+
+    @QtCore.Slot(str)
+    def sl_update_projection(self, reduction):
+        """
+        Show the max/sum/mean/std projection of the whole stack ('none'
+        shows the plain frames).  The projection is drawn as it improves.
+        """
+        if reduction == 'none':
+            reduction = None
+        self._projection_timer.stop()
+        self._projection_version = None
+        with self._view.batch():
+            self._view.set_projection(reduction)
+            self.sl_update_image(self._ctrl_widget._slider_img.value())
+        if reduction is not None:
+            self._projection_timer.start()
+
+    @QtCore.Slot(bool)
+    def sl_update_timing(self, enabled):
+        """
+        Turn timing of the frame updates on or off.  While on, the
+        percentiles of each stage are shown in the control dock.  On top
+        of the stages timed by the view, 'frame' is the whole update
+        triggered by changing frames, see `CrossSection2DView.enable_timing`
+        """
+        if enabled:
+            self._view.enable_timing()
+            self._timing_timer.start()
+        else:
+            self._timing_timer.stop()
+            self._view.disable_timing()
+        self._show_timings()
+
+    @QtCore.Slot()
+    def _show_timings(self):
+        timings = self._view.timings
+        self._ctrl_widget.set_timing_text(
+            '' if timings is None else timings.format())
+
+    @QtCore.Slot()
+    def _poll_projection(self):
+        projection = self._view.projection
+        if projection is None:
+            self._projection_timer.stop()
+            return
+        if projection.error is not None or (projection.cancelled and
+                                            not projection.done):
+            # nothing more is coming, and there is nothing to show
+            self._projection_timer.stop()
+            return
+        if projection.version != self._projection_version:
+            self._projection_version = projection.version
+            self.sl_update_image(self._ctrl_widget._slider_img.value())
+        if projection.stopped:
+            self._projection_timer.stop()
+
+    @QtCore.Slot()
+    def _poll_live(self):
+        source = self._view.live_source
+        if source is None or source is self._view.projection:
+            # nothing live, or a projection, which has its own timer
+            return
+        if source.version != self._live_version:
+            self._live_version = source.version
+            self.sl_update_image(self._ctrl_widget._slider_img.value())
 
     @QtCore.Slot(np.ndarray)
     def sl_replace_image(self, img):
@@ -118,7 +235,29 @@ class CrossSection2DMessenger(AbstractMessenger2D, AbstractMPLMessenger):
         Updates the type of limit computation function used
         """
         self._view.set_limit_func(limit_func)
-        self.sl_update_view()
+
+    @QtCore.Slot(str)
+    def sl_update_limit_region(self, region):
+        """
+        Compute the colour limits over the whole frame ('frame'), the
+        visible part of it ('visible') or a subsample of the visible part
+        ('visible (sampled)')
+        """
+        region = str(region)
+        max_pixels = None
+        if region.endswith('(sampled)'):
+            region = region.split()[0]
+            max_pixels = self._sampled_pixels
+        self._view.update_limit_region(region, max_pixels=max_pixels)
+
+    @QtCore.Slot()
+    def sl_update_view(self):
+        """
+        Redraw what changed.  The view already redraws the affected axes
+        after each update (or once at the end of a batch), so this only
+        flushes what is still pending rather than drawing the whole figure
+        """
+        self._view.flush()
 
 
 class CrossSection2DControlWidget(QtGui.QDockWidget):
@@ -131,6 +270,12 @@ class CrossSection2DControlWidget(QtGui.QDockWidget):
     sig_update_norm = QtCore.Signal(colors.Normalize)
     sig_update_limit_function = QtCore.Signal(object)
     sig_update_interpolation = QtCore.Signal(str)
+    sig_update_band = QtCore.Signal(int, str)
+    sig_update_box_size = QtCore.Signal(int)
+    sig_update_rolling = QtCore.Signal(int, str)
+    sig_update_projection = QtCore.Signal(str)
+    sig_update_timing = QtCore.Signal(bool)
+    sig_update_limit_region = QtCore.Signal(str)
 
     # some defaults
 
@@ -152,8 +297,9 @@ class CrossSection2DControlWidget(QtGui.QDockWidget):
         self._widget.setLayout(ctrl_layout)
 
         self._axis_order = np.arange(init_img.ndim+1)
-        self._lo = np.min(init_img)
-        self._hi = np.max(init_img)
+        init_stats = frame_stats(init_img)
+        self._lo = init_stats.min
+        self._hi = init_stats.max
 
         # set up axis swap buttons
         self._cb_ax1 = QtGui.QComboBox(parent=self)
@@ -191,10 +337,13 @@ class CrossSection2DControlWidget(QtGui.QDockWidget):
                                    (View.percentile_limit_factory,
                                     self._percentile_config),
                                    (View.absolute_limit_factory,
-                                    self._absolute_limit_config)]
+                                    self._absolute_limit_config),
+                                   (View.histogram_limit_factory,
+                                    self._percentile_config)]
         intensity_behavior_types = ['full range',
                                     'percentile',
-                                    'absolute']
+                                    'absolute',
+                                    'fast percentile']
         self._intensity_behav_dict = {k: v for k, v in zip(
                                       intensity_behavior_types,
                                       intensity_behavior_data)}
@@ -204,8 +353,9 @@ class CrossSection2DControlWidget(QtGui.QDockWidget):
         self._cmbbox_intensity_behavior = QtGui.QComboBox(parent=self)
         self._cmbbox_intensity_behavior.addItems(intensity_behavior_types)
         # can add PowerNorm, BoundaryNorm, but those require extra inputs
-        norm_names = ['linear', 'log']
-        norm_funcs = [colors.Normalize, colors.LogNorm]
+        norm_names = ['linear', 'log', 'sqrt']
+        # table/chunk based norms, cheap enough to redraw large frames
+        norm_funcs = [colors.Normalize, FastLogNorm, FastSqrtNorm]
         self._norm_dict = {k: v for k, v in zip(norm_names, norm_funcs)}
         self._cmbbox_norm = QtGui.QComboBox(parent=self)
         self._cmbbox_norm.addItems(norm_names)
@@ -216,16 +366,60 @@ class CrossSection2DControlWidget(QtGui.QDockWidget):
         self._spin_max = QtGui.QDoubleSpinBox(parent=self)
         self._spin_step = QtGui.QDoubleSpinBox(parent=self)
         self.init_spinners(self._spin_min, self._spin_max, self._spin_step,
-                           min_intensity=np.min(init_img),
-                           max_intensity=np.max(init_img))
+                           min_intensity=init_stats.min,
+                           max_intensity=init_stats.max)
+
+        # set up the cross section band controls
+        self._spin_band = QtGui.QSpinBox(parent=self)
+        self._spin_band.setRange(1, 999)
+        self._spin_band.setValue(1)
+        self._cmb_band = QtGui.QComboBox(parent=self)
+        self._cmb_band.addItems(['mean', 'sum', 'max'])
+
+        # box sum/mean/max readout next to the coordinates, 0 == off
+        self._spin_box = QtGui.QSpinBox(parent=self)
+        self._spin_box.setRange(0, 999)
+        self._spin_box.setValue(0)
+        self._spin_box.setSpecialValueText("off")
+
+        # set up the rolling window controls, 1 == off
+        self._spin_rolling = QtGui.QSpinBox(parent=self)
+        self._spin_rolling.setRange(1, max(num_images, 1))
+        self._spin_rolling.setValue(1)
+        self._cmb_rolling = QtGui.QComboBox(parent=self)
+        self._cmb_rolling.addItems(['mean', 'sum'])
+
+        # what the colour limits are computed over
+        self._cmb_limit_region = QtGui.QComboBox(parent=self)
+        self._cmb_limit_region.addItems(['frame', 'visible',
+                                         'visible (sampled)'])
+
+        # set up the stack projection control
+        self._cmb_projection = QtGui.QComboBox(parent=self)
+        self._cmb_projection.addItems(['none', 'max', 'sum', 'mean', 'std'])
 
         ctrl_form = QtGui.QFormLayout()
         ctrl_form.addRow("Color &map", self._cm_cb)
         ctrl_form.addRow("&Interpolation", self._cmb_interp)
         ctrl_form.addRow("&Normalization", self._cmbbox_norm)
         ctrl_form.addRow("limit &strategy", self._cmbbox_intensity_behavior)
+        ctrl_form.addRow("limit regi&on", self._cmb_limit_region)
+        ctrl_form.addRow("cut &width", self._spin_band)
+        ctrl_form.addRow("cut &reduction", self._cmb_band)
+        ctrl_form.addRow("readout &box", self._spin_box)
+        ctrl_form.addRow("rolling &window", self._spin_rolling)
+        ctrl_form.addRow("rolling re&duction", self._cmb_rolling)
+        ctrl_form.addRow("&projection", self._cmb_projection)
         ctrl_layout.addLayout(ctrl_form)
 
+        # timing overlay, hidden until timing is turned on
+        self._chk_timing = QtGui.QCheckBox("show timin&gs", parent=self)
+        self._lbl_timing = QtGui.QLabel(parent=self)
+        self._lbl_timing.setFont(QtGui.QFont("Monospace"))
+        self._lbl_timing.setVisible(False)
+        ctrl_layout.addWidget(self._chk_timing)
+        ctrl_layout.addWidget(self._lbl_timing)
+
         clim_spinners = QtGui.QGroupBox("clim parameters")
         ispiner_form = QtGui.QFormLayout()
         ispiner_form.addRow("mi&n", self._spin_min)
@@ -267,6 +461,47 @@ class CrossSection2DControlWidget(QtGui.QDockWidget):
             norm_names[0])
         self._cmb_interp.currentIndexChanged[str].connect(
             self.sig_update_interpolation)
+        self._spin_band.valueChanged.connect(self.sl_set_band)
+        self._cmb_band.currentIndexChanged[str].connect(self.sl_set_band)
+        self._spin_box.valueChanged.connect(self.sig_update_box_size)
+        self._spin_rolling.valueChanged.connect(self.sl_set_rolling)
+        self._cmb_rolling.currentIndexChanged[str].connect(
+            self.sl_set_rolling)
+        self._cmb_projection.currentIndexChanged[str].connect(
+            self.sl_set_projection)
+        self._chk_timing.toggled.connect(self.sig_update_timing)
+        self._cmb_limit_region.currentIndexChanged[str].connect(
+            self.sig_update_limit_region)
+
+    def set_timing_text(self, text):
+        """
+        Show `text` (the stage timings) in the dock, hide it if empty
+        """
+        self._lbl_timing.setText(text)
+        self._lbl_timing.setVisible(bool(text))
+
+    @QtCore.Slot(str)
+    def sl_set_projection(self, reduction):
+        """
+        Emit the selected stack projection
+        """
+        self.sig_update_projection.emit(str(reduction))
+
+    @QtCore.Slot()
+    def sl_set_rolling(self, *args):
+        """
+        Emit the current rolling window size and reduction
+        """
+        self.sig_update_rolling.emit(self._spin_rolling.value(),
+                                     str(self._cmb_rolling.currentText()))
+
+    @QtCore.Slot()
+    def sl_set_band(self, *args):
+        """
+        Emit the current cross section band width and reduction
+        """
+        self.sig_update_band.emit(self._spin_band.value(),
+                                  str(self._cmb_band.currentText()))
 
     def set_im_lim(self, lo, hi):
         self._lo = lo
@@ -546,7 +781,7 @@ class CrossSection2DControlWidget(QtGui.QDockWidget):
 
         Parameters
         ----------
-        norm_name : {'linear', 'log'}
+        norm_name : {'linear', 'log', 'sqrt'}
         """
         self._set_combobox_index_by_item_name(self._cmbbox_norm, norm_name)
 
@@ -556,12 +791,16 @@ class CrossSection2DControlWidget(QtGui.QDockWidget):
         Parameters
         ----------
         im_behavior : str
-            One of {'full range', 'percentile', 'absolute'}
+            One of {'full range', 'percentile', 'absolute',
+            'fast percentile'}
             'full range': Display the full intensity range of the image, from
                           np.min(image) to np.max(image)
             'percentile': Display the image with percentile values where
                           0 == np.min(image) and 100 == np.max(image)
             'absolute': Display the image with absolute intensity values.
+            'fast percentile': Like 'percentile', but the values are looked
+                               up in a cached histogram of the frame, so
+                               moving the spinners does not re-scan it.
         """
         self._set_combobox_index_by_item_name(self._cmbbox_intensity_behavior,
                                               im_behavior)
\ No newline at end of file
@@ -46,30 +46,34 @@ class CrossSectionMainWindow(QtGui.QMainWindow):
     MainWindow
     """
 
-    def __init__(self, data_list, key_list,
+    def __init__(self, data_list, key_list=None,
                  title=None, parent=None, cmap=None,
                  intensity_scaling='full range', img_min=None, img_max=None,
                  norm='linear'):
         """
         Parameters
         ----------
-        data_list : list
-            The list of data frames
-        key_list : list
-            The list of data frame names
+        data_list : list or FrameSource
+            The list of data frames.  Pass a
+            `xray_vision.backend.frame_source.FrameSource` to only load the
+            frames that are displayed.
+        key_list : list, optional
+            The list of data frame names.  Only optional if `data_list` is
+            a FrameSource
         title : str, optional
             The title of the qt window that appears
         parent : Qt, optional
             The Qt parent for this main window
         cmap : str, optional
             Defaults to xray_vision.backend.mpl.AbstractMPLDataView._default_cmap
-        intensity_scaling : {'full range', 'absolute', 'percentile'}, optional
+        intensity_scaling : {'full range', 'absolute', 'percentile',
+                             'fast percentile'}, optional
             Defaults to 'full range'
         img_min : number, optional
             The min value for the image
         img_max : number, optional
             The max value for the image
-        norm : {'log', 'linear'}, optional
+        norm : {'log', 'linear', 'sqrt'}, optional
             Defaults to linear
 
         """
@@ -89,16 +93,18 @@ class CrossSectionMainWindow(QtGui.QMainWindow):
         self.setCentralWidget(self._display)
         self.addDockWidget(QtCore.Qt.LeftDockWidgetArea,
                            self._ctrl_widget)
-        self._ctrl_widget.set_image_intensity_behavior(intensity_scaling)
-        if img_min is not None:
-            self._ctrl_widget.set_min_intensity_limit(img_min)
-        if img_max is not None:
-            self._ctrl_widget.set_max_intensity_limit(img_max)
-        self._ctrl_widget.set_normalization(norm)
-        if cmap is not None:
-            self._ctrl_widget.set_cmap(cmap)
-        # trigger the image to draw
-        self._messenger.sl_update_image(0)
+        # apply the initial settings and draw the first image in one go
+        with self._messenger._view.batch():
+            self._ctrl_widget.set_image_intensity_behavior(intensity_scaling)
+            if img_min is not None:
+                self._ctrl_widget.set_min_intensity_limit(img_min)
+            if img_max is not None:
+                self._ctrl_widget.set_max_intensity_limit(img_max)
+            self._ctrl_widget.set_normalization(norm)
+            if cmap is not None:
+                self._ctrl_widget.set_cmap(cmap)
+            # trigger the image to draw
+            self._messenger.sl_update_image(0)
 
 
 class Stack1DMainWindow(QtGui.QMainWindow):